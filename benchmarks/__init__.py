@@ -0,0 +1 @@
+"""Benchmarks de Mood2Music (exécutés contre un faux Spotify local)"""
@@ -0,0 +1,71 @@
+"""
+Benchmark de l'expansion des artistes dans search_spotify(..., "artist")
+
+Compare les top tracks récupérés un par un (somme des latences) au fan-out
+parallèle (latence du plus lent), puis mesure le cache par artiste et le
+regroupement des recherches simultanées.
+
+Usage : python -m benchmarks.bench_artists [--latency 0.1] [--limit 10]
+"""
+import os
+
+os.environ.setdefault("MOOD2MUSIC_CACHE_DB", "")
+os.environ.setdefault("MOOD2MUSIC_GENRE_STATS", "")
+
+import time
+import argparse
+import threading
+
+from utils import back
+from utils import spotify_client
+from benchmarks.fake_spotify import FakeSpotify
+
+
+def artist_search(fake, query, limit):
+    """Retourne (durée, nombre de morceaux, appels API) pour une recherche d'artistes"""
+    fake.calls = 0
+    start = time.perf_counter()
+    songs = back.search_spotify(query, "artist", limit)
+    return time.perf_counter() - start, len(songs), fake.calls
+
+
+def concurrent_searches(fake, query, limit, sessions):
+    """Même recherche lancée par plusieurs sessions en même temps"""
+    fake.calls = 0
+    threads = [threading.Thread(target=back.search_spotify, args=(query, "artist", limit)) for _ in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, fake.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.1, help="Latence simulée par appel Spotify")
+    parser.add_argument("--limit", type=int, default=10, help="Artistes demandés")
+    parser.add_argument("--sessions", type=int, default=4, help="Sessions simultanées")
+    args = parser.parse_args()
+
+    fake = FakeSpotify(latency=args.latency, empty_ratio=0)
+    spotify_client.set_client(fake)
+
+    print(f"=== Recherche d'artistes, limit={args.limit} (latence {args.latency * 1000:.0f} ms) ===")
+    for label, in_flight in [("séquentiel (avant)", 1), ("fan-out (après)", back.ARTIST_MAX_IN_FLIGHT)]:
+        back.CACHE.clear()
+        back.ARTIST_MAX_IN_FLIGHT = in_flight
+        elapsed, count, calls = artist_search(fake, "bench artists", args.limit)
+        print(f"{label:<24} {elapsed * 1000:8.1f} ms | {count} morceaux | {calls} appels API")
+
+    elapsed, count, calls = artist_search(fake, "bench artists", args.limit)
+    print(f"{'cache par artiste (chaud)':<24} {elapsed * 1000:8.1f} ms | {count} morceaux | {calls} appels API")
+
+    back.CACHE.clear()
+    elapsed, calls = concurrent_searches(fake, "bench concurrent", args.limit, args.sessions)
+    print(f"{f'{args.sessions} sessions simultanées':<24} {elapsed * 1000:8.1f} ms | {calls} appels API "
+          f"(sans regroupement : {args.sessions * (args.limit + 1)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark du fan-out par genre : latence d'un thème « à froid » avant/après
+
+Usage : python -m benchmarks.bench_fanout [--latency 0.15]
+"""
+import time
+import argparse
+
+from utils import back
+from utils import spotify_client
+from benchmarks.fake_spotify import FakeSpotify
+
+
+def cold_theme(theme, max_in_flight):
+    """Mesure get_songs_by_theme avec un cache vide"""
+    back.CACHE.clear()
+    back.THEME_MAX_IN_FLIGHT = max_in_flight
+    start = time.perf_counter()
+    songs = back.get_songs_by_theme(theme, limit_per_genre=4, max_total=20)
+    return time.perf_counter() - start, len(songs)
+
+
+def cold_extended(theme, max_in_flight, deadline):
+    """Mesure get_extended_songs_by_theme avec un cache vide"""
+    back.CACHE.clear()
+    back.EXTENDED_MAX_IN_FLIGHT = max_in_flight
+    back.EXTENDED_DEADLINE = deadline
+    start = time.perf_counter()
+    songs = back.get_extended_songs_by_theme(theme, offset=0, limit=20)
+    return time.perf_counter() - start, len(songs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.15, help="Latence simulée par appel Spotify")
+    parser.add_argument("--extended-latency", type=float, default=0.02,
+                        help="Latence simulée pour les résultats étendus (des centaines de genres)")
+    parser.add_argument("--theme", default="joyeux")
+    args = parser.parse_args()
+
+    fake = FakeSpotify(latency=args.latency)
+    spotify_client.set_client(fake)
+    back.TRACK_INDEX_PATH = ""  # Mesurer les appels API, pas l'index local
+
+    print(f"=== Thème à froid '{args.theme}' (latence {args.latency * 1000:.0f} ms) ===")
+    for label, in_flight in [("séquentiel (avant)", 1), ("fan-out (après)", 5)]:
+        fake.calls = 0
+        elapsed, count = cold_theme(args.theme, in_flight)
+        print(f"{label:<22} {elapsed * 1000:8.1f} ms | {count} morceaux | {fake.calls} appels API")
+
+    fake.latency = args.extended_latency
+    print(f"\n=== Résultats étendus à froid '{args.theme}' (latence {args.extended_latency * 1000:.0f} ms) ===")
+    for label, in_flight, deadline in [("séquentiel (avant)", 1, 0), ("fan-out 16 + délai 2s", 16, 2.0)]:
+        fake.calls = 0
+        elapsed, count = cold_extended(args.theme, in_flight, deadline)
+        print(f"{label:<22} {elapsed * 1000:8.1f} ms | {count} morceaux | {fake.calls} appels API")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark de la recherche approximative de genres (utils.genre_search)
+
+Sur le catalogue complet (~6 100 genres + thèmes) : temps de construction de
+l'index, puis latence des requêtes (noms exacts, noms avec une faute de frappe,
+texte libre) comparée à un parcours linéaire qui calcule le même score pour
+chaque nom. Le taux de requêtes avec faute dont le genre d'origine sort premier
+est aussi affiché.
+
+Usage : python -m benchmarks.bench_genre_search [--queries 500] [--seed 42]
+"""
+import time
+import random
+import argparse
+import statistics
+
+from utils.catalog import load_catalog
+from utils.genre_search import GenreSearchIndex, ngrams, MIN_SCORE
+
+FREE_TEXT = ["synthwave", "french rap", "lofi", "hiphop", "jazz piano", "daft punk", "love", "chill", "métal",
+             "musique classique", "k pop", "drum and bass"]
+
+
+def linear_search(names, grams, query, limit=10):
+    """Même score que l'index (Dice sur les trigrammes), calculé nom par nom"""
+    query_grams = ngrams(query)
+    if not query_grams:
+        return []
+    scored = []
+    for name, name_grams in zip(names, grams):
+        score = 2 * len(query_grams & name_grams) / (len(query_grams) + len(name_grams))
+        if score >= MIN_SCORE:
+            scored.append((score, name))
+    scored.sort(key=lambda item: -item[0])
+    return scored[:limit]
+
+
+def typo(rng, text):
+    """Supprime, double ou échange une lettre"""
+    if len(text) < 4:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    operation = rng.choice(("delete", "double", "swap"))
+    if operation == "delete":
+        return text[:i] + text[i + 1:]
+    if operation == "double":
+        return text[:i] + text[i] + text[i:]
+    return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+
+
+def timed(fn, queries):
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(0.95 * (len(samples) - 1))], samples[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500, help="Requêtes par catégorie")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    catalog = load_catalog()
+    entries = [("theme", theme) for theme in catalog.themes()] + [("genre", genre) for genre in catalog.genres()]
+
+    start = time.perf_counter()
+    index = GenreSearchIndex(entries)
+    build = time.perf_counter() - start
+    print(f"=== Catalogue : {len(index)} noms, index construit en {build * 1000:.0f} ms ===")
+
+    names = [name for _, name in entries]
+    grams = [ngrams(name) for name in names]
+
+    rng = random.Random(args.seed)
+    exact = rng.sample(catalog.genres(), min(args.queries, catalog.n_genres))
+    typos = [typo(rng, genre) for genre in exact]
+    free = [rng.choice(FREE_TEXT) for _ in range(args.queries)]
+
+    for label, queries in [("noms exacts", exact), ("fautes de frappe", typos), ("texte libre", free)]:
+        for method, fn in [("index", lambda q: index.search(q, 10)),
+                           ("linéaire", lambda q: linear_search(names, grams, q, 10))]:
+            p50, p95, worst = timed(fn, queries)
+            print(f"{label:<18} {method:<9} p50 {p50:6.2f} ms | p95 {p95:6.2f} ms | max {worst:6.2f} ms")
+
+    found = sum(1 for original, query in zip(exact, typos)
+                if (index.search(query, 1) or [{}])[0].get("name") == original)
+    print(f"\nGenre d'origine classé premier malgré la faute : {found / len(typos):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark du choix des genres d'un thème : ordre du catalogue contre statistiques de rendement
+
+Reconstruit le top de chaque thème plusieurs fois (cache vidé entre deux tours,
+comme après expiration) contre le faux Spotify, dont une part des genres ne
+renvoie aucun morceau, et compare :
+
+- csv   : les 5 premiers genres du catalogue (comportement d'avant) ;
+- stats : GenreStats.select (genres rentables d'abord, genres vides écartés, exploration).
+
+Affiche les appels Spotify, les morceaux obtenus et les appels par morceau utile.
+
+Usage : python -m benchmarks.bench_genre_yield [--rounds 5] [--themes 20] [--empty 0.4]
+"""
+import os
+
+os.environ.setdefault("MOOD2MUSIC_CACHE_DB", "")
+os.environ.setdefault("MOOD2MUSIC_TRACK_INDEX", "")
+os.environ.setdefault("MOOD2MUSIC_PLAYLIST_INTERVAL", "0")
+os.environ.setdefault("MOOD2MUSIC_GENRE_STATS", "")
+
+import random
+import argparse
+
+from utils import back
+from utils import spotify_client
+from utils.genre_stats import GenreStats
+from benchmarks.fake_spotify import FakeSpotify
+
+
+class CatalogOrder(GenreStats):
+    """Sélection d'avant : les premiers genres dans l'ordre du catalogue"""
+
+    def select(self, genres, count):
+        return list(genres[:count])
+
+
+def run(fake, stats, themes, rounds, limit_per_genre, max_total):
+    """Retourne, par tour, (appels Spotify, morceaux obtenus)"""
+    back.GENRE_STATS = stats
+    per_round = []
+    for _ in range(rounds):
+        calls_before, tracks = fake.calls, 0
+        for theme in themes:
+            back.CACHE.clear()
+            back.NEGATIVE_CACHE.clear()
+            result = back._build_songs_by_theme(theme, limit_per_genre, max_total, f"bench_{theme}")
+            tracks += len(result)
+        per_round.append((fake.calls - calls_before, tracks))
+    return per_round
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=5, help="Reconstructions de chaque thème")
+    parser.add_argument("--themes", type=int, default=20, help="Nombre de thèmes (les premiers du catalogue)")
+    parser.add_argument("--empty", type=float, default=0.4, help="Part des genres sans aucun morceau")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--limit-per-genre", type=int, default=4)
+    parser.add_argument("--max-total", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    fake = FakeSpotify(latency=args.latency, empty_ratio=args.empty)
+    spotify_client.set_client(fake)
+    themes = back.get_available_themes()[:args.themes]
+    print(f"{len(themes)} thèmes × {args.rounds} tours, {args.empty:.0%} de genres vides, "
+          f"{args.limit_per_genre} morceaux par genre, top {args.max_total}")
+
+    for label, stats in [("csv", CatalogOrder(explore_rate=0)),
+                         ("stats", GenreStats(rng=random.Random(args.seed)))]:
+        per_round = run(fake, stats, themes, args.rounds, args.limit_per_genre, args.max_total)
+        calls = sum(c for c, _ in per_round)
+        tracks = sum(t for _, t in per_round)
+        rounds = " ".join(f"{c}/{t}" for c, t in per_round)
+        print(f"{label:<6} {calls:5d} appels | {tracks:5d} morceaux | {calls / max(tracks, 1):.3f} appel/morceau "
+              f"| par tour (appels/morceaux) : {rounds}")
+
+
+if __name__ == "__main__":
+    main()
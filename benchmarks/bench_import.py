@@ -0,0 +1,77 @@
+"""
+Benchmark du chargement du mapping thème -> genres
+
+Compare l'ancien chemin (pandas.read_csv + iterrows) au catalogue compilé chargé par mmap,
+chacun dans un processus neuf pour inclure le coût des imports.
+
+Usage : python -m benchmarks.bench_import [--runs 5]
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LEGACY = """
+import time
+start = time.perf_counter()
+import pandas as pd
+df = pd.read_csv("data/spotify_genres_themes.csv")
+theme_to_genres = {}
+for _, row in df.iterrows():
+    theme_to_genres.setdefault(row['theme'], []).append(row['genre'])
+print(time.perf_counter() - start)
+"""
+
+CATALOG = """
+import time
+start = time.perf_counter()
+from utils.catalog import load_catalog
+theme_to_genres = load_catalog().theme_to_genres
+print(time.perf_counter() - start)
+"""
+
+
+def run_in_subprocess(code):
+    """Exécute le code dans un nouvel interpréteur et retourne (durée interne, durée totale)"""
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return float(output.stdout.strip()), time.perf_counter() - start
+
+
+def report(label, samples):
+    inner = [s[0] * 1000 for s in samples]
+    total = [s[1] * 1000 for s in samples]
+    print(f"{label:<28} chargement médian {statistics.median(inner):8.2f} ms | "
+          f"processus complet {statistics.median(total):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Compiler le catalogue une fois (un premier démarrage le fait automatiquement)
+    run_in_subprocess(CATALOG)
+
+    try:
+        report("pandas + iterrows (avant)", [run_in_subprocess(LEGACY) for _ in range(args.runs)])
+    except subprocess.CalledProcessError:
+        print("pandas n'est pas installé : mesure de l'ancien chemin ignorée")
+    report("catalogue compilé (après)", [run_in_subprocess(CATALOG) for _ in range(args.runs)])
+
+    # Chargement à chaud dans le processus courant (mmap + en-tête)
+    sys.path.insert(0, ROOT_DIR)
+    from utils.catalog import load_catalog
+    load_catalog()
+    start = time.perf_counter()
+    for _ in range(1000):
+        load_catalog()
+    print(f"{'load_catalog() en processus':<28} {(time.perf_counter() - start) * 1000:8.2f} µs par chargement")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark d'une panne Spotify : disjoncteur et cache négatif
+
+Le faux Spotify répond 503 pendant la panne, qui commence quand les valeurs mises
+en cache au préchauffage ont expiré. Chaque « rerun » de la page appelle les
+morceaux populaires, le Top de l'accueil, quelques genres et une recherche nouvelle.
+Compare, pendant la panne puis au retour de Spotify :
+
+- avant : ni disjoncteur ni cache négatif (chaque rerun redemande tout à Spotify) ;
+- après : disjoncteur (ouverture après échecs répétés, appel d'essai) et cache négatif.
+
+Usage : python -m benchmarks.bench_outage [--reruns 20] [--latency 0.05] [--reset-timeout 1] [--ttl 0.5]
+"""
+import os
+
+os.environ.setdefault("MOOD2MUSIC_CACHE_DB", "")
+os.environ.setdefault("MOOD2MUSIC_TRACK_INDEX", "")
+os.environ.setdefault("MOOD2MUSIC_PLAYLIST_INTERVAL", "0")
+os.environ.setdefault("MOOD2MUSIC_GENRE_STATS", "")
+
+import time
+import argparse
+import statistics
+
+from utils import back
+from utils import spotify_client
+from utils.cache import TTLCache
+from utils.breaker import CircuitBreaker
+from benchmarks.fake_spotify import FakeSpotify
+
+GENRES = ["pop", "rock", "jazz", "blues", "soul"]
+
+
+def rerun(index):
+    """Les appels d'un rerun de la page ; retourne le nombre de morceaux obtenus"""
+    tracks = len(back.get_popular_tracks(10))
+    tracks += len(back.get_top_tracks(15, 4))
+    for genre in GENRES:
+        tracks += len(back.get_songs_by_genre(genre, 4))
+    tracks += len(back.smart_search(f"query {index}", None, 10)['results'])
+    return tracks
+
+
+def run(fake, protected, reruns, reset_timeout, ttl):
+    # Cache neuf à TTL court : les valeurs du préchauffage ont expiré quand la panne commence
+    back.CACHE = back.REFRESHER.cache = TTLCache(default_ttl=ttl, max_staleness=3600)
+    back.NEGATIVE_CACHE = (TTLCache(namespace_ttls=back.NEGATIVE_TTLS) if protected
+                           else TTLCache(default_ttl=0))
+    back.BREAKER = back.SCHEDULER.breaker = CircuitBreaker(reset_timeout=reset_timeout) if protected else None
+    fake.outage = False
+    rerun(0)
+    time.sleep(ttl)
+
+    # Panne
+    fake.outage = True
+    calls_before = fake.calls
+    durations, tracks = [], 0
+    for i in range(reruns):
+        start = time.perf_counter()
+        tracks += rerun(i + 1)
+        durations.append(time.perf_counter() - start)
+    outage_calls = fake.calls - calls_before
+
+    # Retour de Spotify : délai jusqu'au premier rerun avec une recherche réussie
+    fake.outage = False
+    start = time.perf_counter()
+    i = reruns + 1
+    while not back.smart_search(f"query {i}", None, 10)['results'] and time.perf_counter() - start < 30:
+        time.sleep(0.05)
+        i += 1
+    recovery = time.perf_counter() - start
+    return outage_calls, statistics.median(durations), tracks, recovery
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=20, help="Reruns pendant la panne")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence du faux Spotify (s)")
+    parser.add_argument("--reset-timeout", type=float, default=1.0, help="Ouverture du disjoncteur (s)")
+    parser.add_argument("--ttl", type=float, default=0.5, help="TTL du cache (s), dépassé avant la panne")
+    args = parser.parse_args()
+
+    fake = FakeSpotify(latency=args.latency, empty_ratio=0)
+    spotify_client.set_client(fake)
+    print(f"{args.reruns} reruns pendant la panne, Spotify {args.latency * 1000:.0f} ms, "
+          f"disjoncteur {args.reset_timeout:g} s")
+    for label, protected in [("avant", False), ("après", True)]:
+        calls, median, tracks, recovery = run(fake, protected, args.reruns, args.reset_timeout, args.ttl)
+        print(f"{label:<6} {calls:4d} appels pendant la panne | rerun p50 {median * 1000:7.1f} ms | "
+              f"{tracks:4d} morceaux servis (dernière valeur connue) | reprise en {recovery * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
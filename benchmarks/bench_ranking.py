@@ -0,0 +1,76 @@
+"""
+Micro-benchmark du classement multi-genres (utils.ranking)
+
+Sur des entrées synthétiques de 10k à 100k morceaux répartis en listes par genre
+(avec une part de morceaux présents dans plusieurs genres), compare :
+
+- l'ancien classement : concaténation, tri complet, découpe (sans dédoublonnage) ;
+- rank_tracks : dédoublonnage par id puis tas borné (listes quelconques) ;
+- merge_ranked : fusion k-voies de listes par genre déjà triées.
+
+Usage : python -m benchmarks.bench_ranking [--sizes 10000,50000,100000] [--k 10,50] [--genres 100]
+"""
+import time
+import random
+import argparse
+import statistics
+
+from utils.ranking import merge_ranked, rank_tracks
+
+
+def make_lists(total, genres, duplicate_ratio, seed):
+    """Listes de morceaux par genre ; duplicate_ratio des morceaux sont copiés dans un second genre"""
+    rng = random.Random(seed)
+    unique = int(total / (1 + duplicate_ratio))
+    tracks = [{"id": f"t{i}", "title": f"Track {i}", "artist": f"Artist {i % 997}",
+               "popularity": rng.randint(0, 100)} for i in range(unique)]
+    lists = [[] for _ in range(genres)]
+    for track in tracks:
+        lists[rng.randrange(genres)].append(track)
+    for track in rng.sample(tracks, total - unique):
+        lists[rng.randrange(genres)].append(track)
+    return [[dict(track, genre=f"genre {g}") for track in tracks] for g, tracks in enumerate(lists)]
+
+
+def legacy(lists, k):
+    all_songs = [track for tracks in lists for track in tracks]
+    all_songs.sort(key=lambda x: x['popularity'], reverse=True)
+    return all_songs[:k]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,50000,100000", help="Nombres de morceaux (doublons compris)")
+    parser.add_argument("--k", default="10,50", help="Tailles de top")
+    parser.add_argument("--genres", type=int, default=100)
+    parser.add_argument("--duplicates", type=float, default=0.2, help="Part de morceaux présents dans deux genres")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        lists = make_lists(size, args.genres, args.duplicates, args.seed)
+        sorted_lists = [sorted(tracks, key=lambda x: x['popularity'], reverse=True) for tracks in lists]
+        flat = [track for tracks in lists for track in tracks]
+        print(f"=== {size} morceaux, {args.genres} genres, {args.duplicates:.0%} en double ===")
+        for k in (int(k) for k in args.k.split(",")):
+            for label, fn in [("tri complet (avant)", lambda: legacy(lists, k)),
+                              ("rank_tracks", lambda: rank_tracks(flat, k)),
+                              ("merge_ranked (triées)", lambda: merge_ranked(sorted_lists, k))]:
+                elapsed, result = timed(fn, args.repeat)
+                duplicates = len(result) - len({track["id"] for track in result})
+                print(f"k={k:<4} {label:<24} {elapsed:8.2f} ms | {duplicates} doublon(s) dans le top")
+        print()
+
+
+if __name__ == "__main__":
+    main()
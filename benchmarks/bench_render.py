@@ -0,0 +1,106 @@
+"""
+Benchmark du rendu de la liste de résultats (Streamlit AppTest)
+
+Compare l'ancien affichage (6 st.columns et 6 widgets par morceau) au tableau en un
+seul élément de utils.track_table, pour 10, 20 et 50 lignes : nombre d'éléments
+produits par le script et durée d'un rerun.
+
+Usage : python -m benchmarks.bench_render [--runs 5] [--rows 10,20,50]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SETUP = f"""
+import sys
+sys.path.insert(0, {ROOT_DIR!r})
+import streamlit as st
+from benchmarks.fake_spotify import make_track
+from utils.tracks import normalize_track
+tracks = [normalize_track(make_track("bench", i), "pop", theme="joyeux") for i in range({{rows}})]
+"""
+
+LEGACY = """
+col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 1.2, 1.3, 1])
+with col1:
+    st.markdown("**Cover**", unsafe_allow_html=True)
+with col2:
+    st.markdown("**Title | Artist**", unsafe_allow_html=True)
+with col3:
+    st.markdown("**Album**", unsafe_allow_html=True)
+with col4:
+    st.markdown("**Popularity**", unsafe_allow_html=True)
+with col5:
+    st.markdown("**Score Spotify**", unsafe_allow_html=True)
+with col6:
+    st.markdown("**Spotify**", unsafe_allow_html=True)
+st.markdown("---")
+for track in tracks:
+    col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 1.2, 1.3, 1])
+    with col1:
+        st.image(track['image'], width=60)
+    with col2:
+        st.write(f"**{track['title']}** | {track['artist']} | 🎭 {track['theme']}")
+    with col3:
+        st.markdown(track['album'], unsafe_allow_html=True)
+    with col4:
+        st.markdown(f"{track['popularity']}/100", unsafe_allow_html=True)
+    with col5:
+        st.markdown(f"{track['popularity_score']}/100", unsafe_allow_html=True)
+    with col6:
+        st.markdown(f'<a href="{track["spotify_url"]}" target="_blank">Écouter</a>', unsafe_allow_html=True)
+"""
+
+TABLE = """
+from utils.track_table import render_track_table
+render_track_table(tracks)
+"""
+
+
+def count_elements(node):
+    """Nombre de nœuds (blocs et éléments) sous node dans l'arbre AppTest"""
+    children = getattr(node, "children", None) or {}
+    return 1 + sum(count_elements(child) for child in children.values())
+
+
+def measure(script, runs):
+    """Retourne (nombre d'éléments, durées des reruns en secondes)"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_string(script, default_timeout=30)
+    app.run()  # Premier run : imports et compilation
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        app.run()
+        durations.append(time.perf_counter() - start)
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return count_elements(app.main) - 1, durations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--rows", default="10,20,50", help="Tailles de liste, séparées par des virgules")
+    args = parser.parse_args()
+
+    try:
+        import streamlit  # noqa: F401
+    except ImportError:
+        sys.exit("streamlit est requis pour ce benchmark (pip install -r requirements.txt)")
+
+    for rows in (int(r) for r in args.rows.split(",")):
+        setup = SETUP.format(rows=rows)
+        for label, body in (("6 colonnes par morceau", LEGACY), ("tableau (1 élément)", TABLE)):
+            elements, durations = measure(setup + body, args.runs)
+            print(f"{rows:>3} lignes | {label:<24} {elements:>5} éléments | "
+                  f"rerun médian {statistics.median(durations) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
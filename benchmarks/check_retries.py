@@ -0,0 +1,54 @@
+"""
+Vérifie les nouvelles tentatives HTTP du client spotipy contre le faux serveur
+
+- 429 : une seule requête HTTP ; le Retry-After est laissé à l'ordonnanceur
+  (utils.scheduler), qui suspend tous les appels au lieu de dormir dans un thread ;
+- 5xx : nouvelles tentatives (SPOTIFY_RETRIES), puis l'erreur avec son vrai statut.
+
+Usage : python -m benchmarks.check_retries
+"""
+import sys
+import time
+
+from benchmarks.fake_server import FakeSpotifyServer, spotipy_client
+from benchmarks.fake_spotify import FakeSpotify
+from utils.spotify_client import SPOTIFY_RETRIES
+
+
+def attempt(server):
+    """Un appel search ; retourne (statut de l'erreur ou None, requêtes HTTP reçues, durée)"""
+    client = spotipy_client(server.url)
+    start = time.perf_counter()
+    status = None
+    try:
+        client.search(q="genre:\"pop\"", limit=1)
+    except Exception as e:
+        status = getattr(e, "http_status", None)
+    return status, server.requests, time.perf_counter() - start
+
+
+def main():
+    failures = []
+
+    with FakeSpotifyServer(FakeSpotify(latency=0), latency=0, throttle_ratio=1.0, retry_after=2) as server:
+        status, requests, elapsed = attempt(server)
+    print(f"429 : statut {status}, {requests} requête(s), {elapsed * 1000:.0f} ms")
+    if status != 429 or requests != 1:
+        failures.append(f"429 : attendu 1 requête et le statut 429, obtenu {requests} requête(s), statut {status}")
+
+    backend = FakeSpotify(latency=0)
+    backend.outage = True
+    with FakeSpotifyServer(backend, latency=0) as server:
+        status, requests, elapsed = attempt(server)
+    print(f"503 : statut {status}, {requests} requête(s), {elapsed * 1000:.0f} ms")
+    if status != 503 or requests != SPOTIFY_RETRIES + 1:
+        failures.append(f"503 : attendu {SPOTIFY_RETRIES + 1} requêtes et le statut 503, "
+                        f"obtenu {requests} requête(s), statut {status}")
+
+    for failure in failures:
+        print(f"ÉCHEC {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Compare deux rapports de benchmarks.run
+
+Affiche, pour chaque scénario commun, l'évolution du p50, du p95 et du nombre
+d'appels Spotify. Une hausse du p95 au-delà du seuil est signalée comme régression.
+
+Usage : python -m benchmarks.compare avant.json apres.json [--threshold 10] [--fail-on-regression]
+"""
+import sys
+import json
+import argparse
+
+METRICS = (("p50_ms", "p50"), ("p95_ms", "p95"), ("api_calls", "appels"))
+
+
+def load_report(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def change(before, after):
+    """Variation relative en %, ou None si la base est nulle"""
+    if before is None or after is None:
+        return None
+    if not before:
+        return 0.0 if not after else None
+    return (after - before) / before * 100
+
+
+def compare(base, head, threshold):
+    """
+    Retourne les lignes de comparaison et la liste des scénarios en régression
+
+    Returns:
+        tuple: (liste de (scénario, {métrique: (avant, après, %)}), scénarios en régression)
+    """
+    rows = []
+    regressions = []
+    for name, before in base["scenarios"].items():
+        after = head["scenarios"].get(name)
+        if after is None or not before.get("count") or not after.get("count"):
+            continue
+        row = {key: (before.get(key), after.get(key), change(before.get(key), after.get(key)))
+               for key, _ in METRICS}
+        rows.append((name, row))
+        p95_change = row["p95_ms"][2]
+        if p95_change is not None and p95_change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+
+def _format_change(value):
+    return "   n/a" if value is None else f"{value:+6.1f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base", help="Rapport de référence")
+    parser.add_argument("head", help="Rapport à comparer")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Hausse du p95 tolérée (%%)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Code de sortie 1 en cas de régression")
+    args = parser.parse_args(argv)
+
+    base, head = load_report(args.base), load_report(args.head)
+    print(f"Référence : {base['meta'].get('label') or args.base} ({base['meta'].get('git_revision')})")
+    print(f"Comparé   : {head['meta'].get('label') or args.head} ({head['meta'].get('git_revision')})")
+    if base["meta"].get("config") != head["meta"].get("config"):
+        print("⚠️  Configurations différentes (latence, 429...) : comparaison indicative")
+    print()
+
+    rows, regressions = compare(base, head, args.threshold)
+    for name, row in rows:
+        cells = []
+        for key, label in METRICS:
+            before, after, pct = row[key]
+            if key.endswith("_ms"):
+                cells.append(f"{label} {before:.1f} → {after:.1f} ms ({_format_change(pct)})")
+            else:
+                cells.append(f"{label} {before} → {after} ({_format_change(pct)})")
+        flag = "  ⚠️ régression" if name in regressions else ""
+        print(f"{name:<26} " + " | ".join(cells) + flag)
+
+    missing = sorted(set(base["scenarios"]) ^ set(head["scenarios"]))
+    if missing:
+        print(f"\nScénarios présents dans un seul rapport : {', '.join(missing)}")
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Faux serveur HTTP de l'API Web Spotify pour les benchmarks
+
+Sert /v1/search, /v1/artists/{id}/top-tracks et /v1/artists?ids=... avec des réponses
+synthétiques (FakeSpotify) ou enregistrées (--replay, format du crawler --record),
+une latence et une gigue configurables, et des 429 avec Retry-After injectés au
+hasard (--throttle) ou au-delà d'un débit (--rate-limit).
+
+Usage : python -m benchmarks.fake_server [--port 8765] [--latency 0.1] [--throttle 0.05]
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from collections import deque
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from benchmarks.fake_spotify import FakeSpotify, FakeSpotifyException, ReplaySpotify
+
+
+class FakeSpotifyServer:
+    """
+    Serveur HTTP local imitant l'API Web Spotify
+
+    Args:
+        backend: Objet avec search (et artist_top_tracks, artists) qui fournit les réponses
+        latency (float): Latence ajoutée à chaque réponse (secondes)
+        jitter (float): Variation aléatoire ajoutée à la latence (secondes)
+        throttle_ratio (float): Proportion de requêtes qui reçoivent un 429
+        rate_limit (float): Requêtes par seconde au-delà desquelles le serveur répond 429 (0 = illimité)
+        retry_after (float): Valeur de l'en-tête Retry-After (secondes)
+    """
+
+    def __init__(self, backend=None, latency=0.05, jitter=0.0, throttle_ratio=0.0, rate_limit=0.0,
+                 retry_after=1.0, host="127.0.0.1", port=0):
+        self.backend = backend or FakeSpotify(latency=0, empty_ratio=0.2)
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_ratio = throttle_ratio
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.requests = 0
+        self.throttled = 0
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-spotify", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_throttle(self):
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            throttled = bool(self.throttle_ratio) and random.random() < self.throttle_ratio
+            if self.rate_limit:
+                # Fenêtre glissante d'une seconde
+                while self._window and now - self._window[0] > 1.0:
+                    self._window.popleft()
+                if len(self._window) >= self.rate_limit:
+                    throttled = True
+                else:
+                    self._window.append(now)
+            if throttled:
+                self.throttled += 1
+        return throttled
+
+    def _respond(self, path, params):
+        """Retourne (statut, corps) pour une requête GET"""
+        parts = [p for p in path.split("/") if p]
+        if parts[:1] != ["v1"]:
+            return 404, {"error": {"status": 404, "message": "Not found"}}
+        parts = parts[1:]
+        arg = lambda name, default=None: params.get(name, [default])[0]
+
+        if parts == ["search"]:
+            return 200, self.backend.search(
+                q=arg("q", ""), limit=int(arg("limit", 10)), offset=int(arg("offset", 0)), type=arg("type", "track"))
+        if len(parts) == 3 and parts[0] == "artists" and parts[2] == "top-tracks":
+            return 200, self.backend.artist_top_tracks(parts[1], country=arg("country", "US"))
+        if parts == ["artists"]:
+            return 200, self.backend.artists([i for i in arg("ids", "").split(",") if i])
+        return 404, {"error": {"status": 404, "message": "Not found"}}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/_stats":
+                    self._send(200, {"requests": server.requests, "throttled": server.throttled})
+                    return
+
+                delay = server.latency + (random.uniform(0, server.jitter) if server.jitter else 0)
+                if delay > 0:
+                    time.sleep(delay)
+                if server._should_throttle():
+                    self._send(429, {"error": {"status": 429, "message": "API rate limit exceeded"}},
+                               headers={"Retry-After": f"{server.retry_after:g}"})
+                    return
+                try:
+                    status, body = server._respond(url.path, parse_qs(url.query))
+                except AttributeError:
+                    status, body = 404, {"error": {"status": 404, "message": "Not supported by backend"}}
+                except FakeSpotifyException as e:
+                    # Erreur simulée par le backend (panne : FakeSpotify.outage)
+                    status, body = e.http_status, {"error": {"status": e.http_status, "message": e.msg}}
+                self._send(status, body)
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def spotipy_client(base_url):
+    """Client spotipy réel pointé sur le faux serveur (token statique, pas d'OAuth)"""
+    import spotipy
+    from utils.spotify_client import pooled_session
+
+    client = spotipy.Spotify(auth="fake-token", requests_session=pooled_session())
+    client.prefix = base_url.rstrip("/") + "/v1/"
+    return client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--throttle", type=float, default=0.0, help="Proportion de réponses 429")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requêtes/s avant 429 (0 = illimité)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--replay", help="Enregistrement JSONL à rejouer (crawler --record)")
+    args = parser.parse_args(argv)
+
+    backend = ReplaySpotify.from_file(args.replay) if args.replay else None
+    server = FakeSpotifyServer(backend, latency=args.latency, jitter=args.jitter, throttle_ratio=args.throttle,
+                               rate_limit=args.rate_limit, retry_after=args.retry_after, port=args.port)
+    print(f"Faux Spotify sur {server.url}/v1/ (Ctrl+C pour arrêter)")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
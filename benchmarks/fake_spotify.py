@@ -0,0 +1,191 @@
+import re
+import json
+import time
+import random
+import threading
+import zlib
+from collections import Counter
+
+# 🔹 Faux client Spotify local : mêmes méthodes que spotipy.Spotify, réponses synthétiques
+GENRE_QUERY = re.compile(r'genre:"?([^"]+)"?')
+# Genres attribués aux artistes (format Spotify : minuscules), tous présents dans le CSV
+ARTIST_GENRES = ["pop", "dance pop", "indie pop", "rock", "metal", "hip hop", "edm", "jazz", "soul", "blues",
+                 "classical", "folk"]
+
+
+def _seed(*parts):
+    """Graine déterministe à partir d'une chaîne"""
+    return zlib.crc32("|".join(str(p) for p in parts).encode("utf-8"))
+
+
+def make_track(key, index):
+    """Construit un objet track au format de l'API Spotify"""
+    rng = random.Random(_seed(key, index))
+    track_id = f"{_seed(key, index, 'track'):08x}{index:04d}"
+    artist_id = f"{_seed(key, index % 7, 'artist'):08x}"
+    return {
+        "id": track_id,
+        "name": f"Track {key} #{index}",
+        "artists": [{"id": artist_id, "name": f"Artist {artist_id[:4]}"}],
+        "album": {
+            "name": f"Album {key} {index // 3}",
+            "images": [
+                {"url": f"https://i.scdn.co/image/{track_id}-640", "width": 640, "height": 640},
+                {"url": f"https://i.scdn.co/image/{track_id}-300", "width": 300, "height": 300},
+                {"url": f"https://i.scdn.co/image/{track_id}-64", "width": 64, "height": 64},
+            ],
+        },
+        "popularity": rng.randint(0, 100),
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{track_id}"},
+        "preview_url": None,
+    }
+
+
+class FakeSpotifyException(Exception):
+    """Erreur HTTP simulée, avec les attributs de spotipy.SpotifyException utilisés par le backend"""
+
+    def __init__(self, http_status, msg, headers=None):
+        super().__init__(f"http status: {http_status}, {msg}")
+        self.http_status = http_status
+        self.msg = msg
+        self.headers = headers or {}
+
+
+class FakeSpotify:
+    """
+    Faux client Spotify avec latence configurable
+
+    Args:
+        latency (float): Latence simulée par appel (secondes)
+        jitter (float): Variation aléatoire ajoutée à la latence (secondes)
+        empty_ratio (float): Proportion de genres qui ne renvoient aucun morceau
+        throttle_ratio (float): Proportion d'appels qui reçoivent un 429
+        retry_after (float): Valeur de l'en-tête Retry-After des 429 (secondes)
+
+    L'attribut outage simule une panne : tant qu'il est vrai, chaque appel répond 503
+    après sa latence.
+    """
+
+    def __init__(self, latency=0.1, jitter=0.0, empty_ratio=0.2, throttle_ratio=0.0, retry_after=1.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.empty_ratio = empty_ratio
+        self.throttle_ratio = throttle_ratio
+        self.retry_after = retry_after
+        self.calls = 0
+        self.throttled = 0
+        self.outage = False
+        self._lock = threading.Lock()
+
+    def _wait(self):
+        with self._lock:
+            self.calls += 1
+            throttled = self.throttle_ratio and random.random() < self.throttle_ratio
+            if throttled:
+                self.throttled += 1
+        if throttled:
+            raise FakeSpotifyException(429, "API rate limit exceeded",
+                                       headers={"Retry-After": f"{self.retry_after:g}"})
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            time.sleep(delay)
+        if self.outage:
+            raise FakeSpotifyException(503, "Service Unavailable")
+
+    def _available(self, key):
+        """Nombre de morceaux disponibles pour une requête (0 pour les genres « morts »)"""
+        if (_seed(key) % 1000) / 1000 < self.empty_ratio:
+            return 0
+        return 20 + _seed(key, "size") % 180
+
+    def search(self, q, limit=10, offset=0, type="track", market=None):
+        self._wait()
+        match = GENRE_QUERY.search(q)
+        key = match.group(1).strip().lower() if match else q.strip().lower()
+        total = self._available(key)
+        if type == "artist":
+            items = [make_track(key, i)["artists"][0] for i in range(offset, min(offset + limit, total))]
+            for artist in items:
+                artist["genres"] = [key]
+                artist["popularity"] = _seed(artist["id"]) % 100
+            return {"artists": {"items": items, "total": total, "offset": offset, "limit": limit}}
+        items = [make_track(key, i) for i in range(offset, min(offset + limit, total))]
+        return {"tracks": {"items": items, "total": total, "offset": offset, "limit": limit}}
+
+    def artist_top_tracks(self, artist_id, country="US"):
+        self._wait()
+        return {"tracks": [make_track(f"artist-{artist_id}", i) for i in range(10)]}
+
+    def artists(self, artists):
+        self._wait()
+        return {"artists": [
+            {"id": artist_id, "name": f"Artist {artist_id[:4]}", "genres": self.artist_genres(artist_id),
+             "popularity": _seed(artist_id) % 100}
+            for artist_id in artists
+        ]}
+
+    @staticmethod
+    def artist_genres(artist_id):
+        """Un à trois genres déterministes pour un artiste"""
+        rng = random.Random(_seed(artist_id, "genres"))
+        return rng.sample(ARTIST_GENRES, rng.randint(1, 3))
+
+
+class ReplaySpotify:
+    """
+    Faux client Spotify qui rejoue des réponses enregistrées (crawler --record,
+    benchmarks.run --record)
+
+    Une requête absente de l'enregistrement renvoie un résultat vide, comptée dans
+    misses par méthode : un enregistrement du crawler ne contient que des recherches
+    de genres, pas les appels artistes de smart_search.
+    """
+
+    def __init__(self, responses, latency=0.0):
+        self.responses = responses
+        self.latency = latency
+        self.calls = 0
+        self.misses = Counter()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method, params):
+        return method, tuple(sorted((k, tuple(v) if isinstance(v, list) else v)
+                                    for k, v in params.items() if k != "market"))
+
+    @classmethod
+    def from_file(cls, path, latency=0.0):
+        """Charge un enregistrement JSONL {'method', 'params', 'response'}"""
+        responses = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                responses[cls._key(entry["method"], entry["params"])] = entry["response"]
+        return cls(responses, latency=latency)
+
+    def _replay(self, method, params):
+        """Réponse enregistrée pour cet appel, ou None (absence comptée dans misses)"""
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        response = self.responses.get(self._key(method, params))
+        if response is None:
+            with self._lock:
+                self.misses[method] += 1
+        return response
+
+    def search(self, q, limit=10, offset=0, type="track", market=None):
+        response = self._replay("search", {"q": q, "limit": limit, "offset": offset, "type": type})
+        if response is None:
+            return {f"{type}s": {"items": [], "total": 0, "offset": offset, "limit": limit}}
+        return response
+
+    def artist_top_tracks(self, artist_id, country="US"):
+        response = self._replay("artist_top_tracks", {"artist_id": artist_id, "country": country})
+        return response if response is not None else {"tracks": []}
+
+    def artists(self, artists):
+        response = self._replay("artists", {"artists": list(artists)})
+        # Comme Spotify pour un id inconnu : null à sa place
+        return response if response is not None else {"artists": [None] * len(artists)}
@@ -0,0 +1,214 @@
+"""
+Test de charge : N workers Streamlit avec backend en processus contre le service partagé
+
+Simule N processus workers (comme `streamlit run` derrière un répartiteur), chacun
+avec plusieurs sessions simultanées qui enchaînent thèmes, recherches, suggestions
+et Top 10, contre le faux serveur Spotify local :
+
+- inprocess : chaque worker importe utils.back (son cache, son budget Spotify) ;
+- service   : les workers passent par utils.remote_backend vers un seul utils.service.
+
+Affiche le débit (requêtes/s), la latence p50/p99 vue par les sessions et le nombre
+d'appels reçus par le faux Spotify (dont les 429).
+
+Usage : python -m benchmarks.load_test [--workers 4] [--sessions 8] [--duration 10] [--modes inprocess,service]
+"""
+import os
+import sys
+import time
+import json
+import random
+import socket
+import argparse
+import threading
+import multiprocessing
+from urllib.request import urlopen
+
+from benchmarks.fake_server import FakeSpotifyServer
+
+QUERIES = ["love", "night", "dance", "rain", "summer", "fire", "blue", "home"]
+
+
+def _backend_env():
+    # Mesurer le backend lui-même : ni cache SQLite, ni index local, ni statistiques de genres
+    # d'une exécution précédente, ni playlists précalculées en arrière-plan dont les appels
+    # Spotify ne seraient comptés que d'un côté (avant d'importer utils.back)
+    os.environ["MOOD2MUSIC_CACHE_DB"] = ""
+    os.environ["MOOD2MUSIC_TRACK_INDEX"] = ""
+    os.environ["MOOD2MUSIC_GENRE_STATS"] = ""
+    os.environ["MOOD2MUSIC_PLAYLIST_INTERVAL"] = "0"
+
+
+def make_ops(rng, themes, count):
+    """Suite d'opérations d'une session (mélange proche de l'usage de la page d'accueil)"""
+    ops = []
+    for _ in range(count):
+        draw = rng.random()
+        if draw < 0.4:
+            ops.append(("search", "", rng.choice(themes)))
+        elif draw < 0.7:
+            ops.append(("search", rng.choice(QUERIES), rng.choice([None] + themes)))
+        elif draw < 0.9:
+            query = rng.choice(QUERIES)
+            ops.append(("suggest", query[:rng.randint(2, len(query))], None))
+        else:
+            ops.append(("top", None, None))
+    return ops
+
+
+def run_op(backend, op):
+    kind, query, theme = op
+    if kind == "search":
+        return backend.smart_search(query, theme, 20)
+    if kind == "suggest":
+        return backend.get_search_suggestions(query, 5)
+    return backend.get_top_tracks(15, 4)
+
+
+def worker(mode, index, spotify_url, service_url, sessions, duration, seed, results):
+    """Un worker : `sessions` threads qui enchaînent des opérations pendant `duration` secondes"""
+    if mode == "inprocess":
+        _backend_env()
+        from utils import back as backend
+        from utils import spotify_client
+        from benchmarks.fake_server import spotipy_client
+        spotify_client.set_client_factory(lambda: spotipy_client(spotify_url))
+    else:
+        from utils.remote_backend import RemoteBackend
+        backend = RemoteBackend(service_url, pool_size=sessions)
+
+    themes = backend.get_available_themes()[:8]   # Les thèmes proposés par la page
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def session(session_index):
+        nonlocal errors
+        rng = random.Random(seed * 1000 + index * 100 + session_index)
+        local = []
+        while time.monotonic() < deadline:
+            for op in make_ops(rng, themes, 20):
+                if time.monotonic() >= deadline:
+                    break
+                start = time.perf_counter()
+                try:
+                    run_op(backend, op)
+                except Exception:
+                    with lock:
+                        errors += 1
+                    continue
+                local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put({"latencies": latencies, "errors": errors})
+
+
+def run_service(spotify_url, port):
+    """Processus du service : backend branché sur le faux Spotify, servi par uvicorn"""
+    _backend_env()
+    from utils import spotify_client
+    from utils import service
+    from benchmarks.fake_server import spotipy_client
+    spotify_client.set_client_factory(lambda: spotipy_client(spotify_url))
+    service.main(["--port", str(port)])
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urlopen(url, timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Service injoignable : {url}")
+
+
+def _spotify_stats(server):
+    with urlopen(f"{server.url}/_stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+def run_mode(mode, args, context):
+    """Lance les workers d'un mode ; retourne le résumé"""
+    server = FakeSpotifyServer(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                               retry_after=args.retry_after).start()
+    service_process, service_url = None, None
+    try:
+        if mode == "service":
+            port = _free_port()
+            service_url = f"http://127.0.0.1:{port}"
+            service_process = context.Process(target=run_service, args=(server.url, port), daemon=True)
+            service_process.start()
+            _wait_for(f"{service_url}/health")
+
+        results = context.Queue()
+        workers = [context.Process(target=worker, args=(mode, i, server.url, service_url, args.sessions,
+                                                        args.duration, args.seed, results))
+                   for i in range(args.workers)]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        outputs = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+        wall = time.perf_counter() - start
+        stats = _spotify_stats(server)
+    finally:
+        if service_process is not None:
+            service_process.terminate()
+            service_process.join()
+        server.stop()
+
+    latencies = sorted(latency for output in outputs for latency in output["latencies"])
+    percentile = lambda q: latencies[min(len(latencies) - 1, int(q * (len(latencies) - 1)))] * 1000 if latencies else 0
+    return {
+        "requests": len(latencies),
+        "errors": sum(output["errors"] for output in outputs),
+        "throughput": len(latencies) / args.duration,
+        "p50_ms": percentile(0.5),
+        "p99_ms": percentile(0.99),
+        "wall_s": wall,
+        "spotify_calls": stats["requests"],
+        "spotify_429": stats["throttled"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="inprocess,service")
+    parser.add_argument("--workers", type=int, default=4, help="Processus workers Streamlit simulés")
+    parser.add_argument("--sessions", type=int, default=8, help="Sessions simultanées par worker")
+    parser.add_argument("--duration", type=float, default=10.0, help="Durée de chaque mode (secondes)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence du faux Spotify (s)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--rate-limit", type=float, default=50.0, help="Requêtes/s avant 429 (0 = illimité)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    context = multiprocessing.get_context("spawn")
+    print(f"{args.workers} workers × {args.sessions} sessions, {args.duration:g} s par mode, "
+          f"Spotify {args.latency * 1000:.0f} ms, limite {args.rate_limit:g} req/s")
+    for mode in args.modes.split(","):
+        summary = run_mode(mode, args, context)
+        print(f"{mode:<10} {summary['throughput']:7.1f} req/s | p50 {summary['p50_ms']:7.1f} ms | "
+              f"p99 {summary['p99_ms']:7.1f} ms | {summary['errors']} erreurs | "
+              f"{summary['spotify_calls']} appels Spotify ({summary['spotify_429']} × 429)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Campagne de benchmarks reproductible contre un faux Spotify local
+
+Lance un faux serveur de l'API Web Spotify (benchmarks.fake_server), branche le
+backend dessus avec un vrai client spotipy et exécute les scénarios de
+benchmarks.scenarios. Le rapport JSON peut être comparé à un autre avec
+benchmarks.compare.
+
+Usage :
+    python -m benchmarks.run                                  # Tous les scénarios
+    python -m benchmarks.run --scenarios theme_cold,theme_warm --latency 0.1
+    python -m benchmarks.run --throttle 0.05 --sessions 16 --out avant.json
+    python -m benchmarks.run --transport inprocess            # Sans HTTP (FakeSpotify direct)
+    python -m benchmarks.run --record spotify.jsonl           # Vrai Spotify, réponses enregistrées
+    python -m benchmarks.run --replay spotify.jsonl           # Rejoue l'enregistrement (hors ligne)
+"""
+import os
+
+# Mesurer les appels API : ni index local, ni cache SQLite, ni playlists matérialisées,
+# ni statistiques de genres d'une exécution précédente (avant d'importer le backend)
+os.environ.setdefault("MOOD2MUSIC_CACHE_DB", "")
+os.environ.setdefault("MOOD2MUSIC_TRACK_INDEX", "")
+os.environ.setdefault("MOOD2MUSIC_PLAYLIST_INTERVAL", "0")
+os.environ.setdefault("MOOD2MUSIC_GENRE_STATS", "")
+
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from utils import back
+from utils import spotify_client
+from utils.metrics import REGISTRY
+from utils.crawler import RecordingSpotify
+from benchmarks.fake_spotify import FakeSpotify, ReplaySpotify
+from benchmarks.fake_server import FakeSpotifyServer, spotipy_client
+from benchmarks.scenarios import SCENARIOS, DEFAULT_QUERY
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "reports")
+
+
+def summarize(samples):
+    """Statistiques (ms) d'une liste de durées en secondes"""
+    if not samples:
+        return {"count": 0}
+    values = sorted(s * 1000 for s in samples)
+    percentile = lambda q: values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values),
+        "p50_ms": percentile(0.5),
+        "p95_ms": percentile(0.95),
+        "max_ms": values[-1],
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _spotify_counters():
+    """Totaux cumulés (appels, 429, rejets) lus dans le registre de métriques"""
+    totals = {"api_calls": 0, "throttled": 0, "shed": 0}
+    for counter in REGISTRY.to_json()["counters"]:
+        if counter["name"] == "spotify_requests_total":
+            totals["api_calls"] += counter["value"]
+            if str(counter["labels"].get("status")) == "429":
+                totals["throttled"] += counter["value"]
+        elif counter["name"] == "spotify_shed_total":
+            totals["shed"] += counter["value"]
+    return totals
+
+
+def run_scenario(name, params):
+    """Exécute un scénario et retourne son résumé (latences, appels API, 429, rejets)"""
+    before = _spotify_counters()
+    start = time.perf_counter()
+    errors = 0
+    try:
+        samples = SCENARIOS[name](params)
+    except Exception as e:
+        print(f"  Erreur dans le scénario {name}: {e}")
+        samples, errors = [], 1
+    wall = time.perf_counter() - start
+    after = _spotify_counters()
+    deltas = {key: after[key] - before[key] for key in after}
+    return dict(summarize(samples), errors=errors, wall_s=wall, **deltas)
+
+
+def connect(args):
+    """Branche le backend sur le transport choisi ; retourne (description, fonction d'arrêt)"""
+    if args.record:
+        # Vrai client spotipy (credentials du .env), chaque réponse est enregistrée
+        spotify_client.set_client_factory(None)
+        spotify_client.set_client(RecordingSpotify(spotify_client.get_client(), args.record))
+        return f"Spotify (réponses enregistrées dans {args.record})", lambda: None
+
+    if args.transport == "inprocess":
+        fake = FakeSpotify(latency=args.latency, jitter=args.jitter, throttle_ratio=args.throttle,
+                           retry_after=args.retry_after)
+        spotify_client.set_client(fake)
+        return "FakeSpotify (en processus)", lambda: None
+
+    if args.server_url:
+        url, stop = args.server_url, lambda: None
+    else:
+        backend = ReplaySpotify.from_file(args.replay) if args.replay else None
+        server = FakeSpotifyServer(backend, latency=args.latency, jitter=args.jitter,
+                                   throttle_ratio=args.throttle, rate_limit=args.rate_limit,
+                                   retry_after=args.retry_after).start()
+        url = server.url
+
+        def stop():
+            server.stop()
+            if backend is not None and backend.misses:
+                # Appels rejoués avec un résultat vide : les mesures ne reflètent pas l'enregistrement
+                missing = ", ".join(f"{method} {count}" for method, count in backend.misses.items())
+                print(f"Attention : appels absents de l'enregistrement {args.replay} ({missing})")
+    spotify_client.set_client_factory(lambda: spotipy_client(url))
+    return f"spotipy -> {url}", stop
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="all",
+                        help=f"Scénarios séparés par des virgules parmi : {', '.join(SCENARIOS)}")
+    parser.add_argument("--transport", choices=("http", "inprocess"), default="http")
+    parser.add_argument("--server-url", help="Faux serveur déjà lancé (python -m benchmarks.fake_server)")
+    parser.add_argument("--replay", help="Enregistrement JSONL servi par le faux serveur")
+    parser.add_argument("--record", help="Exécute les scénarios contre le vrai Spotify et enregistre ses réponses "
+                                         "dans ce fichier JSONL (pour --replay)")
+    parser.add_argument("--latency", type=float, default=0.05, help="Latence par appel Spotify (s)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="Gigue ajoutée à la latence (s)")
+    parser.add_argument("--throttle", type=float, default=0.0, help="Proportion de réponses 429")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="Requêtes/s avant 429 (serveur HTTP)")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=5, help="Mesures par scénario")
+    parser.add_argument("--sessions", type=int, default=8, help="Sessions simultanées")
+    parser.add_argument("--pages", type=int, default=3, help="Pages lues par pagination étendue")
+    parser.add_argument("--theme", default="joyeux")
+    parser.add_argument("--query", default=DEFAULT_QUERY)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--label", help="Nom libre enregistré dans le rapport")
+    parser.add_argument("--out", help="Fichier du rapport JSON (défaut : benchmarks/reports/<date>.json)")
+    args = parser.parse_args(argv)
+
+    names = list(SCENARIOS) if args.scenarios == "all" else args.scenarios.split(",")
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Scénario(s) inconnu(s) : {', '.join(unknown)}")
+
+    params = {key: getattr(args, key) for key in ("repeat", "sessions", "pages", "theme", "query", "seed")}
+    transport, stop = connect(args)
+    print(f"Transport : {transport} | latence {args.latency * 1000:.0f} ms "
+          f"± {args.jitter * 1000:.0f} ms | 429 : {args.throttle:.0%}")
+
+    results = {}
+    try:
+        for name in names:
+            results[name] = summary = run_scenario(name, params)
+            if summary["count"]:
+                print(f"{name:<26} p50 {summary['p50_ms']:8.1f} ms | p95 {summary['p95_ms']:8.1f} ms | "
+                      f"{summary['api_calls']:>4} appels | {summary['throttled']:>3} × 429 | "
+                      f"{summary['shed']:>3} rejets")
+            else:
+                print(f"{name:<26} aucune mesure")
+    finally:
+        stop()
+
+    report = {
+        "meta": {
+            "label": args.label,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "transport": args.transport,
+            "config": {key: getattr(args, key) for key in
+                       ("latency", "jitter", "throttle", "rate_limit", "retry_after", "replay", "record")},
+            "params": params,
+        },
+        "scenarios": results,
+    }
+    out = args.out or os.path.join(REPORTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    directory = os.path.dirname(out)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Rapport écrit dans {out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Scénarios de benchmark du backend (utilisés par benchmarks.run)
+
+Chaque scénario reçoit les paramètres de la campagne et retourne une liste de
+durées (secondes), une par opération mesurée. Le cache est vidé avant chaque
+mesure « à froid » ; l'index local et le cache SQLite sont désactivés par run.py.
+"""
+import time
+import random
+import threading
+
+from utils import back
+from utils.scheduler import RequestScheduler
+from utils.breaker import CircuitBreaker
+from utils.genre_stats import GenreStats
+
+DEFAULT_QUERY = "love"
+
+
+def reset_backend():
+    """
+    Caches vides, budget Spotify plein et disjoncteur fermé, comme au démarrage du processus
+
+    Les statistiques de genres repartent de zéro avec une exploration à graine fixe :
+    les scénarios à froid interrogent les mêmes genres d'une exécution à l'autre.
+    """
+    back.CACHE.clear()
+    back.GENRE_STATS = GenreStats(None, rng=random.Random(0))
+    back.NEGATIVE_CACHE.clear()
+    back.BREAKER = CircuitBreaker()
+    back.SCHEDULER = RequestScheduler(breaker=back.BREAKER)
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def theme_cold(params):
+    """Top d'un thème, cache vide à chaque mesure"""
+    samples = []
+    for _ in range(params["repeat"]):
+        reset_backend()
+        samples.append(_timed(back.get_songs_by_theme, params["theme"], limit_per_genre=4, max_total=20))
+    return samples
+
+
+def theme_warm(params):
+    """Top d'un thème déjà en cache"""
+    reset_backend()
+    back.get_songs_by_theme(params["theme"], limit_per_genre=4, max_total=20)
+    return [_timed(back.get_songs_by_theme, params["theme"], limit_per_genre=4, max_total=20)
+            for _ in range(params["repeat"])]
+
+
+def smart_search_theme(params):
+    """smart_search sans texte, avec thème (cache vide)"""
+    samples = []
+    for _ in range(params["repeat"]):
+        reset_backend()
+        samples.append(_timed(back.smart_search, "", params["theme"], 20))
+    return samples
+
+
+def smart_search_query(params):
+    """smart_search textuelle sans thème (cache vide)"""
+    samples = []
+    for _ in range(params["repeat"]):
+        reset_backend()
+        samples.append(_timed(back.smart_search, params["query"], None, 20))
+    return samples
+
+
+def smart_search_query_theme(params):
+    """smart_search textuelle filtrée par thème (cache vide)"""
+    samples = []
+    for _ in range(params["repeat"]):
+        reset_backend()
+        samples.append(_timed(back.smart_search, params["query"], params["theme"], 20))
+    return samples
+
+
+def extended_pagination(params):
+    """Pages successives d'un thème avec le curseur (une mesure par page)"""
+    samples = []
+    for _ in range(params["repeat"]):
+        reset_backend()
+        cursor = None
+        for _ in range(params["pages"]):
+            start = time.perf_counter()
+            page = back.get_theme_page(params["theme"], cursor=cursor, limit=20)
+            samples.append(time.perf_counter() - start)
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+    return samples
+
+
+def concurrent_sessions(params):
+    """
+    N sessions simultanées : thème, deux pages étendues puis recherche textuelle
+
+    Les sessions tirent leurs thèmes dans un petit ensemble commun, comme des
+    utilisateurs réels : le cache et le single-flight sont donc sollicités.
+    """
+    reset_backend()
+    rng = random.Random(params["seed"])
+    themes = back.get_available_themes()
+    pool = rng.sample(themes, min(len(themes), max(2, params["sessions"] // 2)))
+    samples = []
+    lock = threading.Lock()
+
+    def session(index):
+        session_rng = random.Random(params["seed"] + index)
+        theme = session_rng.choice(pool)
+        timings = [_timed(back.smart_search, "", theme, 20)]
+        cursor = None
+        for _ in range(2):
+            start = time.perf_counter()
+            cursor = back.get_theme_page(theme, cursor=cursor, limit=20)["next_cursor"]
+            timings.append(time.perf_counter() - start)
+            if cursor is None:
+                break
+        timings.append(_timed(back.smart_search, f"{params['query']} {index % 3}", None, 20))
+        with lock:
+            samples.extend(timings)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(params["sessions"])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+SCENARIOS = {
+    "theme_cold": theme_cold,
+    "theme_warm": theme_warm,
+    "smart_search_theme": smart_search_theme,
+    "smart_search_query": smart_search_query,
+    "smart_search_query_theme": smart_search_query_theme,
+    "extended_pagination": extended_pagination,
+    "concurrent_sessions": concurrent_sessions,
+}
@@ -1,14 +1,32 @@
 import streamlit as st
-import pandas as pd
 import sys
 import os
 
 # Ajouter le répertoire parent au path pour importer back.py
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
-    from utils.back import (get_songs_by_theme, get_extended_songs_by_theme, get_songs_by_genre, 
-                           theme_to_genres, search_spotify, get_available_themes, smart_search)
-    spotify_connection_ok = True
+    if os.getenv("MOOD2MUSIC_BACKEND_URL"):
+        # Backend distant (python -m utils.service) : cache, budget Spotify et connexions
+        # partagés par tous les workers Streamlit
+        from utils.remote_backend import (get_available_themes, stream_smart_search, get_top_tracks,
+                                          has_credentials)
+    else:
+        from utils.back import (get_songs_by_theme, get_extended_songs_by_theme, get_songs_by_genre,
+                               theme_to_genres, search_spotify, get_available_themes, smart_search,
+                               stream_smart_search, get_top_tracks, warm_up)
+        from utils.spotify_client import has_credentials
+        # Index de recherche des genres et index local des morceaux chargés en arrière-plan
+        # dès l'ouverture de la page
+        warm_up()
+    from utils.track_table import render_track_table
+    from utils.thumbnails import get_default_cache as get_thumbnail_cache
+    from utils.metrics import rerun_scope
+    # Le client Spotify est créé au premier appel : vérifier seulement les credentials ici
+    spotify_connection_ok = has_credentials()
+    if not spotify_connection_ok and os.getenv("MOOD2MUSIC_BACKEND_URL"):
+        st.error(f"❌ Service backend injoignable ou sans credentials : {os.getenv('MOOD2MUSIC_BACKEND_URL')}")
+    elif not spotify_connection_ok:
+        st.error("❌ SPOTIPY_CLIENT_ID ou SPOTIPY_CLIENT_SECRET non trouvé dans .env")
 except ImportError as e:
     st.error(f"❌ Impossible d'importer le module back.py: {e}")
     st.error("Vérifiez que le fichier .env existe avec vos credentials Spotify")
@@ -18,6 +36,9 @@ except Exception as e:
     st.error("Vérifiez vos credentials dans le fichier .env")
     spotify_connection_ok = False
 
+# Mesures internes (durées de recherche) affichées sous les résultats : MOOD2MUSIC_DEBUG=1
+DEBUG = os.getenv("MOOD2MUSIC_DEBUG", "") not in ("", "0")
+
 # Inclure Ionicons dans l'application
 st.markdown("""
 <script type="module" src="https://unpkg.com/ionicons@7.1.0/dist/ionicons/ionicons.esm.js"></script>
@@ -34,24 +55,14 @@ if not spotify_connection_ok:
     st.stop()
 
 # Charger les données depuis Spotify (pour le TOP 10)
-@st.cache_data(ttl=300)  # Cache pendant 5 minutes
+# Pas de st.cache_data : le backend sert la dernière valeur connue et la rafraîchit en arrière-plan
 def load_spotify_top_tracks():
     """Charge les pistes populaires depuis différents genres"""
     if not spotify_connection_ok:
         return []
     
     try:
-        # Récupérer plusieurs genres populaires
-        popular_genres = ["pop", "rock", "hip hop", "electronic", "jazz"]
-        all_tracks = []
-        
-        for genre in popular_genres:
-            results = search_spotify(f"genre:{genre}", "track", 4)  # 4 par genre
-            all_tracks.extend(results)
-        
-        # Trier par popularité et retourner les top tracks
-        all_tracks.sort(key=lambda x: x.get('popularity', 0), reverse=True)
-        return all_tracks[:15]  # Top 15 pour avoir du choix
+        return get_top_tracks(limit=15, per_genre=4)  # Top 15 pour avoir du choix
         
     except Exception as e:
         st.error(f"Erreur lors du chargement des pistes populaires: {e}")
@@ -89,129 +100,74 @@ with col3:
 st.markdown("")  # Espace après la sélection
 
 # 🔹 RECHERCHE INTELLIGENTE UNIFIÉE
-if spotify_connection_ok:
-    try:
-        # Utiliser smart_search qui combine recherche textuelle + thème
-        search_result = smart_search(
-            query=search_query.strip() if search_query else "",
-            selected_theme=selected_theme,
-            limit=results_limit
-        )
-        
-        tracks = search_result['results']
-        search_info = search_result['search_info']
+def afficher_resultats(search_result):
+    """Affiche le message et la liste des résultats d'une recherche"""
+    tracks = search_result['results']
+    search_info = search_result['search_info']
+    
+    # Afficher le message informatif
+    if search_info.get('message'):
+        if search_info['type'] in ('no_results', 'rate_limited'):
+            st.warning(search_info['message'])
+        elif search_info['type'] == 'fallback_theme':
+            st.info(search_info['message'])
+        elif search_info['type'] == 'popular':
+            st.info("🔥 " + search_info['message'])
+        else:
+            st.success("🎵 " + search_info['message'])
+    
+    # Afficher les résultats si il y en a
+    if tracks:
+        st.markdown(f"**🎵 {len(tracks)} résultats trouvés**")
         
-        # Afficher le message informatif
-        if search_info.get('message'):
-            if search_info['type'] == 'no_results':
-                st.warning(search_info['message'])
-            elif search_info['type'] == 'fallback_theme':
-                st.info(search_info['message'])
-            elif search_info['type'] == 'popular':
-                st.info("🔥 " + search_info['message'])
-            else:
-                st.success("🎵 " + search_info['message'])
+        # Un seul élément pour toute la liste (au lieu de 6 colonnes par morceau)
+        render_track_table(tracks, thumbnail_cache=get_thumbnail_cache())
+    else:
+        st.warning("😔 Aucun résultat trouvé. Essayez avec un autre thème ou terme de recherche.")
+
+# Compter les appels Spotify déclenchés par ce rerun (métriques api_calls_per_rerun)
+with rerun_scope("landing_page"):
+    if spotify_connection_ok:
+        try:
+            # Utiliser stream_smart_search qui combine recherche textuelle + thème
+            # et remplit la liste au fur et à mesure que les genres répondent
+            results_placeholder = st.empty()
+            for search_result in stream_smart_search(
+                query=search_query.strip() if search_query else "",
+                selected_theme=selected_theme,
+                limit=results_limit
+            ):
+                if not search_result['complete'] and not search_result['results']:
+                    continue
+                with results_placeholder.container():
+                    afficher_resultats(search_result)
+                    if not search_result['complete']:
+                        st.caption("⏳ D'autres genres arrivent…")
         
-        # Afficher les résultats si il y en a
-        if tracks:
-            st.markdown(f"**🎵 {len(tracks)} résultats trouvés**")
-            st.markdown("")  # Espace
-            
-            # En-têtes des colonnes
-            col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 1.2, 1.3, 1])
-            with col1:
-                st.markdown("**<ion-icon name='musical-notes'></ion-icon> Cover**", unsafe_allow_html=True)
-            with col2:
-                st.markdown("**<ion-icon name='happy'></ion-icon> Title | <ion-icon name='library'></ion-icon> Artist**", unsafe_allow_html=True)
-            with col3:
-                st.markdown("**<ion-icon name='mic'></ion-icon> Album**", unsafe_allow_html=True)
-            with col4:
-                st.markdown("**<ion-icon name='headset'></ion-icon> Popularity**", unsafe_allow_html=True)
-            with col5:
-                st.markdown("**<ion-icon name='analytics-outline'></ion-icon> Score Spotify**", unsafe_allow_html=True)
-            with col6:
-                st.markdown("**<ion-icon name='link'></ion-icon> Spotify**", unsafe_allow_html=True)
-            
-            st.markdown("---")
-            
-            # Afficher chaque track
-            for track in tracks:
-                col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 1.2, 1.3, 1])
-                with col1:
-                    st.image(track['image'], width=60)
-                with col2:
-                    # Afficher le thème en plus si disponible
-                    theme_badge = f" | 🎭 {track.get('theme', 'N/A')}" if track.get('theme') else ""
-                    st.write(f"**{track['title']}** | {track['artist']}{theme_badge}")
-                with col3:
-                    st.markdown(f"<ion-icon name='mic'></ion-icon> {track['album']}", unsafe_allow_html=True)
-                with col4:
-                    st.markdown(f"<ion-icon name='headset'></ion-icon> {track['popularity']}/100", unsafe_allow_html=True)
-                with col5:
-                    popularity_score = track.get('popularity_score', track.get('popularity', 0))
-                    st.markdown(f"<ion-icon name='analytics-outline'></ion-icon> {popularity_score}/100", unsafe_allow_html=True)
-                with col6:
-                    if track.get('spotify_url'):
-                        st.markdown(f'<a href="{track["spotify_url"]}" target="_blank"><ion-icon name="musical-notes"></ion-icon> Écouter</a>', unsafe_allow_html=True)
-                    else:
-                        st.markdown("❌ Indisponible")
-        else:
-            st.warning("😔 Aucun résultat trouvé. Essayez avec un autre thème ou terme de recherche.")
+            timings = search_result.get('timings', {})
+            if DEBUG and timings.get('first_track') is not None:
+                st.caption(f"⏱️ Premier morceau en {timings['first_track'] * 1000:.0f} ms, "
+                           f"résultats complets en {timings['complete'] * 1000:.0f} ms")
     
-    except Exception as e:
-        st.error(f"❌ Erreur lors de la recherche: {e}")
-        st.info("💡 Essayez de changer le thème ou simplifier votre recherche.")
-else:
-    st.error("❌ Connexion Spotify indisponible")
+        except Exception as e:
+            st.error(f"❌ Erreur lors de la recherche: {e}")
+            st.info("💡 Essayez de changer le thème ou simplifier votre recherche.")
+    else:
+        st.error("❌ Connexion Spotify indisponible")
 
-# 🔹 SECTION TOP 10 POPULAIRES (Affichée quand pas de recherche)
-if not search_query and not selected_theme:
-    st.markdown("---")
-    st.markdown('<h3><ion-icon name="trophy"></ion-icon> Top 10 des pistes populaires</h3>', unsafe_allow_html=True)
-    st.markdown("")  # Espace après le sous-titre
+    # 🔹 SECTION TOP 10 POPULAIRES (Affichée quand pas de recherche)
+    if not search_query and not selected_theme:
+        st.markdown("---")
+        st.markdown('<h3><ion-icon name="trophy"></ion-icon> Top 10 des pistes populaires</h3>', unsafe_allow_html=True)
+        st.markdown("")  # Espace après le sous-titre
     
-    spotify_tracks = load_spotify_top_tracks()[:10]  # Limiter à 10 pistes
+        spotify_tracks = load_spotify_top_tracks()[:10]  # Limiter à 10 pistes
     
-    if spotify_tracks:
-        # En-têtes pour la section Top 10
-        col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 1.2, 1.3, 1])
-        
-        with col1:
-            st.markdown("**<ion-icon name='musical-notes'></ion-icon> Cover**", unsafe_allow_html=True)
-        with col2:
-            st.markdown("**<ion-icon name='happy'></ion-icon> Title | <ion-icon name='library'></ion-icon> Artist**", unsafe_allow_html=True)
-        with col3:
-            st.markdown("**<ion-icon name='mic'></ion-icon> Album**", unsafe_allow_html=True)
-        with col4:
-            st.markdown("**<ion-icon name='headset'></ion-icon> Popularity**", unsafe_allow_html=True)
-        with col5:
-            st.markdown("**<ion-icon name='analytics-outline'></ion-icon> Score Spotify**", unsafe_allow_html=True)
-        with col6:
-            st.markdown("**<ion-icon name='link'></ion-icon> Spotify**", unsafe_allow_html=True)
-        
-        st.markdown("---")  # Ligne de séparation
-        
-        # Afficher les pistes populaires depuis Spotify
-        for track in spotify_tracks:
-            col1, col2, col3, col4, col5, col6 = st.columns([1, 3, 2, 1.2, 1.3, 1])
-            with col1:
-                st.image(track['image'], width=60)
-            with col2:
-                st.write(f"**{track['title']}** | {track['artist']}")
-            with col3:
-                st.markdown(f"<ion-icon name='mic'></ion-icon> {track['album']}", unsafe_allow_html=True)
-            with col4:
-                st.markdown(f"<ion-icon name='headset'></ion-icon> {track['popularity']}/100", unsafe_allow_html=True)
-            with col5:
-                popularity_score = track.get('popularity_score', track.get('popularity', 0))
-                st.markdown(f"<ion-icon name='analytics-outline'></ion-icon> {popularity_score}/100", unsafe_allow_html=True)
-            with col6:
-                if track.get('spotify_url'):
-                    st.markdown(f'<a href="{track["spotify_url"]}" target="_blank"><ion-icon name="musical-notes"></ion-icon> Écouter</a>', unsafe_allow_html=True)
-                else:
-                    st.markdown("❌ Indisponible")
-    else:
-        st.error("❌ Erreur lors du chargement des pistes populaires.")
+        if spotify_tracks:
+            # Même rendu que la recherche, sans le badge de thème
+            render_track_table(spotify_tracks, show_theme=False, thumbnail_cache=get_thumbnail_cache())
+        else:
+            st.error("❌ Erreur lors du chargement des pistes populaires.")
 
 # Footer
 st.markdown("---")
@@ -1,62 +1,198 @@
 import os
-import pandas as pd
-from dotenv import load_dotenv
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
 import time
+import threading
 from functools import lru_cache
+from utils.fanout import fan_out, fan_out_iter
+from utils.catalog import GenreThemeIndex, load_catalog
+from utils.genre_search import GenreSearchIndex
+from utils.cache import TTLCache, TieredCache
+from utils.cache_sqlite import SQLiteCache
+from utils.singleflight import SingleFlight
+from utils.refresh import StaleWhileRevalidate
+from utils.materialize import PlaylistMaterializer
+from utils.tracks import normalize_track
+from utils.ranking import Ranking, merge_ranked, rank_tracks
+from utils.genre_stats import DEFAULT_STATS_PATH, GenreStats
+from utils.track_index import DEFAULT_INDEX_PATH, get_default_index, warm_default_index
+from utils.spotify_client import get_client
+from utils.paginator import ThemePaginator
+from utils.scheduler import RequestScheduler, RateLimited
+from utils.breaker import CircuitBreaker
+from utils.metrics import REGISTRY, instrumented, serve
+from utils.suggest import SuggestionIndex, normalize
 
-# Charger le fichier .env
-load_dotenv()
-CLIENT_ID = os.getenv("SPOTIPY_CLIENT_ID")
-CLIENT_SECRET = os.getenv("SPOTIPY_CLIENT_SECRET")
+# 🔹 Cache pour améliorer les performances (borné, thread-safe, TTL par namespace)
+CACHE_DURATION = 300  # 5 minutes en secondes
+CACHE_TTLS = {
+    "genre": 600,     # Morceaux d'un genre
+    "theme": 300,     # Top d'un thème
+    "search": 120,    # Résultats de smart_search
+    "popular": 600,   # Morceaux populaires
+    "suggest": 600,   # Suggestions Spotify (quand l'index local ne suffit pas)
+    "artist": 3600,   # Top tracks d'un artiste (changent lentement)
+    "artist_genres": 7 * 86400,  # Genres d'un artiste (quasi stables)
+}
 
-if not CLIENT_ID or not CLIENT_SECRET:
-    raise Exception("SPOTIPY_CLIENT_ID ou SPOTIPY_CLIENT_SECRET non trouvé dans .env")
+# 🔹 Cache persistant : les listes de morceaux survivent aux redémarrages
+# (MOOD2MUSIC_CACHE_DB="" désactive la persistance)
+CACHE_DB_PATH = os.getenv(
+    "MOOD2MUSIC_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), '.cache', 'mood2music.sqlite')
+)
+PERSISTENT_NAMESPACES = ("genre", "popular", "search", "artist", "artist_genres")
 
-# 🔹 Initialisation Spotipy
-sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET
-))
+# 🔹 Stale-while-revalidate : une entrée expirée reste servable au plus 1 heure
+CACHE_MAX_STALENESS = 3600
 
-# 🔹 Cache pour améliorer les performances
-CACHE = {}
-CACHE_DURATION = 300  # 5 minutes en secondes
+CACHE = TTLCache(default_ttl=CACHE_DURATION, namespace_ttls=CACHE_TTLS, max_staleness=CACHE_MAX_STALENESS)
+if CACHE_DB_PATH:
+    CACHE = TieredCache(CACHE, SQLiteCache(CACHE_DB_PATH, default_ttl=CACHE_DURATION),
+                        persistent_namespaces=PERSISTENT_NAMESPACES)
+
+# 🔹 Cache négatif : « aucun résultat » et erreurs, gardés peu de temps et à part des vraies
+# valeurs (en mémoire seulement) ; après une erreur, la dernière bonne valeur reste servie
+NEGATIVE_TTLS = {
+    "empty": 120,     # Réponse vide de Spotify
+    "error": 15,      # Échec de l'appel
+}
+NEGATIVE_CACHE = TTLCache(default_ttl=15, namespace_ttls=NEGATIVE_TTLS)
+
+# 🔹 Regroupement des requêtes identiques simultanées (single-flight)
+FLIGHTS = SingleFlight()
+
+# 🔹 Rafraîchissement en arrière-plan des thèmes et des morceaux populaires
+REFRESHER = StaleWhileRevalidate(CACHE, FLIGHTS)
+
+# 🔹 Tous les appels Spotify passent par un budget commun (seau à jetons + Retry-After),
+# les recherches interactives avant les rafraîchissements en arrière-plan ; après des échecs
+# répétés, le disjoncteur refuse les appels tout de suite (la dernière valeur connue est servie)
+BREAKER = CircuitBreaker()
+SCHEDULER = RequestScheduler(breaker=BREAKER)
+
+def spotify():
+    """Client Spotify dont chaque appel passe par SCHEDULER"""
+    return SCHEDULER.wrap(get_client())
+
+def _last_good(namespace, cache_key, default):
+    """Dernière valeur mise en cache pour cache_key (même expirée), sinon default"""
+    stale = CACHE.get_stale(namespace, cache_key)
+    return stale[0] if stale is not None else default
 
-def get_from_cache(key):
-    """Récupère une valeur du cache si elle n'est pas expirée"""
-    if key in CACHE:
-        data, timestamp = CACHE[key]
-        if time.time() - timestamp < CACHE_DURATION:
-            return data
+def _remember_negative(kind, namespace, cache_key, value):
+    """
+    Garde une réponse négative ('empty' ou 'error') pour cache_key, avec un TTL court
+    
+    Returns:
+        La réponse à servir : value, ou après une erreur la dernière bonne valeur si elle existe
+    """
+    NEGATIVE_CACHE.set(kind, cache_key, value)
+    return _last_good(namespace, cache_key, value) if kind == "error" else value
+
+def _serve_negative(namespace, cache_key):
+    """Réponse négative récente pour cache_key (voir _remember_negative), ou None s'il n'y en a pas"""
+    empty = NEGATIVE_CACHE.get("empty", cache_key)
+    if empty is not None:
+        return empty
+    error = NEGATIVE_CACHE.get("error", cache_key)
+    return _last_good(namespace, cache_key, error) if error is not None else None
+
+# 🔹 Métriques : compteurs du cache, de l'ordonnanceur et du single-flight publiés à l'export
+def _collect_backend_metrics():
+    samples = []
+    cache_stats = CACHE.stats()
+    for namespace, counters in cache_stats.get("namespaces", {}).items():
+        for name, value in counters.items():
+            samples.append((f"cache_{name}_total", "counter", {"namespace": namespace}, value))
+    samples.append(("cache_entries", "gauge", {}, cache_stats.get("entries", 0)))
+    samples.append(("cache_bytes", "gauge", {}, cache_stats.get("bytes", 0)))
+    for namespace, counters in NEGATIVE_CACHE.stats().get("namespaces", {}).items():
+        for name, value in counters.items():
+            samples.append((f"cache_{name}_total", "counter", {"namespace": f"negative_{namespace}"}, value))
+    
+    scheduler_stats = SCHEDULER.stats()
+    samples.append(("scheduler_tokens", "gauge", {}, scheduler_stats["tokens"]))
+    samples.append(("scheduler_blocked_seconds", "gauge", {}, scheduler_stats["blocked_for"]))
+    samples.append(("scheduler_throttled_total", "counter", {}, scheduler_stats["throttled"]))
+    for name, queue in scheduler_stats["queues"].items():
+        samples.append(("scheduler_queue_depth", "gauge", {"priority": name}, queue["depth"]))
+    
+    breaker_stats = BREAKER.stats()
+    samples.append(("spotify_circuit_state", "gauge", {}, breaker_stats["state_value"]))
+    
+    for name, value in FLIGHTS.stats().items():
+        if name == "in_flight":
+            samples.append(("singleflight_in_flight", "gauge", {}, value))
+        else:
+            samples.append((f"singleflight_{name}_total", "counter", {}, value))
+    for name, value in REFRESHER.stats().items():
+        if name == "pending":
+            samples.append(("refresh_pending", "gauge", {}, value))
         else:
-            # Cache expiré, le supprimer
-            del CACHE[key]
-    return None
+            samples.append((f"refresh_{name}_total", "counter", {}, value))
+    
+    genre_stats = GENRE_STATS.stats()
+    samples.append(("genre_stats_genres", "gauge", {}, genre_stats["genres"]))
+    samples.append(("genre_stats_suppressed_genres", "gauge", {}, genre_stats["suppressed_genres"]))
+    samples.append(("genre_selection_total", "counter", {}, genre_stats["selections"]))
+    samples.append(("genre_selection_explored_total", "counter", {}, genre_stats["explored"]))
+    samples.append(("genre_selection_skipped_total", "counter", {}, genre_stats["suppressed"]))
+    
+    playlist_stats = PLAYLISTS.stats()
+    samples.append(("playlist_snapshot_playlists", "gauge", {}, playlist_stats["playlists"]))
+    if playlist_stats["age_seconds"] is not None:
+        samples.append(("playlist_snapshot_age_seconds", "gauge", {}, playlist_stats["age_seconds"]))
+    return samples
+
+REGISTRY.register_collector(_collect_backend_metrics)
+
+# Serveur local /metrics (Prometheus) et /metrics.json, si MOOD2MUSIC_METRICS_PORT est défini
+METRICS_PORT = os.getenv("MOOD2MUSIC_METRICS_PORT")
+if METRICS_PORT:
+    try:
+        serve(int(METRICS_PORT))
+    except (OSError, ValueError) as e:
+        print(f"Serveur de métriques non démarré: {e}")
+
+# 🔹 Index local construit par le crawler (python -m utils.crawler)
+# (MOOD2MUSIC_TRACK_INDEX="" désactive l'index)
+TRACK_INDEX_PATH = os.getenv("MOOD2MUSIC_TRACK_INDEX", DEFAULT_INDEX_PATH)
 
-def save_to_cache(key, data):
-    """Sauvegarde une valeur dans le cache avec timestamp"""
-    CACHE[key] = (data, time.time())
+# 🔹 Suggestions de recherche : trie local des artistes et titres déjà vus
+# (recherches, thèmes, genres, et les plus populaires de l'index du crawler)
+SUGGESTIONS = SuggestionIndex()
+SUGGESTIONS_SEED_TRACKS = 10000   # Morceaux de l'index local chargés dans le trie
+_suggestions_seeded = threading.Event()
+_suggestions_seed_lock = threading.Lock()
 
-# Charger le mapping genres -> thèmes depuis le CSV
+# 🔹 Rendement des genres (morceaux reçus par appel), partagé par les workers : choisit les
+# genres interrogés pour un thème (MOOD2MUSIC_GENRE_STATS="" : statistiques en mémoire seulement)
+GENRE_STATS_PATH = os.getenv("MOOD2MUSIC_GENRE_STATS", DEFAULT_STATS_PATH)
+GENRE_STATS = GenreStats(GENRE_STATS_PATH or None)
+THEME_GENRES = 5               # Genres interrogés par thème
+
+# 🔹 Fan-out concurrent des requêtes par genre
+THEME_MAX_IN_FLIGHT = 5        # Les 5 genres d'un thème partent en parallèle
+THEME_DEADLINE = 4.0           # Délai max pour get_songs_by_theme (secondes)
+EXTENDED_MAX_IN_FLIGHT = 8     # Requêtes simultanées pour les résultats étendus
+EXTENDED_DEADLINE = 8.0        # Délai max pour get_extended_songs_by_theme (secondes)
+ARTIST_MAX_IN_FLIGHT = 10      # Top tracks des artistes trouvés, en parallèle
+ARTIST_DEADLINE = 4.0          # Délai max pour l'expansion des artistes (secondes)
+ARTIST_TOP_TRACKS = 5          # Morceaux gardés par artiste
+ARTIST_BATCH_SIZE = 50         # Artistes par appel à l'endpoint several-artists
+CATALOG_MATCH_SCORE = 0.9      # Score minimum pour qu'une requête désigne un genre/thème du catalogue
+CATALOG_MATCH_GENRES = 3       # Genres au plus utilisés pour une requête reconnue
+
+# 🔹 Playlists matérialisées : top de chaque thème (aux tailles proposées par la page)
+# et Top 10 de l'accueil, reconstruits en arrière-plan (0 = désactivé)
+PLAYLIST_REFRESH_INTERVAL = float(os.getenv("MOOD2MUSIC_PLAYLIST_INTERVAL", "600"))
+PLAYLIST_SIZES = (10, 20, 50)
+PLAYLIST_LIMIT_PER_GENRE = 4   # Comme la recherche par thème de smart_search
+
+# Charger le mapping genres -> thèmes depuis le catalogue compilé (recompilé si le CSV change)
 def load_genre_themes():
-    """Charge le mapping genres -> thèmes depuis le fichier CSV"""
+    """Charge le mapping thème -> genres depuis le catalogue compilé du fichier CSV"""
     try:
-        csv_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'spotify_genres_themes.csv')
-        df = pd.read_csv(csv_path)
-        
-        # Créer un dictionnaire thème -> liste de genres
-        theme_to_genres = {}
-        for _, row in df.iterrows():
-            theme = row['theme']
-            genre = row['genre']
-            
-            if theme not in theme_to_genres:
-                theme_to_genres[theme] = []
-            theme_to_genres[theme].append(genre)
-        
-        return theme_to_genres
+        return load_catalog().theme_to_genres
     except Exception as e:
         print(f"Erreur lors du chargement du fichier CSV: {e}")
         # Fallback sur l'ancien mapping
@@ -80,117 +216,288 @@ def get_genres_for_theme(theme):
     """Retourne les genres associés à un thème"""
     return theme_to_genres.get(theme, [])
 
+# 🔹 Index inverse genre -> thèmes (clés canoniques : casse, tirets et accents ignorés), construit au premier usage
+@lru_cache(maxsize=1)
+def get_genre_theme_index():
+    """Retourne l'index inverse immuable genre -> thèmes"""
+    return GenreThemeIndex(theme_to_genres)
+
+def get_themes_for_genre(genre):
+    """Retourne les thèmes associés à un genre (tuple vide si le genre est inconnu)"""
+    return get_genre_theme_index().themes_for(genre)
+
+def classify_genres(genres):
+    """Compte, pour chaque thème, les genres de la liste qui y mènent (Counter)"""
+    return get_genre_theme_index().classify(genres)
+
+# 🔹 Recherche approximative (trigrammes) dans les ~6 100 genres et les thèmes du catalogue
+# (~200 ms de construction, au premier usage ou en arrière-plan via warm_genre_search_index :
+# rien n'est lancé à l'import, qui reste léger pour les scripts et benchmarks)
+_genre_search_index = None
+_genre_search_lock = threading.Lock()
+_genre_search_warming = threading.Event()
+
+def get_genre_search_index():
+    """Retourne l'index de recherche des genres et thèmes (attend la fin de sa construction)"""
+    global _genre_search_index
+    if _genre_search_index is None:
+        with _genre_search_lock:
+            if _genre_search_index is None:
+                entries = [("theme", theme) for theme in theme_to_genres]
+                entries += [("genre", genre) for genres in theme_to_genres.values() for genre in genres]
+                _genre_search_index = GenreSearchIndex(entries)
+    return _genre_search_index
+
+def warm_genre_search_index():
+    """Construit l'index de recherche des genres en arrière-plan (une seule fois) avant les premières recherches"""
+    if _genre_search_index is not None or _genre_search_warming.is_set():
+        return
+    _genre_search_warming.set()
+    threading.Thread(target=get_genre_search_index, name="mood2music-genre-search", daemon=True).start()
+
+def warm_up():
+    """
+    Prépare en arrière-plan les index chargés au premier usage (au démarrage du service ou de la page)
+
+    L'index local des morceaux est lu sans verrou pendant son chargement : les premières
+    requêtes de genre passent par le cache et Spotify au lieu d'attendre la fin de la lecture.
+    """
+    warm_genre_search_index()
+    warm_default_index(TRACK_INDEX_PATH)
+
+def search_genres(query, limit=10, kind=None):
+    """
+    Recherche les genres et thèmes du catalogue proches d'un texte libre
+    
+    Args:
+        query (str): Texte libre (ex. « synthwave », « jazz piano »)
+        limit (int): Nombre maximum de résultats
+        kind (str): Limiter à "genre" ou "theme"
+    
+    Returns:
+        list: Dicts {'type', 'name', 'score', 'themes'}, par score décroissant
+    """
+    matches = get_genre_search_index().search(query, limit, kind=kind)
+    for match in matches:
+        match['themes'] = [match['name']] if match['type'] == "theme" else list(get_themes_for_genre(match['name']))
+    return matches
+
 # Fonction pour récupérer les morceaux par genre avec cache
+@instrumented
 def get_songs_by_genre(genre, limit=5):
     """Récupère les morceaux par genre avec mise en cache"""
+    try:
+        return _get_songs_by_genre(genre, limit)
+    except RateLimited as e:
+        print(f"Spotify saturé pour le genre {genre}: {e}")
+        return []
+
+def _get_songs_by_genre(genre, limit):
+    """Comme get_songs_by_genre, mais lève RateLimited si Spotify est saturé et le cache vide"""
+    # Servir depuis l'index local si le genre a été crawlé (pas d'attente pendant son chargement)
+    index = get_default_index(TRACK_INDEX_PATH, wait=False)
+    if index is not None and index.has_genre(genre):
+        return index.songs_for_genre(genre, limit)
+    
     cache_key = f"genre_{genre}_{limit}"
     
     # Vérifier le cache d'abord
-    cached_result = get_from_cache(cache_key)
+    cached_result = CACHE.get("genre", cache_key)
     if cached_result is not None:
         return cached_result
     
+    # Genre vide ou en erreur il y a peu : ne pas redemander à Spotify tout de suite
+    negative = _serve_negative("genre", cache_key)
+    if negative is not None:
+        return negative
+    
+    # Un seul appel Spotify pour toutes les sessions qui ratent le cache en même temps
+    return FLIGHTS.do(cache_key, lambda: _fetch_songs_by_genre(genre, limit, cache_key))
+
+def _fetch_songs_by_genre(genre, limit, cache_key):
+    """Interroge Spotify pour un genre et met le résultat en cache"""
     try:
-        results = sp.search(q=f'genre:"{genre}"', type='track', limit=limit)
+        results = spotify().search(q=f'genre:"{genre}"', type='track', limit=limit)
         
-        if not results or 'tracks' not in results or not results['tracks']:
-            save_to_cache(cache_key, [])
-            return []
-            
-        songs = []
-        for item in results['tracks']['items']:
-            if not item:
-                continue
-                
-            # Vérifier si l'image existe
-            image_url = "https://via.placeholder.com/300x300?text=No+Image"
-            if item.get('album') and item['album'].get('images') and len(item['album']['images']) > 0:
-                image_url = item['album']['images'][0]['url']
-                
-            songs.append({
-                "title": item.get('name', 'Titre inconnu'),
-                "artist": item['artists'][0]['name'] if item.get('artists') and len(item['artists']) > 0 else 'Artiste inconnu',
-                "album": item['album']['name'] if item.get('album') else 'Album inconnu',
-                "popularity": item.get('popularity', 0),
-                "popularity_score": item.get('popularity', 0),  # Score Spotify (0-100)
-                "genre": genre,
-                "image": image_url,
-                "spotify_url": item.get('external_urls', {}).get('spotify', ''),
-                "preview_url": item.get('preview_url', '')
-            })
+        items = ((results or {}).get('tracks') or {}).get('items') or []
+        songs = [normalize_track(item, genre) for item in items if item]
+        # Triés par popularité, comme ceux de l'index local : les thèmes les fusionnent (merge_ranked)
+        songs.sort(key=lambda x: x['popularity'], reverse=True)
+        GENRE_STATS.record(genre, limit, songs)
+        
+        if not songs:
+            return _remember_negative("empty", "genre", cache_key, [])
         
         # Mettre en cache le résultat
-        save_to_cache(cache_key, songs)
+        CACHE.set("genre", cache_key, songs)
+        SUGGESTIONS.add_tracks(songs)
         return songs
         
+    except RateLimited:
+        # Servir la dernière valeur connue, même expirée ; ne jamais cacher de liste vide
+        stale = CACHE.get_stale("genre", cache_key)
+        if stale is not None:
+            return stale[0]
+        raise
     except Exception as e:
         print(f"Erreur lors de la recherche pour le genre {genre}: {e}")
-        save_to_cache(cache_key, [])  # Cache le résultat vide aussi
-        return []
+        GENRE_STATS.record(genre, limit, error=True)
+        # Erreur gardée peu de temps, à part : la dernière liste connue reste servie
+        return _remember_negative("error", "genre", cache_key, [])
+
+def get_genre_yield_report(themes=None):
+    """Rendement des genres de chaque thème (voir GenreStats.report), les moins rentables d'abord"""
+    return GENRE_STATS.report(theme_to_genres, themes)
 
 # Fonction pour récupérer les morceaux par thème avec cache
+@instrumented
 def get_songs_by_theme(theme, limit_per_genre=2, max_total=10):
     """Récupère les morceaux les plus streamés pour un thème donné avec cache"""
-    cache_key = f"theme_{theme}_{limit_per_genre}_{max_total}"
-    
-    # Vérifier le cache d'abord
-    cached_result = get_from_cache(cache_key)
-    if cached_result is not None:
-        return cached_result
-    
     if theme not in theme_to_genres:
         raise ValueError(f"Thème inconnu : {theme}")
     
-    all_songs = []
-    genres = get_genres_for_theme(theme)
+    cache_key = f"theme_{theme}_{limit_per_genre}_{max_total}"
     
-    # Limiter le nombre de genres pour éviter trop de requêtes
-    selected_genres = genres[:5] if len(genres) > 5 else genres
+    # Servir le cache (même expiré) et rafraîchir en arrière-plan si besoin
+    return REFRESHER.get("theme", cache_key,
+                         lambda: _build_songs_by_theme(theme, limit_per_genre, max_total, cache_key))
+
+def _build_songs_by_theme(theme, limit_per_genre, max_total, cache_key):
+    """Construit le top d'un thème depuis ses genres et le met en cache"""
+    result = []
+    for result in _iter_songs_by_theme(theme, limit_per_genre, max_total, cache_key):
+        pass
+    return result
+
+def _iter_songs_by_theme(theme, limit_per_genre, max_total, cache_key):
+    """Construit le top d'un thème en produisant le classement courant à chaque genre reçu"""
+    genre_lists = []
+    genres = get_genres_for_theme(theme)
     
-    for genre in selected_genres:
-        songs = get_songs_by_genre(genre, limit=limit_per_genre)
-        for song in songs:
-            song['theme'] = theme  # Ajouter le thème à chaque chanson
-        all_songs.extend(songs)
+    # Limiter le nombre de genres pour éviter trop de requêtes : les plus rentables d'abord,
+    # sans ceux qui reviennent vides (avec un peu d'exploration)
+    selected_genres = GENRE_STATS.select(genres, THEME_GENRES)
     
-    # Trier par popularité (streams estimés)
-    all_songs.sort(key=lambda x: x['popularity'], reverse=True)
+    # Interroger les genres en parallèle (résultats partiels si le délai est dépassé
+    # ou si Spotify est saturé : le thème n'est alors pas mis en cache)
+    stream = fan_out_iter(
+        lambda genre: _get_songs_by_genre(genre, limit_per_genre),
+        selected_genres,
+        max_in_flight=THEME_MAX_IN_FLIGHT,
+        deadline=THEME_DEADLINE
+    )
+    while True:
+        try:
+            genre, songs = next(stream)
+        except StopIteration as stop:
+            complete = stop.value
+            break
+        if not songs:
+            continue
+        # Listes par genre triées par popularité : fusion k-voies qui n'en lit que le début ;
+        # un morceau présent dans plusieurs genres n'est gardé qu'une fois (ses genres sont réunis)
+        genre_lists.append(songs)
+        yield merge_ranked(genre_lists, max_total, theme=theme)
     
     # Retourner les meilleures chansons
-    result = all_songs[:max_total]
+    result = merge_ranked(genre_lists, max_total, theme=theme)
     
-    # Mettre en cache le résultat
-    save_to_cache(cache_key, result)
-    return result
+    # Ne mettre en cache que les résultats complets
+    if complete:
+        CACHE.set("theme", cache_key, result)
+    yield result
 
-# Fonction pour obtenir plus de chansons d'un thème
-def get_extended_songs_by_theme(theme, offset=0, limit=20):
-    """Récupère plus de chansons pour un thème avec pagination"""
+def stream_songs_by_theme(theme, limit_per_genre=2, max_total=10):
+    """
+    Variante progressive de get_songs_by_theme
+    
+    Yields:
+        list: Classement courant des morceaux, mis à jour à chaque genre reçu
+            (le dernier élément produit est le résultat final)
+    """
     if theme not in theme_to_genres:
         raise ValueError(f"Thème inconnu : {theme}")
     
-    all_songs = []
-    genres = get_genres_for_theme(theme)
+    cache_key = f"theme_{theme}_{limit_per_genre}_{max_total}"
     
-    # Utiliser plus de genres pour les résultats étendus
-    songs_per_genre = max(3, limit // len(genres)) if genres else 3
+    # Déjà en cache (même expiré) : une seule réponse immédiate
+    cached_result = REFRESHER.get_cached(
+        "theme", cache_key, lambda: _build_songs_by_theme(theme, limit_per_genre, max_total, cache_key))
+    if cached_result is not None:
+        yield cached_result
+        return
+    
+    yield from _iter_songs_by_theme(theme, limit_per_genre, max_total, cache_key)
+
+# Récupérer une page de morceaux d'un genre (offset Spotify) avec cache
+@instrumented
+def get_genre_page(genre, offset=0, limit=10):
+    """Récupère les morceaux d'un genre à partir d'un offset, avec mise en cache"""
+    index = get_default_index(TRACK_INDEX_PATH, wait=False)
+    if index is not None and index.has_genre(genre):
+        return index.songs_for_genre(genre, offset + limit)[offset:]
     
-    for genre in genres:
-        songs = get_songs_by_genre(genre, limit=songs_per_genre)
-        for song in songs:
-            song['theme'] = theme
-        all_songs.extend(songs)
+    cache_key = f"genre_page_{genre}_{offset}_{limit}"
+    cached_result = CACHE.get("genre", cache_key)
+    if cached_result is not None:
+        return cached_result
     
-    # Trier par popularité
-    all_songs.sort(key=lambda x: x['popularity'], reverse=True)
+    return FLIGHTS.do(cache_key, lambda: _fetch_genre_page(genre, offset, limit, cache_key))
+
+def _fetch_genre_page(genre, offset, limit, cache_key):
+    """Interroge Spotify pour une page d'un genre et met le résultat en cache"""
+    results = spotify().search(q=f'genre:"{genre}"', type='track', limit=limit, offset=offset)
+    items = (results or {}).get('tracks', {}).get('items') or []
+    songs = [normalize_track(item, genre) for item in items if item]
+    if offset == 0:
+        # Plus loin, une page courte signifie seulement que le genre est épuisé
+        GENRE_STATS.record(genre, limit, songs)
+    CACHE.set("genre", cache_key, songs)
+    SUGGESTIONS.add_tracks(songs)
+    return songs
+
+# Fonction pour parcourir un thème page par page avec un curseur
+@instrumented
+def get_theme_page(theme, cursor=None, limit=20):
+    """
+    Récupère une page de morceaux d'un thème, sans parcourir tous ses genres
     
-    # Appliquer pagination
-    start_idx = offset
-    end_idx = offset + limit
+    Args:
+        theme (str): Thème
+        cursor (str): Curseur renvoyé par l'appel précédent (None pour la première page)
+        limit (int): Nombre de morceaux par page
     
-    return all_songs[start_idx:end_idx]
+    Returns:
+        dict: {
+            'results': liste des tracks,
+            'next_cursor': curseur de la page suivante (None si le thème est épuisé)
+        }
+    """
+    if theme not in theme_to_genres:
+        raise ValueError(f"Thème inconnu : {theme}")
+    
+    paginator = ThemePaginator(
+        get_genres_for_theme(theme),
+        get_genre_page,
+        max_in_flight=EXTENDED_MAX_IN_FLIGHT,
+        deadline=EXTENDED_DEADLINE
+    )
+    songs, next_cursor = paginator.page(limit, cursor)
+    return {
+        'results': [dict(song, theme=theme) for song in songs],
+        'next_cursor': next_cursor
+    }
+
+# Fonction pour obtenir plus de chansons d'un thème
+@instrumented
+def get_extended_songs_by_theme(theme, offset=0, limit=20):
+    """Récupère plus de chansons pour un thème avec pagination"""
+    # Les pages précédentes sont relues depuis le cache : seules les nouvelles pages coûtent des appels
+    page = get_theme_page(theme, limit=offset + limit)
+    return page['results'][offset:offset + limit]
 
 # 🔹 Fonction de recherche intelligente combinée (NOUVELLE)
+@instrumented
 def smart_search(query, selected_theme=None, limit=20):
     """
     Recherche intelligente qui combine recherche textuelle et filtrage par thème
@@ -207,26 +514,52 @@ def smart_search(query, selected_theme=None, limit=20):
             'search_info': infos sur la recherche
         }
     """
+    # Thème seul : lecture en mémoire de la playlist matérialisée quand elle existe
+    if selected_theme and not (query and query.strip()):
+        materialized = _materialized(("theme", selected_theme, limit))
+        if materialized is not None:
+            return {
+                'results': materialized,
+                'total_found': len(materialized),
+                'search_info': _theme_only_info(selected_theme)
+            }
+    
     cache_key = f"smart_search_{query}_{selected_theme}_{limit}"
     
     # Vérifier le cache
-    cached_result = get_from_cache(cache_key)
+    cached_result = CACHE.get("search", cache_key)
     if cached_result is not None:
         return cached_result
     
+    # Aucun résultat ou erreur il y a peu : même réponse, sans rappeler Spotify
+    negative = _serve_negative("search", cache_key)
+    if negative is not None:
+        return negative
+    
+    return FLIGHTS.do(cache_key, lambda: _run_smart_search(query, selected_theme, limit, cache_key))
+
+def _theme_only_info(theme):
+    return {
+        'type': 'theme_only',
+        'theme': theme,
+        'message': f"Musiques du thème '{theme}'"
+    }
+
+def _run_smart_search(query, selected_theme, limit, cache_key):
+    """Exécute smart_search sans passer par le cache et met le résultat en cache"""
     results = []
     search_info = {}
     
     try:
+        # Une requête qui désigne un genre ou un thème du catalogue est servie par genre
+        catalog_result = _search_catalog_match(query, selected_theme, limit) if query and query.strip() else None
+        
         # 1. Si pas de terme de recherche, utiliser seulement le thème
         if not query or query.strip() == "":
             if selected_theme:
-                results = get_songs_by_theme(selected_theme, limit_per_genre=4, max_total=limit)
-                search_info = {
-                    'type': 'theme_only',
-                    'theme': selected_theme,
-                    'message': f"Musiques du thème '{selected_theme}'"
-                }
+                results = get_songs_by_theme(selected_theme, limit_per_genre=PLAYLIST_LIMIT_PER_GENRE,
+                                             max_total=limit)
+                search_info = _theme_only_info(selected_theme)
             else:
                 # Pas de recherche ni thème - retourner top tracks populaires
                 results = get_popular_tracks(limit)
@@ -235,44 +568,35 @@ def smart_search(query, selected_theme=None, limit=20):
                     'message': "Top musiques populaires"
                 }
         
-        # 2. Recherche textuelle avec thème optionnel
+        # 2. Requête reconnue comme genre(s) ou thème du catalogue (« synthwave », « calme »)
+        elif catalog_result:
+            results, search_info = catalog_result
+        
+        # 3. Recherche textuelle avec thème optionnel
         else:
             # Recherche de base
-            spotify_results = sp.search(q=query, type='track', limit=limit*2)  # Plus pour filtrer
+            spotify_results = spotify().search(q=query, type='track', limit=limit*2)  # Plus pour filtrer
             
-            if spotify_results and 'tracks' in spotify_results and spotify_results['tracks']['items']:
-                for item in spotify_results['tracks']['items']:
-                    if not item:
-                        continue
-                    
-                    # Vérifier si l'image existe
-                    image_url = "https://via.placeholder.com/300x300?text=No+Image"
-                    if item.get('album') and item['album'].get('images') and len(item['album']['images']) > 0:
-                        image_url = item['album']['images'][0]['url']
-                    
-                    # Déterminer le thème de cette track (basé sur les genres de l'artiste)
-                    track_theme = selected_theme or detect_track_theme(item)
-                    
-                    track_data = {
-                        "title": item.get('name', 'Titre inconnu'),
-                        "artist": item['artists'][0]['name'] if item.get('artists') and len(item['artists']) > 0 else 'Artiste inconnu',
-                        "album": item['album']['name'] if item.get('album') else 'Album inconnu',
-                        "popularity": item.get('popularity', 0),
-                        "popularity_score": item.get('popularity', 0),
-                        "genre": "search_result",
-                        "theme": track_theme,
-                        "image": image_url,
-                        "spotify_url": item.get('external_urls', {}).get('spotify', ''),
-                        "preview_url": item.get('preview_url', '')
-                    }
-                    
-                    # Filtrer par thème si sélectionné
-                    if not selected_theme or track_theme == selected_theme:
-                        results.append(track_data)
+            items = [item for item in ((spotify_results or {}).get('tracks') or {}).get('items') or [] if item]
+            
+            # Genres des artistes principaux de la page : un seul appel groupé (et souvent aucun, grâce au cache)
+            artist_genres = get_artists_genres([item['artists'][0].get('id') for item in items if item.get('artists')])
+            
+            for item in items:
+                # Déterminer le thème de cette track (vote des genres de ses artistes)
+                votes = _track_theme_votes(item, artist_genres)
                 
-                # Trier par popularité
-                results.sort(key=lambda x: x['popularity'], reverse=True)
-                results = results[:limit]
+                # Filtrer par thème si sélectionné
+                if selected_theme and selected_theme not in votes:
+                    continue
+                
+                track_theme = selected_theme or _majority_theme(votes)
+                results.append(normalize_track(item, "search_result", theme=track_theme))
+            
+            if results:
+                # Garder les plus populaires
+                results = rank_tracks(results, limit)
+                SUGGESTIONS.add_tracks(results)
                 
                 search_info = {
                     'type': 'search_with_theme' if selected_theme else 'search_only',
@@ -299,83 +623,346 @@ def smart_search(query, selected_theme=None, limit=20):
                         'message': f"Aucun résultat trouvé pour '{query}'"
                     }
     
+    except RateLimited as e:
+        print(f"Spotify saturé dans smart_search: {e}")
+        # Servir l'ancien résultat de cette recherche plutôt qu'une erreur
+        stale = CACHE.get_stale("search", cache_key)
+        if stale is not None:
+            return stale[0]
+        return {
+            'results': [],
+            'total_found': 0,
+            'search_info': {
+                'type': 'rate_limited',
+                'message': "Spotify est très sollicité, réessayez dans quelques secondes"
+            }
+        }
     except Exception as e:
         print(f"Erreur dans smart_search: {e}")
+        # Erreur gardée peu de temps, à part : la dernière recherche réussie reste servie
+        return _remember_negative("error", "search", cache_key, {
+            'results': [],
+            'total_found': 0,
+            'search_info': {
+                'type': 'error',
+                'message': "Erreur lors de la recherche"
+            }
+        })
+    
+    # Préparer le résultat final
+    final_result = {
+        'results': results,
+        'total_found': len(results),
+        'search_info': search_info
+    }
+    
+    # Mettre en cache (une recherche sans résultat seulement pour peu de temps)
+    if results:
+        CACHE.set("search", cache_key, final_result)
+    else:
+        _remember_negative("empty", "search", cache_key, final_result)
+    return final_result
+
+def _search_catalog_match(query, selected_theme, limit):
+    """
+    Résout une requête en genres ou thème du catalogue et récupère leurs morceaux
+    
+    Returns:
+        tuple: (résultats, search_info), ou None si la requête ne désigne rien du
+        catalogue (ou si les genres trouvés n'ont aucun morceau)
+    """
+    matches = [match for match in search_genres(query, limit=CATALOG_MATCH_GENRES + 1)
+               if match['score'] >= CATALOG_MATCH_SCORE
+               and (not selected_theme or selected_theme in match['themes'])]
+    if not matches:
+        return None
+    
+    if matches[0]['type'] == "theme":
+        theme = matches[0]['name']
+        results = get_songs_by_theme(theme, limit_per_genre=4, max_total=limit)
+        return (results, {
+            'type': 'theme_match',
+            'query': query,
+            'theme': theme,
+            'message': f"Musiques du thème '{theme}'"
+        }) if results else None
+    
+    genres = [match for match in matches if match['type'] == "genre"][:CATALOG_MATCH_GENRES]
+    per_genre = max(1, -(-limit // len(genres)))
+    genre_results, _ = fan_out(lambda match: _get_songs_by_genre(match['name'], per_genre), genres,
+                               max_in_flight=THEME_MAX_IN_FLIGHT, deadline=THEME_DEADLINE)
+    ranking = Ranking()
+    for match, songs in genre_results:
+        ranking.add(songs, theme=selected_theme or (match['themes'][0] if match['themes'] else None))
+    if not ranking:
+        return None
+    names = ", ".join(match['name'] for match in genres)
+    return ranking.top(limit), {
+        'type': 'genre_match',
+        'query': query,
+        'theme': selected_theme,
+        'genres': [match['name'] for match in genres],
+        'message': f"Genre(s) correspondant à '{query}' : {names}"
+    }
+
+# 🔹 Mesure du temps jusqu'au premier morceau et jusqu'au résultat complet (histogrammes)
+REGISTRY.describe("stream_seconds", "histogram", "Recherche progressive : temps jusqu'au premier morceau / résultat complet")
+
+def _record_stream_timing(first_track, complete):
+    """Enregistre les durées (secondes) d'une recherche progressive"""
+    if first_track is not None:
+        REGISTRY.observe("stream_seconds", first_track, stage="first_track")
+    REGISTRY.observe("stream_seconds", complete, stage="complete")
+
+def get_stream_timings():
+    """Retourne la médiane et le p95 (en ms, bornes de bucket) du temps jusqu'au premier morceau et jusqu'au résultat complet"""
+    summary = {}
+    for stage in ("first_track", "complete"):
+        histogram = REGISTRY.histogram("stream_seconds", stage=stage)
+        if not histogram.count:
+            continue
+        summary[stage] = {
+            "count": histogram.count,
+            "p50_ms": histogram.quantile(0.5) * 1000,
+            "p95_ms": histogram.quantile(0.95) * 1000
+        }
+    return summary
+
+def stream_smart_search(query, selected_theme=None, limit=20):
+    """
+    Variante progressive de smart_search
+    
+    Pour une recherche par thème seul, les résultats sont produits au fur et à
+    mesure que les genres répondent et reclassés à chaque étape. Les autres
+    recherches produisent directement leur résultat final.
+    
+    Yields:
+        dict: Même format que smart_search, avec en plus :
+            'complete': True pour le dernier résultat,
+            'timings': {'first_track': s, 'complete': s} (sur le résultat final)
+    """
+    start = time.perf_counter()
+    cache_key = f"smart_search_{query}_{selected_theme}_{limit}"
+    
+    if ((query and query.strip()) or not selected_theme or CACHE.get("search", cache_key) is not None
+            or _serve_negative("search", cache_key) is not None
+            or _materialized(("theme", selected_theme, limit)) is not None):
+        result = smart_search(query, selected_theme, limit)
+        elapsed = time.perf_counter() - start
+        _record_stream_timing(elapsed if result['results'] else None, elapsed)
+        yield dict(result, complete=True, timings={'first_track': elapsed, 'complete': elapsed})
+        return
+    
+    search_info = _theme_only_info(selected_theme)
+    first_track = None
+    results = []
+    try:
+        for results in stream_songs_by_theme(selected_theme, limit_per_genre=4, max_total=limit):
+            if first_track is None and results:
+                first_track = time.perf_counter() - start
+            yield {
+                'results': results,
+                'total_found': len(results),
+                'search_info': search_info,
+                'complete': False
+            }
+    except Exception as e:
+        print(f"Erreur dans stream_smart_search: {e}")
         results = []
         search_info = {
             'type': 'error',
             'message': "Erreur lors de la recherche"
         }
     
-    # Préparer le résultat final
     final_result = {
         'results': results,
         'total_found': len(results),
         'search_info': search_info
     }
+    if search_info['type'] == 'error':
+        _remember_negative("error", "search", cache_key, final_result)
+    elif results:
+        CACHE.set("search", cache_key, final_result)
+    else:
+        _remember_negative("empty", "search", cache_key, final_result)
     
-    # Mettre en cache
-    save_to_cache(cache_key, final_result)
-    return final_result
+    elapsed = time.perf_counter() - start
+    _record_stream_timing(first_track, elapsed)
+    yield dict(final_result, complete=True, timings={'first_track': first_track, 'complete': elapsed})
 
-def detect_track_theme(track_item):
-    """Essaie de deviner le thème d'une track basé sur ses caractéristiques"""
-    # Pour l'instant, retourner un thème par défaut
-    # On pourrait analyser les genres de l'artiste ou la popularité
-    popularity = track_item.get('popularity', 0)
-    
-    if popularity > 80:
-        return 'joyeux'
-    elif popularity > 60:
-        return 'énergique'
-    elif popularity > 40:
-        return 'calme'
-    else:
-        return 'mélancolique'
+# 🔹 Genres des artistes : endpoint several-artists (50 ids par appel), cache long par artiste
+@instrumented
+def get_artists_genres(artist_ids):
+    """
+    Récupère les genres Spotify de plusieurs artistes en un minimum d'appels
+    
+    Args:
+        artist_ids (list): Identifiants Spotify (doublons et None ignorés)
+    
+    Returns:
+        dict: id d'artiste -> liste de genres (les artistes introuvables sont absents)
+    """
+    genres, missing = {}, []
+    for artist_id in dict.fromkeys(artist_id for artist_id in artist_ids if artist_id):
+        cached = CACHE.get("artist_genres", f"artist_genres_{artist_id}")
+        if cached is not None:
+            genres[artist_id] = cached
+        else:
+            missing.append(artist_id)
+    
+    batches = [missing[i:i + ARTIST_BATCH_SIZE] for i in range(0, len(missing), ARTIST_BATCH_SIZE)]
+    batch_results, _ = fan_out(_fetch_artists_genres, batches, max_in_flight=ARTIST_MAX_IN_FLIGHT,
+                               deadline=ARTIST_DEADLINE)
+    for _, batch_genres in batch_results:
+        genres.update(batch_genres)
+    return genres
 
+def _fetch_artists_genres(artist_ids):
+    """Interroge Spotify pour un lot d'artistes (50 au plus) et met leurs genres en cache"""
+    try:
+        response = spotify().artists(artist_ids)
+    except RateLimited:
+        # Pas de thème pour ce lot plutôt qu'une recherche en échec
+        return {}
+    
+    genres = {}
+    for artist in (response or {}).get('artists') or []:
+        if artist and artist.get('id'):
+            genres[artist['id']] = artist.get('genres') or []
+            CACHE.set("artist_genres", f"artist_genres_{artist['id']}", genres[artist['id']])
+    return genres
+
+def _track_theme_votes(track_item, artist_genres):
+    """Votes des genres de tous les artistes (connus) d'une track"""
+    genres = []
+    for artist in track_item.get('artists') or []:
+        genres.extend(artist_genres.get(artist.get('id'), ()))
+    return classify_genres(genres)
+
+def _majority_theme(votes):
+    """Thème le plus voté, ou None ; à égalité, celui des premiers genres de l'artiste principal"""
+    return votes.most_common(1)[0][0] if votes else None
+
+def detect_track_theme(track_item, artist_genres=None):
+    """
+    Devine le thème d'une track par vote majoritaire des genres de ses artistes
+    
+    Args:
+        track_item (dict): Track brute de l'API Spotify
+        artist_genres (dict): Genres déjà récupérés (id -> genres) ; sinon un appel groupé
+    
+    Returns:
+        str: Thème le plus représenté, ou None si aucun genre n'est associé à un thème
+    """
+    if artist_genres is None:
+        artist_genres = get_artists_genres([artist.get('id') for artist in track_item.get('artists') or []])
+    return _majority_theme(_track_theme_votes(track_item, artist_genres))
+
+@instrumented
 def get_popular_tracks(limit=10):
     """Récupère des tracks populaires générales"""
     cache_key = f"popular_tracks_{limit}"
     
-    cached_result = get_from_cache(cache_key)
-    if cached_result is not None:
-        return cached_result
+    # Échec récent : pas de nouvel appel à chaque rerun pendant une panne
+    negative = _serve_negative("popular", cache_key)
+    if negative is not None:
+        return negative
     
+    try:
+        return REFRESHER.get("popular", cache_key, lambda: _fetch_popular_tracks(limit, cache_key))
+    except RateLimited as e:
+        # Saturation ou disjoncteur ouvert : dernière valeur connue, sinon liste vide (gardée peu de temps)
+        print(f"Spotify saturé pour les morceaux populaires: {e}")
+        return _remember_negative("error", "popular", cache_key, [])
+
+def _fetch_popular_tracks(limit, cache_key):
+    """Interroge Spotify pour les tracks populaires et met le résultat en cache"""
     try:
         # Rechercher des tracks populaires globales
-        results = sp.search(q='year:2024', type='track', limit=limit)
+        results = spotify().search(q='year:2024', type='track', limit=limit)
         
-        tracks = []
-        if results and 'tracks' in results:
-            for item in results['tracks']['items']:
-                if not item:
-                    continue
-                    
-                image_url = "https://via.placeholder.com/300x300?text=No+Image"
-                if item.get('album') and item['album'].get('images') and len(item['album']['images']) > 0:
-                    image_url = item['album']['images'][0]['url']
-                
-                tracks.append({
-                    "title": item.get('name', 'Titre inconnu'),
-                    "artist": item['artists'][0]['name'] if item.get('artists') and len(item['artists']) > 0 else 'Artiste inconnu',
-                    "album": item['album']['name'] if item.get('album') else 'Album inconnu',
-                    "popularity": item.get('popularity', 0),
-                    "popularity_score": item.get('popularity', 0),
-                    "genre": "popular",
-                    "theme": detect_track_theme(item),
-                    "image": image_url,
-                    "spotify_url": item.get('external_urls', {}).get('spotify', ''),
-                    "preview_url": item.get('preview_url', '')
-                })
+        items = [item for item in ((results or {}).get('tracks') or {}).get('items') or [] if item]
+        artist_genres = get_artists_genres([artist.get('id') for item in items for artist in item.get('artists') or []])
+        tracks = [normalize_track(item, "popular", theme=detect_track_theme(item, artist_genres)) for item in items]
+        
+        if not tracks:
+            return _remember_negative("empty", "popular", cache_key, [])
         
-        save_to_cache(cache_key, tracks)
+        CACHE.set("popular", cache_key, tracks)
+        SUGGESTIONS.add_tracks(tracks)
         return tracks
         
+    except RateLimited:
+        raise
     except Exception as e:
         print(f"Erreur get_popular_tracks: {e}")
-        return []
+        return _remember_negative("error", "popular", cache_key, [])
+
+# Genres utilisés pour le Top 10 de la page d'accueil
+TOP_TRACKS_GENRES = ["pop", "rock", "hip hop", "electronic", "jazz"]
+
+@instrumented
+def get_top_tracks(limit=15, per_genre=4):
+    """Récupère les pistes les plus populaires de plusieurs genres (Top 10 de l'accueil)"""
+    materialized = _materialized(("top", limit, per_genre))
+    if materialized is not None:
+        return materialized
+    
+    cache_key = f"top_tracks_{limit}_{per_genre}"
+    
+    negative = _serve_negative("popular", cache_key)
+    if negative is not None:
+        return negative
+    
+    return REFRESHER.get("popular", cache_key, lambda: _build_top_tracks(limit, per_genre, cache_key))
+
+def _build_top_tracks(limit, per_genre, cache_key):
+    """Construit le Top des pistes populaires et le met en cache"""
+    genre_results, complete = fan_out(
+        lambda genre: _shared_search_spotify(f"genre:{genre}", "track", per_genre),
+        TOP_TRACKS_GENRES,
+        max_in_flight=len(TOP_TRACKS_GENRES),
+        deadline=THEME_DEADLINE
+    )
+    # Dédupliquer et retourner les top tracks par popularité (résultats de recherche déjà triés)
+    result = merge_ranked([tracks for _, tracks in genre_results], limit)
+    
+    if complete and result:
+        CACHE.set("popular", cache_key, result)
+    elif not result:
+        # Aucun genre n'a répondu (les erreurs de recherche sont déjà absorbées) : réessayer plus tard
+        return _remember_negative("error", "popular", cache_key, [])
+    return result
+
+# Construction des playlists matérialisées (une entrée par thème, plus le Top de l'accueil)
+def _playlist_jobs():
+    jobs = {f"theme:{theme}": (lambda theme=theme: _build_theme_playlists(theme)) for theme in theme_to_genres}
+    jobs["top"] = lambda: {("top", 15, 4): _build_top_tracks(15, 4, "top_tracks_15_4")}
+    return jobs
+
+def _build_theme_playlists(theme):
+    """Construit le classement d'un thème une fois, à la plus grande taille, et en garde chaque taille"""
+    size = max(PLAYLIST_SIZES)
+    ranking = _build_songs_by_theme(theme, PLAYLIST_LIMIT_PER_GENRE, size,
+                                    f"theme_{theme}_{PLAYLIST_LIMIT_PER_GENRE}_{size}")
+    return {("theme", theme, size): ranking[:size] for size in PLAYLIST_SIZES}
+
+PLAYLISTS = PlaylistMaterializer(_playlist_jobs, PLAYLIST_REFRESH_INTERVAL)
+
+def _materialized(key):
+    """Playlist matérialisée (copie de la liste), ou None ; démarre le rafraîchissement au premier usage"""
+    if not PLAYLIST_REFRESH_INTERVAL:
+        return None
+    PLAYLISTS.start()
+    tracks = PLAYLISTS.get(key)
+    return list(tracks) if tracks is not None else None
+
+def get_playlist_stats():
+    """Âge de l'instantané des playlists, durée et appels Spotify de sa construction"""
+    return PLAYLISTS.stats()
 
 # Fonction de recherche intelligente avec résultats multiples
+@instrumented
 def search_spotify(query, search_type="track", limit=10):
     """
     Fonction de recherche Spotify qui garde la logique d'affichage des résultats possibles
@@ -388,9 +975,22 @@ def search_spotify(query, search_type="track", limit=10):
     Returns:
         list: Liste des résultats formatés
     """
+    try:
+        return _shared_search_spotify(query, search_type, limit)
+    except RateLimited as e:
+        print(f"Spotify saturé pour la recherche {query}: {e}")
+        return []
+
+def _shared_search_spotify(query, search_type, limit):
+    """Les recherches identiques simultanées partagent le même appel Spotify"""
+    flight_key = f"search_spotify_{query}_{search_type}_{limit}"
+    return FLIGHTS.do(flight_key, lambda: _search_spotify(query, search_type, limit))
+
+def _search_spotify(query, search_type, limit):
+    """Exécute search_spotify sans regroupement (lève RateLimited si Spotify est saturé)"""
     try:
         # Recherche sur Spotify
-        results = sp.search(q=query, type=search_type, limit=limit)
+        results = spotify().search(q=query, type=search_type, limit=limit)
         
         if not results:
             return []
@@ -401,106 +1001,162 @@ def search_spotify(query, search_type="track", limit=10):
                 if not item:
                     continue
                     
-                # Vérifier si l'image existe
-                image_url = "https://via.placeholder.com/300x300?text=No+Image"
-                if item.get('album') and item['album'].get('images') and len(item['album']['images']) > 0:
-                    image_url = item['album']['images'][0]['url']
-                
-                songs.append({
-                    "title": item.get('name', 'Titre inconnu'),
-                    "artist": item['artists'][0]['name'] if item.get('artists') and len(item['artists']) > 0 else 'Artiste inconnu',
-                    "album": item['album']['name'] if item.get('album') else 'Album inconnu',
-                    "popularity": item.get('popularity', 0),
-                    "popularity_score": item.get('popularity', 0),  # Score Spotify (0-100)
-                    "genre": "search_result",  # Marqueur pour les résultats de recherche
-                    "image": image_url,
-                    "spotify_url": item.get('external_urls', {}).get('spotify', ''),
-                    "preview_url": item.get('preview_url', '')
-                })
+                songs.append(normalize_track(item, "search_result"))  # Marqueur pour les résultats de recherche
         
         elif search_type == "artist" and 'artists' in results and results['artists']:
-            # Si on cherche un artiste, on récupère ses top tracks
-            for artist in results['artists']['items']:
-                if not artist:
-                    continue
-                    
-                try:
-                    artist_tracks = sp.artist_top_tracks(artist['id'])
-                    if artist_tracks and 'tracks' in artist_tracks:
-                        for track in artist_tracks['tracks'][:5]:  # Top 5 de l'artiste
-                            if not track:
-                                continue
-                                
-                            image_url = "https://via.placeholder.com/300x300?text=No+Image"
-                            if track.get('album') and track['album'].get('images') and len(track['album']['images']) > 0:
-                                image_url = track['album']['images'][0]['url']
-                            
-                            songs.append({
-                                "title": track.get('name', 'Titre inconnu'),
-                                "artist": track['artists'][0]['name'] if track.get('artists') and len(track['artists']) > 0 else 'Artiste inconnu',
-                                "album": track['album']['name'] if track.get('album') else 'Album inconnu',
-                                "popularity": track.get('popularity', 0),
-                                "popularity_score": track.get('popularity', 0),  # Score Spotify (0-100)
-                                "genre": f"artist:{artist.get('name', 'Artiste inconnu')}",
-                                "image": image_url,
-                                "spotify_url": track.get('external_urls', {}).get('spotify', ''),
-                                "preview_url": track.get('preview_url', '')
-                            })
-                except Exception as artist_error:
-                    print(f"Erreur lors de la récupération des tracks de l'artiste {artist.get('name', 'Inconnu')}: {artist_error}")
-                    continue
+            # Si on cherche un artiste, on récupère ses top tracks (en parallèle, avec cache par artiste)
+            artists = [artist for artist in results['artists']['items'] if artist and artist.get('id')]
+            artist_results, _ = fan_out(
+                lambda artist: _get_artist_top_tracks(artist['id']),
+                artists,
+                max_in_flight=ARTIST_MAX_IN_FLIGHT,
+                deadline=ARTIST_DEADLINE
+            )
+            for artist, artist_tracks in artist_results:
+                label = f"artist:{artist.get('name', 'Artiste inconnu')}"
+                songs.extend(dict(track, genre=label) for track in artist_tracks)
         
         # Trier par popularité pour garder la logique
         songs.sort(key=lambda x: x['popularity'], reverse=True)
+        SUGGESTIONS.add_tracks(songs)
         
         return songs
         
+    except RateLimited:
+        raise
     except Exception as e:
         print(f"Erreur lors de la recherche : {e}")
         return []
 
+# Top tracks d'un artiste, avec cache par id (partagé par toutes les recherches)
+@instrumented
+def get_artist_top_tracks(artist_id):
+    """Récupère les morceaux les plus populaires d'un artiste avec mise en cache"""
+    try:
+        return _get_artist_top_tracks(artist_id)
+    except Exception as e:
+        print(f"Erreur lors de la récupération des tracks de l'artiste {artist_id}: {e}")
+        return []
+
+def _get_artist_top_tracks(artist_id):
+    """Comme get_artist_top_tracks, mais lève les erreurs (pour le fan-out)"""
+    cache_key = f"artist_top_{artist_id}"
+    cached_result = CACHE.get("artist", cache_key)
+    if cached_result is not None:
+        return cached_result
+    
+    # Un seul appel pour un artiste présent dans plusieurs recherches simultanées
+    return FLIGHTS.do(cache_key, lambda: _fetch_artist_top_tracks(artist_id, cache_key))
+
+def _fetch_artist_top_tracks(artist_id, cache_key):
+    """Interroge Spotify pour les top tracks d'un artiste et met le résultat en cache"""
+    try:
+        artist_tracks = spotify().artist_top_tracks(artist_id)
+    except RateLimited:
+        # Servir la dernière valeur connue, même expirée
+        stale = CACHE.get_stale("artist", cache_key)
+        if stale is not None:
+            return stale[0]
+        raise
+    
+    tracks = [normalize_track(track, "artist")
+              for track in (artist_tracks or {}).get('tracks', [])[:ARTIST_TOP_TRACKS] if track]
+    CACHE.set("artist", cache_key, tracks)
+    return tracks
+
 # Fonction pour obtenir les suggestions de recherche
+@instrumented
 def get_search_suggestions(query, limit=5):
     """
     Obtenir des suggestions de recherche basées sur la requête partielle
+    
+    Les suggestions viennent du trie local (moins d'une milliseconde) ; Spotify
+    n'est interrogé, en parallèle et avec cache, que s'il manque des candidats.
     """
     if len(query) < 2:
         return []
     
-    try:
-        # Recherche d'artistes pour suggestions
-        artist_results = sp.search(q=query, type='artist', limit=limit)
-        # Recherche de tracks pour suggestions
-        track_results = sp.search(q=query, type='track', limit=limit)
-        
-        suggestions = []
-        
-        # Ajouter les artistes
-        if artist_results and 'artists' in artist_results and artist_results['artists']:
-            for artist in artist_results['artists']['items']:
-                if artist and artist.get('name'):
-                    suggestions.append({
-                        "type": "artist",
-                        "name": artist['name'],
-                        "suggestion": artist['name']
-                    })
-        
-        # Ajouter les titres populaires
-        if track_results and 'tracks' in track_results and track_results['tracks']:
-            for track in track_results['tracks']['items']:
-                if track and track.get('name'):
-                    artist_name = track['artists'][0]['name'] if track.get('artists') and len(track['artists']) > 0 else 'Artiste inconnu'
-                    suggestions.append({
-                        "type": "track",
-                        "name": f"{track['name']} - {artist_name}",
-                        "suggestion": track['name']
-                    })
-        
-        return suggestions[:limit]
-        
-    except Exception as e:
-        print(f"Erreur lors des suggestions : {e}")
-        return []
+    _seed_suggestions()
+    suggestions = SUGGESTIONS.complete(query, limit)
+    if len(suggestions) >= limit:
+        return suggestions
+    
+    # Compléter avec Spotify sans doublons
+    seen = {(s['type'], s['name']) for s in suggestions}
+    for suggestion in _remote_suggestions(query, limit):
+        if (suggestion['type'], suggestion['name']) not in seen:
+            seen.add((suggestion['type'], suggestion['name']))
+            suggestions.append(suggestion)
+    return suggestions[:limit]
+
+def _seed_suggestions():
+    """Charge en arrière-plan (une seule fois) les morceaux populaires de l'index local dans le trie"""
+    if _suggestions_seeded.is_set():
+        return
+    with _suggestions_seed_lock:
+        if _suggestions_seeded.is_set():
+            return
+        _suggestions_seeded.set()
+    
+    def seed():
+        index = get_default_index(TRACK_INDEX_PATH)
+        if index is None:
+            return
+        for title, artist, popularity in index.popular_tracks(SUGGESTIONS_SEED_TRACKS):
+            SUGGESTIONS.add_tracks([{'title': title, 'artist': artist, 'popularity': popularity}])
+    
+    threading.Thread(target=seed, name="mood2music-suggest-seed", daemon=True).start()
+
+def _remote_suggestions(query, limit):
+    """Suggestions Spotify (artistes puis titres), avec cache et regroupement des appels"""
+    cache_key = f"suggest_{normalize(query)}_{limit}"
+    cached_result = CACHE.get("suggest", cache_key)
+    if cached_result is not None:
+        return cached_result
+    return FLIGHTS.do(cache_key, lambda: _fetch_remote_suggestions(query, limit, cache_key))
+
+def _fetch_remote_suggestions(query, limit, cache_key):
+    """Lance les recherches artiste et titre en parallèle et met le résultat en cache"""
+    results, complete = fan_out(
+        lambda search_type: spotify().search(q=query, type=search_type, limit=limit),
+        ["artist", "track"],
+        max_in_flight=2,
+        deadline=THEME_DEADLINE
+    )
+    by_type = dict(results)
+    artist_results = by_type.get('artist')
+    track_results = by_type.get('track')
+    
+    suggestions = []
+    
+    # Ajouter les artistes
+    if artist_results and 'artists' in artist_results and artist_results['artists']:
+        for artist in artist_results['artists']['items']:
+            if artist and artist.get('name'):
+                suggestions.append({
+                    "type": "artist",
+                    "name": artist['name'],
+                    "suggestion": artist['name']
+                })
+                SUGGESTIONS.add("artist", artist['name'], artist['name'], artist.get('popularity', 0) or 0)
+    
+    # Ajouter les titres populaires
+    if track_results and 'tracks' in track_results and track_results['tracks']:
+        for track in track_results['tracks']['items']:
+            if track and track.get('name'):
+                artist_name = track['artists'][0]['name'] if track.get('artists') and len(track['artists']) > 0 else 'Artiste inconnu'
+                suggestions.append({
+                    "type": "track",
+                    "name": f"{track['name']} - {artist_name}",
+                    "suggestion": track['name']
+                })
+                SUGGESTIONS.add("track", f"{track['name']} - {artist_name}", track['name'],
+                                track.get('popularity', 0) or 0)
+    
+    # Ne mettre en cache que si les deux recherches ont répondu
+    if complete:
+        CACHE.set("suggest", cache_key, suggestions)
+    return suggestions
 
 # Test direct dans le backend
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+import time
+import threading
+from collections import Counter
+
+from utils.metrics import REGISTRY
+from utils.scheduler import RateLimited
+
+# 🔹 Disjoncteur des appels Spotify
+#
+# Après plusieurs échecs consécutifs (réseau, 5xx), Spotify est considéré en panne :
+# le disjoncteur s'ouvre et les appels échouent tout de suite (CircuitOpen) au lieu
+# d'attendre chacun leur timeout. CircuitOpen est un RateLimited : les appelants
+# servent déjà la dernière valeur connue dans ce cas et ne cachent pas de liste vide.
+# Passé BREAKER_RESET_TIMEOUT, un appel d'essai est laissé passer (demi-ouverture) :
+# s'il réussit le disjoncteur se referme, sinon il se rouvre pour un nouveau délai.
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}   # Valeur de la jauge spotify_circuit_state
+
+BREAKER_FAILURE_THRESHOLD = 5    # Échecs consécutifs avant ouverture
+BREAKER_RESET_TIMEOUT = 30.0     # Secondes d'ouverture avant un appel d'essai
+BREAKER_HALF_OPEN_PROBES = 1     # Appels d'essai simultanés en demi-ouverture
+
+REGISTRY.describe("spotify_circuit_state", "gauge", "État du disjoncteur Spotify (0 fermé, 1 demi-ouvert, 2 ouvert)")
+REGISTRY.describe("spotify_circuit_transitions_total", "counter", "Changements d'état du disjoncteur Spotify")
+REGISTRY.describe("spotify_circuit_rejected_total", "counter", "Appels Spotify refusés par le disjoncteur")
+
+
+class CircuitOpen(RateLimited):
+    """Appel Spotify refusé sans être tenté : disjoncteur ouvert"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message, retry_after=retry_after, reason="circuit_open")
+
+
+def is_outage(error):
+    """
+    Indique si une erreur signale une panne de Spotify (réseau, timeout, 5xx)
+
+    Une erreur 4xx est une réponse de Spotify à une requête invalide : elle ne
+    compte pas comme un échec du service.
+    """
+    status = getattr(error, "http_status", None)
+    return status is None or status >= 500
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur fermé / ouvert / demi-ouvert
+
+    Args:
+        failure_threshold (int): Échecs consécutifs avant ouverture
+        reset_timeout (float): Secondes d'ouverture avant la demi-ouverture
+        half_open_probes (int): Appels d'essai simultanés en demi-ouverture
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT,
+                 half_open_probes=BREAKER_HALF_OPEN_PROBES):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+        self._counters = Counter()
+
+    def _transition(self, state):
+        self.state = state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        self._failures = 0
+        self._counters[f"to_{state}"] += 1
+        REGISTRY.inc("spotify_circuit_transitions_total", state=state)
+
+    def _reject(self, message, retry_after):
+        self._counters["rejected"] += 1
+        REGISTRY.inc("spotify_circuit_rejected_total")
+        raise CircuitOpen(message, retry_after=retry_after)
+
+    def before_call(self):
+        """
+        Autorise un appel ou le refuse tout de suite
+
+        Returns:
+            bool: True si l'appel est un appel d'essai (à signaler à on_success/on_failure/release)
+
+        Raises:
+            CircuitOpen: Disjoncteur ouvert, ou appels d'essai déjà en cours
+        """
+        with self._lock:
+            if self.state == OPEN:
+                remaining = self._opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self._reject("Spotify indisponible (disjoncteur ouvert)", remaining)
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self._reject("Spotify indisponible (appel d'essai en cours)", self.reset_timeout)
+                self._probes += 1
+                return True
+            return False
+
+    def on_success(self, probe):
+        with self._lock:
+            if probe:
+                self._probes -= 1
+                if self.state == HALF_OPEN:
+                    self._transition(CLOSED)
+            elif self.state == CLOSED:
+                self._failures = 0
+
+    def on_failure(self, probe):
+        with self._lock:
+            if probe:
+                self._probes -= 1
+                if self.state == HALF_OPEN:
+                    self._transition(OPEN)
+            elif self.state == CLOSED:
+                self._failures += 1
+                if self._failures >= self.failure_threshold:
+                    self._transition(OPEN)
+
+    def on_error(self, probe, error):
+        """Appel terminé par une exception : échec si c'est une panne, succès sinon (4xx)"""
+        if is_outage(error):
+            self.on_failure(probe)
+        else:
+            self.on_success(probe)
+
+    def release(self, probe):
+        """Appel terminé sans rien apprendre sur la santé de Spotify (budget local épuisé, 429)"""
+        if probe:
+            with self._lock:
+                self._probes -= 1
+
+    def stats(self):
+        with self._lock:
+            open_for = 0.0
+            if self.state == OPEN:
+                open_for = max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+            return {
+                "state": self.state,
+                "state_value": STATE_VALUES[self.state],
+                "failures": self._failures,
+                "retry_in": open_for,
+                "rejected": self._counters["rejected"],
+                "opened": self._counters[f"to_{OPEN}"],
+            }
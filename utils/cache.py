@@ -0,0 +1,334 @@
+import sys
+import time
+import threading
+from collections import OrderedDict, Counter
+
+# 🔹 Cache mémoire borné (LRU + TTL) partagé entre les sessions Streamlit
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 Mo
+DEFAULT_SHARDS = 16
+SWEEP_INTERVAL = 30  # Expiration en arrière-plan toutes les 30 secondes
+
+
+def estimate_size(value):
+    """Estime la taille mémoire d'une valeur (dicts, listes et chaînes imbriqués)"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k) + estimate_size(v)
+    elif isinstance(value, (list, tuple, set)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class CacheBackend:
+    """
+    Interface commune des caches (mémoire, SQLite...)
+
+    Les clés sont rangées par namespace ; chaque entrée a une date d'expiration.
+    """
+
+    def get(self, namespace, key):
+        """Récupère une valeur non expirée, sinon None"""
+        entry = self.get_entry(namespace, key)
+        return entry[0] if entry is not None else None
+
+    def get_entry(self, namespace, key):
+        """Récupère (valeur, date d'expiration) si l'entrée n'est pas expirée, sinon None"""
+        raise NotImplementedError
+
+    def get_stale(self, namespace, key):
+        """
+        Récupère une entrée même expirée, tant qu'elle reste dans la fenêtre de staleness
+
+        Returns:
+            tuple: (valeur, date d'expiration, nombre de lectures) ou None
+        """
+        entry = self.get_entry(namespace, key)
+        return (entry[0], entry[1], 0) if entry is not None else None
+
+    def set(self, namespace, key, value, ttl=None):
+        """Sauvegarde une valeur"""
+        raise NotImplementedError
+
+    def set_entry(self, namespace, key, value, expires_at):
+        """Sauvegarde une valeur avec une date d'expiration absolue"""
+        self.set(namespace, key, value, ttl=max(0, expires_at - time.time()))
+
+    def delete(self, namespace, key):
+        """Supprime une entrée"""
+        raise NotImplementedError
+
+    def clear(self):
+        """Vide le cache"""
+        raise NotImplementedError
+
+    def stats(self):
+        """Retourne les compteurs du cache"""
+        return {}
+
+    def close(self):
+        """Libère les ressources du cache"""
+
+
+class _Entry:
+    """Entrée du cache mémoire"""
+    __slots__ = ("value", "expires_at", "stale_until", "size", "reads")
+
+    def __init__(self, value, expires_at, stale_until, size):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.size = size
+        self.reads = 0
+
+
+class _Shard:
+    """Partie du cache protégée par son propre verrou"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # (namespace, key) -> _Entry
+        self.bytes = 0
+        self.counters = Counter()     # (namespace, nom du compteur) -> valeur
+
+
+class TTLCache(CacheBackend):
+    """
+    Cache clé/valeur thread-safe avec éviction LRU, expiration TTL et compteurs
+
+    Les clés sont rangées par namespace ("genre", "theme", "search", "popular"...),
+    chacun pouvant avoir sa propre durée de vie. Une entrée expirée reste disponible
+    via get_stale() pendant max_staleness secondes (stale-while-revalidate).
+
+    Args:
+        default_ttl (float): Durée de vie par défaut en secondes
+        namespace_ttls (dict): Durée de vie par namespace
+        max_entries (int): Nombre maximum d'entrées
+        max_bytes (int): Taille mémoire maximum estimée
+        shards (int): Nombre de verrous indépendants
+        sweep_interval (float): Période d'expiration en arrière-plan (None = désactivée)
+        max_staleness (float): Durée pendant laquelle une entrée expirée peut encore être servie
+    """
+
+    def __init__(self, default_ttl=300, namespace_ttls=None, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, shards=DEFAULT_SHARDS, sweep_interval=SWEEP_INTERVAL,
+                 max_staleness=0):
+        self.default_ttl = default_ttl
+        self.max_staleness = max_staleness
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._max_entries_per_shard = max(1, max_entries // len(self._shards))
+        self._max_bytes_per_shard = max(1, max_bytes // len(self._shards))
+        self._sweep_interval = sweep_interval
+        self._sweeper = None
+        self._sweeper_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _shard(self, namespace, key):
+        return self._shards[hash((namespace, key)) % len(self._shards)]
+
+    def ttl_for(self, namespace):
+        """Retourne la durée de vie d'un namespace"""
+        return self.namespace_ttls.get(namespace, self.default_ttl)
+
+    def _lookup(self, shard, namespace, full_key, now):
+        """Retourne l'entrée si elle est encore servable, sinon la supprime (verrou pris)"""
+        entry = shard.entries.get(full_key)
+        if entry is not None and now >= entry.stale_until:
+            # Entrée trop ancienne, la supprimer
+            del shard.entries[full_key]
+            shard.bytes -= entry.size
+            shard.counters[(namespace, "expirations")] += 1
+            return None
+        return entry
+
+    def get_entry(self, namespace, key):
+        """Récupère (valeur, date d'expiration) si l'entrée existe et n'est pas expirée, sinon None"""
+        shard = self._shard(namespace, key)
+        full_key = (namespace, key)
+        now = time.time()
+        with shard.lock:
+            entry = self._lookup(shard, namespace, full_key, now)
+            if entry is None or now >= entry.expires_at:
+                shard.counters[(namespace, "misses")] += 1
+                return None
+            shard.entries.move_to_end(full_key)
+            shard.counters[(namespace, "hits")] += 1
+            entry.reads += 1
+            return entry.value, entry.expires_at
+
+    def get_stale(self, namespace, key):
+        shard = self._shard(namespace, key)
+        full_key = (namespace, key)
+        now = time.time()
+        with shard.lock:
+            entry = self._lookup(shard, namespace, full_key, now)
+            if entry is None:
+                shard.counters[(namespace, "misses")] += 1
+                return None
+            shard.entries.move_to_end(full_key)
+            shard.counters[(namespace, "hits" if now < entry.expires_at else "stale_hits")] += 1
+            entry.reads += 1
+            return entry.value, entry.expires_at, entry.reads
+
+    def set(self, namespace, key, value, ttl=None):
+        """Sauvegarde une valeur avec la durée de vie de son namespace"""
+        ttl = self.ttl_for(namespace) if ttl is None else ttl
+        expires_at = time.time() + ttl
+        entry = _Entry(value, expires_at, expires_at + self.max_staleness, estimate_size(value))
+        shard = self._shard(namespace, key)
+        full_key = (namespace, key)
+        with shard.lock:
+            old = shard.entries.pop(full_key, None)
+            if old is not None:
+                shard.bytes -= old.size
+            shard.entries[full_key] = entry
+            shard.bytes += entry.size
+            self._evict(shard)
+        self._ensure_sweeper()
+
+    def delete(self, namespace, key):
+        """Supprime une entrée"""
+        shard = self._shard(namespace, key)
+        with shard.lock:
+            old = shard.entries.pop((namespace, key), None)
+            if old is not None:
+                shard.bytes -= old.size
+
+    def clear(self):
+        """Vide le cache (les compteurs sont conservés)"""
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.bytes = 0
+
+    def _evict(self, shard):
+        """Évince les entrées les moins récemment utilisées (verrou du shard déjà pris)"""
+        while shard.entries and (len(shard.entries) > self._max_entries_per_shard
+                                 or shard.bytes > self._max_bytes_per_shard):
+            (namespace, _), entry = shard.entries.popitem(last=False)
+            shard.bytes -= entry.size
+            shard.counters[(namespace, "evictions")] += 1
+
+    def expire(self):
+        """Supprime les entrées expirées (au-delà de la staleness), retourne le nombre supprimé"""
+        removed = 0
+        now = time.time()
+        for shard in self._shards:
+            with shard.lock:
+                expired = [k for k, entry in shard.entries.items() if now >= entry.stale_until]
+                for full_key in expired:
+                    shard.bytes -= shard.entries.pop(full_key).size
+                    shard.counters[(full_key[0], "expirations")] += 1
+                removed += len(expired)
+        return removed
+
+    def _ensure_sweeper(self):
+        """Démarre le thread d'expiration en arrière-plan au premier usage"""
+        if self._sweeper is not None or not self._sweep_interval:
+            return
+        with self._sweeper_lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_loop, name="mood2music-cache-sweeper",
+                                                 daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self._sweep_interval):
+            try:
+                self.expire()
+            except Exception as e:
+                print(f"Erreur lors de l'expiration du cache: {e}")
+
+    def close(self):
+        """Arrête le thread d'expiration"""
+        self._stop.set()
+
+    def __len__(self):
+        return sum(len(shard.entries) for shard in self._shards)
+
+    def stats(self):
+        """
+        Retourne les compteurs du cache
+
+        Returns:
+            dict: {'entries', 'bytes',
+                   'namespaces': {namespace: {hits, stale_hits, misses, evictions, expirations}}}
+        """
+        totals = Counter()
+        entries = 0
+        size = 0
+        for shard in self._shards:
+            with shard.lock:
+                totals.update(shard.counters)
+                entries += len(shard.entries)
+                size += shard.bytes
+        namespaces = {}
+        for (namespace, name), count in totals.items():
+            counters = namespaces.setdefault(namespace, {"hits": 0, "stale_hits": 0, "misses": 0,
+                                                         "evictions": 0, "expirations": 0})
+            counters[name] = count
+        return {"entries": entries, "bytes": size, "namespaces": namespaces}
+
+
+class TieredCache(CacheBackend):
+    """
+    Cache à deux niveaux : mémoire devant, cache persistant derrière
+
+    Seuls les namespaces listés dans persistent_namespaces sont écrits dans le cache
+    persistant ; une entrée lue depuis celui-ci est remontée en mémoire avec son
+    expiration d'origine.
+    """
+
+    def __init__(self, front, back, persistent_namespaces=()):
+        self.front = front
+        self.back = back
+        self.persistent_namespaces = frozenset(persistent_namespaces)
+
+    def get_entry(self, namespace, key):
+        entry = self.front.get_entry(namespace, key)
+        if entry is not None or namespace not in self.persistent_namespaces:
+            return entry
+        entry = self.back.get_entry(namespace, key)
+        if entry is not None:
+            self.front.set_entry(namespace, key, entry[0], entry[1])
+        return entry
+
+    def get_stale(self, namespace, key):
+        entry = self.front.get_stale(namespace, key)
+        if entry is not None or namespace not in self.persistent_namespaces:
+            return entry
+        entry = self.back.get_entry(namespace, key)
+        if entry is None:
+            return None
+        self.front.set_entry(namespace, key, entry[0], entry[1])
+        return entry[0], entry[1], 0
+
+    def set(self, namespace, key, value, ttl=None):
+        self.front.set(namespace, key, value, ttl=ttl)
+        if namespace in self.persistent_namespaces:
+            ttl = self.front.ttl_for(namespace) if ttl is None else ttl
+            self.back.set(namespace, key, value, ttl=ttl)
+
+    def delete(self, namespace, key):
+        self.front.delete(namespace, key)
+        if namespace in self.persistent_namespaces:
+            self.back.delete(namespace, key)
+
+    def clear(self):
+        self.front.clear()
+        self.back.clear()
+
+    def ttl_for(self, namespace):
+        return self.front.ttl_for(namespace)
+
+    def stats(self):
+        stats = self.front.stats()
+        stats["persistent"] = self.back.stats()
+        return stats
+
+    def close(self):
+        self.front.close()
+        self.back.close()
@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import Counter
+
+from utils.cache import CacheBackend
+
+# 🔹 Cache persistant SQLite (mode WAL) partagé par les workers Streamlit d'une même machine
+BUSY_TIMEOUT_MS = 5000      # Attente maximum quand un autre processus écrit
+COMPACT_INTERVAL = 600      # Compaction au plus toutes les 10 minutes (tous processus confondus)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('last_compaction', 0);
+"""
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache persistant stocké dans une base SQLite en mode WAL
+
+    Les valeurs sont sérialisées en JSON avec leur date d'expiration. Chaque thread a
+    sa propre connexion ; plusieurs processus peuvent partager le même fichier.
+    La compaction (suppression des entrées expirées, checkpoint du WAL, vacuum
+    incrémental) est faite périodiquement par un seul processus à la fois.
+
+    Args:
+        path (str): Chemin du fichier SQLite (créé au premier usage)
+        default_ttl (float): Durée de vie par défaut en secondes
+        compact_interval (float): Délai minimum entre deux compactions
+    """
+
+    def __init__(self, path, default_ttl=300, compact_interval=COMPACT_INTERVAL):
+        self.path = path
+        self.default_ttl = default_ttl
+        self.compact_interval = compact_interval
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._next_compaction_check = 0
+        self._compacting = threading.Lock()
+        self._counters = Counter()
+
+    def _connect(self):
+        """Retourne la connexion du thread courant (créée au premier usage)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        with self._init_lock:
+            if not self._initialized:
+                # auto_vacuum doit être défini avant la création des tables
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+        conn.execute("PRAGMA synchronous = NORMAL")
+        self._local.conn = conn
+        return conn
+
+    def get_entry(self, namespace, key):
+        try:
+            row = self._connect().execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (namespace, key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Erreur de lecture du cache SQLite: {e}")
+            self._counters["errors"] += 1
+            return None
+        if row is None:
+            self._counters["misses"] += 1
+            return None
+        self._counters["hits"] += 1
+        return json.loads(row[0]), row[1]
+
+    def set(self, namespace, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.set_entry(namespace, key, value, time.time() + ttl)
+
+    def set_entry(self, namespace, key, value, expires_at):
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            self._counters["writes"] += 1
+        except (sqlite3.Error, TypeError, ValueError) as e:
+            print(f"Erreur d'écriture dans le cache SQLite: {e}")
+            self._counters["errors"] += 1
+            return
+        self._maybe_compact()
+
+    def delete(self, namespace, key):
+        try:
+            self._connect().execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+        except sqlite3.Error as e:
+            print(f"Erreur de suppression dans le cache SQLite: {e}")
+
+    def clear(self):
+        try:
+            self._connect().execute("DELETE FROM entries")
+        except sqlite3.Error as e:
+            print(f"Erreur lors du vidage du cache SQLite: {e}")
+
+    def _maybe_compact(self):
+        """Lance une compaction en arrière-plan si l'intervalle est écoulé"""
+        now = time.time()
+        if now < self._next_compaction_check or not self._compacting.acquire(blocking=False):
+            return
+        self._next_compaction_check = now + self.compact_interval
+        threading.Thread(target=self._compact_in_background, name="mood2music-cache-compaction",
+                         daemon=True).start()
+
+    def _compact_in_background(self):
+        try:
+            self.compact()
+        except sqlite3.Error as e:
+            print(f"Erreur lors de la compaction du cache SQLite: {e}")
+        finally:
+            self._compacting.release()
+
+    def compact(self, force=False):
+        """
+        Supprime les entrées expirées et récupère l'espace disque
+
+        Un seul processus compacte par intervalle : la mise à jour conditionnelle
+        de 'last_compaction' sert de verrou entre processus.
+
+        Returns:
+            int: Nombre d'entrées supprimées (0 si un autre processus a compacté récemment)
+        """
+        conn = self._connect()
+        now = time.time()
+        claimed = conn.execute(
+            "UPDATE meta SET value = ? WHERE name = 'last_compaction' AND value <= ?",
+            (now, now if force else now - self.compact_interval)
+        ).rowcount
+        if not claimed:
+            return 0
+        removed = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self._counters["compactions"] += 1
+        self._counters["compacted_entries"] += removed
+        return removed
+
+    def stats(self):
+        stats = dict(self._counters)
+        try:
+            stats["entries"] = self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        except sqlite3.Error:
+            pass
+        return stats
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
@@ -0,0 +1,300 @@
+"""
+Catalogue genres/thèmes précompilé
+
+Le CSV data/spotify_genres_themes.csv est compilé en un fichier binaire compact
+(chaînes internées + index en tableaux) chargé par mmap : plusieurs workers
+partagent les mêmes pages et le chargement ne coûte que quelques microsecondes.
+Le catalogue est recompilé automatiquement quand le CSV change.
+
+Usage : python -m utils.catalog   # (re)compile le catalogue
+"""
+import os
+import sys
+import mmap
+import struct
+import unicodedata
+from array import array
+from collections import Counter
+from collections.abc import Mapping
+from functools import lru_cache
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+GENRES_CSV = os.path.join(ROOT_DIR, 'data', 'spotify_genres_themes.csv')
+DEFAULT_CATALOG_PATH = os.path.join(ROOT_DIR, '.cache', 'genre_catalog.bin')
+
+MAGIC = b"M2MCAT01" + (b"L" if sys.byteorder == "little" else b"B")
+# magic, taille du CSV, mtime_ns du CSV, nb thèmes, nb genres, nb liens, taille des chaînes
+_HEADER = struct.Struct("<9sQQIIII")
+
+
+def _csv_fingerprint(csv_path):
+    stat = os.stat(csv_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def compile_catalog(csv_path=GENRES_CSV):
+    """
+    Compile le CSV genres -> thèmes en catalogue binaire
+
+    Les thèmes et les genres gardent l'ordre de leur première apparition dans le CSV.
+
+    Returns:
+        bytes: Contenu du catalogue
+    """
+    import csv  # Import différé : inutile quand le catalogue est déjà compilé
+
+    themes, genres = [], []
+    theme_ids, genre_ids = {}, {}
+    links = []  # (theme_id, genre_id) dans l'ordre du CSV
+    with open(csv_path, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            theme, genre = row['theme'], row['genre']
+            if theme not in theme_ids:
+                theme_ids[theme] = len(themes)
+                themes.append(theme)
+            if genre not in genre_ids:
+                genre_ids[genre] = len(genres)
+                genres.append(genre)
+            links.append((theme_ids[theme], genre_ids[genre]))
+
+    # Table de chaînes : thèmes puis genres, concaténés en UTF-8
+    encoded = [s.encode("utf-8") for s in themes + genres]
+    string_offsets = array("I", [0])
+    for s in encoded:
+        string_offsets.append(string_offsets[-1] + len(s))
+    blob = b"".join(encoded)
+
+    def csr(count, pairs):
+        """Index compressé (offsets + valeurs) à partir de paires (clé, valeur)"""
+        buckets = [[] for _ in range(count)]
+        seen = set()
+        for key, value in pairs:
+            if (key, value) not in seen:
+                seen.add((key, value))
+                buckets[key].append(value)
+        offsets, values = array("I", [0]), array("I")
+        for bucket in buckets:
+            values.extend(bucket)
+            offsets.append(len(values))
+        return offsets, values
+
+    theme_offsets, theme_genres = csr(len(themes), links)
+    genre_offsets, genre_themes = csr(len(genres), [(g, t) for t, g in links])
+
+    size, mtime_ns = _csv_fingerprint(csv_path)
+    header = _HEADER.pack(MAGIC, size, mtime_ns, len(themes), len(genres), len(theme_genres), len(blob))
+    # Aligner les tableaux sur 4 octets
+    padding = b"\0" * (-len(header) % 4)
+    return b"".join([header, padding, string_offsets.tobytes(), theme_offsets.tobytes(), theme_genres.tobytes(),
+                     genre_offsets.tobytes(), genre_themes.tobytes(), blob])
+
+
+def build_catalog(csv_path=GENRES_CSV, catalog_path=DEFAULT_CATALOG_PATH):
+    """Compile le catalogue et l'écrit de façon atomique ; retourne son contenu"""
+    data = compile_catalog(csv_path)
+    directory = os.path.dirname(catalog_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{catalog_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, catalog_path)
+    return data
+
+
+class Catalog:
+    """
+    Vue en lecture seule sur un catalogue compilé
+
+    Les chaînes sont décodées à la demande ; seuls les thèmes sont décodés au chargement.
+    """
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, _, _, n_themes, n_genres, n_links, blob_size = _HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Catalogue invalide ou compilé pour une autre architecture")
+        self.n_themes = n_themes
+        self.n_genres = n_genres
+        n_strings = n_themes + n_genres
+
+        pos = _HEADER.size + (-_HEADER.size % 4)
+
+        def take(count):
+            nonlocal pos
+            arr = view[pos:pos + 4 * count].cast("I")
+            pos += 4 * count
+            return arr
+
+        self._string_offsets = take(n_strings + 1)
+        self._theme_offsets = take(n_themes + 1)
+        self._theme_genres = take(n_links)
+        self._genre_offsets = take(n_genres + 1)
+        self._genre_themes = take(n_links)
+        self._blob = view[pos:pos + blob_size]
+
+        self._themes = [self._string(i) for i in range(n_themes)]
+        self._theme_ids = {theme: i for i, theme in enumerate(self._themes)}
+        self._genre_ids = None
+        self.theme_to_genres = ThemeGenresView(self)
+
+    @classmethod
+    def from_file(cls, path):
+        """Charge un catalogue par mmap"""
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    def _string(self, string_id):
+        start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return str(self._blob[start:end], "utf-8")
+
+    def genre_name(self, genre_id):
+        """Nom d'un genre à partir de son identifiant"""
+        return self._string(self.n_themes + genre_id)
+
+    def genre_id(self, genre):
+        """Identifiant d'un genre (nom exact), ou None"""
+        if self._genre_ids is None:
+            self._genre_ids = {self.genre_name(i): i for i in range(self.n_genres)}
+        return self._genre_ids.get(genre)
+
+    def themes(self):
+        """Liste des thèmes dans l'ordre du CSV"""
+        return list(self._themes)
+
+    def genres_for_theme(self, theme):
+        """Genres d'un thème dans l'ordre du CSV"""
+        theme_id = self._theme_ids.get(theme)
+        if theme_id is None:
+            return []
+        start, end = self._theme_offsets[theme_id], self._theme_offsets[theme_id + 1]
+        return [self.genre_name(g) for g in self._theme_genres[start:end]]
+
+    def themes_for_genre(self, genre):
+        """Thèmes d'un genre (nom exact)"""
+        genre_id = self.genre_id(genre)
+        if genre_id is None:
+            return []
+        start, end = self._genre_offsets[genre_id], self._genre_offsets[genre_id + 1]
+        return [self._themes[t] for t in self._genre_themes[start:end]]
+
+    def genres(self):
+        """Tous les genres dans l'ordre du CSV"""
+        return [self.genre_name(i) for i in range(self.n_genres)]
+
+
+class ThemeGenresView(Mapping):
+    """Mapping thème -> liste de genres, décodé à la demande et mémorisé"""
+
+    def __init__(self, catalog):
+        self._catalog = catalog
+        self._decoded = {}
+
+    def __getitem__(self, theme):
+        genres = self._decoded.get(theme)
+        if genres is None:
+            if theme not in self._catalog._theme_ids:
+                raise KeyError(theme)
+            genres = self._decoded[theme] = self._catalog.genres_for_theme(theme)
+        return genres
+
+    def __contains__(self, theme):
+        return theme in self._catalog._theme_ids
+
+    def __iter__(self):
+        return iter(self._catalog._themes)
+
+    def __len__(self):
+        return self._catalog.n_themes
+
+
+# 🔹 Genres sous forme canonique : « Lo-Fi », « lo fi » et « lo-fi » désignent le même genre
+_GENRE_SEPARATORS = str.maketrans({"-": " ", "_": " ", "/": " "})
+
+
+@lru_cache(maxsize=8192)
+def canonical_genre(genre):
+    """Forme canonique d'un genre : minuscules, sans accents, tirets et espaces multiples unifiés"""
+    decomposed = unicodedata.normalize("NFKD", genre.lower().translate(_GENRE_SEPARATORS))
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+class GenreThemeIndex(Mapping):
+    """
+    Index inverse immuable genre canonique -> thèmes
+
+    Un genre peut mener à plusieurs thèmes (dans l'ordre du CSV). Les clés
+    passées à la recherche sont mises sous forme canonique.
+    """
+
+    __slots__ = ("_themes",)
+
+    def __init__(self, theme_to_genres):
+        index = {}
+        for theme, genres in theme_to_genres.items():
+            for genre in genres:
+                themes = index.setdefault(canonical_genre(genre), [])
+                if theme not in themes:
+                    themes.append(theme)
+        self._themes = {genre: tuple(themes) for genre, themes in index.items()}
+
+    def __getitem__(self, genre):
+        return self._themes[canonical_genre(genre)]
+
+    def __contains__(self, genre):
+        return isinstance(genre, str) and canonical_genre(genre) in self._themes
+
+    def __iter__(self):
+        return iter(self._themes)
+
+    def __len__(self):
+        return len(self._themes)
+
+    def themes_for(self, genre):
+        """Thèmes d'un genre (tuple vide si le genre est inconnu)"""
+        return self._themes.get(canonical_genre(genre), ())
+
+    def classify(self, genres):
+        """
+        Classe une liste de genres
+
+        Returns:
+            Counter: thème -> nombre de genres de la liste qui y mènent
+        """
+        votes = Counter()
+        for genre in genres:
+            votes.update(self._themes.get(canonical_genre(genre), ()))
+        return votes
+
+
+def load_catalog(csv_path=GENRES_CSV, catalog_path=DEFAULT_CATALOG_PATH):
+    """
+    Charge le catalogue compilé, en le recompilant si le CSV a changé
+
+    Si le catalogue ne peut pas être écrit (disque en lecture seule), il est
+    compilé en mémoire.
+    """
+    fingerprint = _csv_fingerprint(csv_path)
+    try:
+        catalog = Catalog.from_file(catalog_path)
+        _, size, mtime_ns, *_ = _HEADER.unpack_from(catalog._buffer)
+        if (size, mtime_ns) == fingerprint:
+            return catalog
+    except (OSError, ValueError, struct.error):
+        pass
+
+    try:
+        build_catalog(csv_path, catalog_path)
+        return Catalog.from_file(catalog_path)
+    except OSError as e:
+        print(f"Impossible d'écrire le catalogue compilé ({e}), compilation en mémoire")
+        return Catalog(compile_catalog(csv_path))
+
+
+if __name__ == "__main__":
+    data = build_catalog()
+    catalog = Catalog(data)
+    print(f"Catalogue écrit dans {DEFAULT_CATALOG_PATH} : {len(data)} octets, "
+          f"{catalog.n_themes} thèmes, {catalog.n_genres} genres")
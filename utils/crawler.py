@@ -0,0 +1,207 @@
+"""
+Crawler hors ligne : récupère les morceaux de chaque genre du CSV et construit l'index local
+
+Usage :
+    python -m utils.crawler                          # Tous les genres, reprise automatique
+    python -m utils.crawler --themes calme,triste    # Seulement certains thèmes
+    python -m utils.crawler --record crawl.jsonl     # Enregistre les réponses Spotify
+    python -m utils.crawler --replay crawl.jsonl     # Rejoue un enregistrement (hors ligne)
+"""
+import os
+import json
+import time
+import argparse
+import threading
+
+from utils.fanout import fan_out
+from utils.tracks import normalize_track
+from utils.track_index import DEFAULT_INDEX_PATH, build_index
+from utils.catalog import load_catalog
+from utils.spotify_client import get_client
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_CHECKPOINT = os.path.join(ROOT_DIR, '.cache', 'crawl_checkpoint.jsonl')
+
+SEARCH_PAGE_SIZE = 50      # Maximum autorisé par l'API search
+
+
+class RateLimiter:
+    """Limiteur de débit simple (seau à jetons) partagé par les threads du crawler"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Attend qu'un jeton soit disponible"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RecordingSpotify:
+    """Enveloppe un client Spotify et enregistre chaque réponse dans un fichier JSONL"""
+
+    def __init__(self, client, path):
+        self._client = client
+        self._path = path
+        self._lock = threading.Lock()
+
+    def search(self, q, limit=10, offset=0, type="track", market=None):
+        response = self._client.search(q=q, limit=limit, offset=offset, type=type, market=market)
+        self._record("search", {"q": q, "limit": limit, "offset": offset, "type": type}, response)
+        return response
+
+    def artist_top_tracks(self, artist_id, country="US"):
+        response = self._client.artist_top_tracks(artist_id, country=country)
+        self._record("artist_top_tracks", {"artist_id": artist_id, "country": country}, response)
+        return response
+
+    def artists(self, artists):
+        response = self._client.artists(artists)
+        self._record("artists", {"artists": list(artists)}, response)
+        return response
+
+    def _record(self, method, params, response):
+        line = json.dumps({"method": method, "params": params, "response": response}, ensure_ascii=False)
+        with self._lock:
+            with open(self._path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+def load_genres(themes=None):
+    """
+    Lit le catalogue genres -> thèmes
+
+    Returns:
+        dict: genre -> liste de thèmes (ordre du CSV)
+    """
+    catalog = load_catalog()
+    genre_themes = {}
+    for theme in catalog.themes():
+        if themes and theme not in themes:
+            continue
+        for genre in catalog.genres_for_theme(theme):
+            genre_themes.setdefault(genre, []).append(theme)
+    return genre_themes
+
+
+def load_checkpoint(path):
+    """Relit les genres déjà crawlés (une ligne JSON par genre)"""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Dernière ligne tronquée par un arrêt brutal : le genre sera recrawlé
+                continue
+            records[record["genre"]] = record
+    return records
+
+
+def crawl_genre(client, limiter, genre, per_genre):
+    """Récupère jusqu'à per_genre morceaux d'un genre, page par page"""
+    tracks = []
+    offset = 0
+    while offset < per_genre:
+        limiter.acquire()
+        page_size = min(SEARCH_PAGE_SIZE, per_genre - offset)
+        results = client.search(q=f'genre:"{genre}"', type='track', limit=page_size, offset=offset)
+        items = (results or {}).get('tracks', {}).get('items') or []
+        tracks.extend(normalize_track(item, genre) for item in items if item)
+        if len(items) < page_size:
+            break
+        offset += page_size
+    return tracks
+
+
+def crawl(client, genre_themes, checkpoint_path, per_genre=50, workers=4, rate=5.0):
+    """
+    Crawle tous les genres non encore présents dans le checkpoint
+
+    Chaque genre terminé est ajouté immédiatement au checkpoint, un redémarrage
+    reprend donc là où le crawl s'était arrêté.
+
+    Returns:
+        list: Enregistrements {'genre', 'themes', 'tracks'} de tous les genres crawlés
+    """
+    done = load_checkpoint(checkpoint_path)
+    todo = [genre for genre in genre_themes if genre not in done]
+    print(f"{len(done)} genres déjà crawlés, {len(todo)} restants")
+
+    directory = os.path.dirname(checkpoint_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    limiter = RateLimiter(rate)
+    write_lock = threading.Lock()
+    progress = {"done": 0, "errors": 0}
+
+    def crawl_and_checkpoint(genre):
+        try:
+            tracks = crawl_genre(client, limiter, genre, per_genre)
+        except Exception as e:
+            print(f"Erreur lors du crawl du genre {genre}: {e}")
+            progress["errors"] += 1
+            return None
+        record = {"genre": genre, "themes": genre_themes[genre], "tracks": tracks}
+        with write_lock:
+            with open(checkpoint_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            progress["done"] += 1
+            if progress["done"] % 100 == 0:
+                print(f"  {progress['done']}/{len(todo)} genres crawlés")
+        return record
+
+    results, _ = fan_out(crawl_and_checkpoint, todo, max_in_flight=workers, deadline=0)
+    for genre, record in results:
+        if record is not None:
+            done[genre] = record
+    print(f"Crawl terminé : {progress['done']} genres, {progress['errors']} erreurs")
+    return [done[genre] for genre in genre_themes if genre in done]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=DEFAULT_INDEX_PATH, help="Fichier d'index à écrire")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="Fichier de reprise")
+    parser.add_argument("--themes", help="Thèmes à crawler, séparés par des virgules (défaut : tous)")
+    parser.add_argument("--per-genre", type=int, default=50, help="Morceaux par genre")
+    parser.add_argument("--workers", type=int, default=4, help="Requêtes simultanées")
+    parser.add_argument("--rate", type=float, default=5.0, help="Requêtes Spotify par seconde")
+    parser.add_argument("--record", help="Enregistre les réponses Spotify dans ce fichier JSONL")
+    parser.add_argument("--replay", help="Rejoue un enregistrement au lieu d'appeler Spotify")
+    args = parser.parse_args(argv)
+
+    if args.replay:
+        from benchmarks.fake_spotify import ReplaySpotify
+        client = ReplaySpotify.from_file(args.replay)
+    else:
+        client = get_client()
+    if args.record:
+        client = RecordingSpotify(client, args.record)
+
+    themes = set(args.themes.split(",")) if args.themes else None
+    genre_themes = load_genres(themes=themes)
+    start = time.perf_counter()
+    records = crawl(client, genre_themes, args.checkpoint, per_genre=args.per_genre,
+                    workers=args.workers, rate=args.rate)
+    count = build_index(records, args.out)
+    print(f"Index écrit dans {args.out} : {count} morceaux, {len(records)} genres "
+          f"({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import time
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# 🔹 Paramètres du fan-out concurrent
+FANOUT_MAX_WORKERS = 16    # Taille du pool partagé par tout le processus
+FANOUT_MAX_IN_FLIGHT = 8   # Requêtes simultanées par appel
+FANOUT_DEADLINE = 5.0      # Délai maximum par appel (secondes)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Retourne le pool de threads partagé (créé au premier usage)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=FANOUT_MAX_WORKERS,
+                    thread_name_prefix="mood2music-fanout"
+                )
+    return _executor
+
+
+def _fan_out_indexed(func, items, max_in_flight, deadline):
+    """Moteur du fan-out : produit (position, résultat) dans l'ordre de complétion"""
+    if not items:
+        return True
+
+    max_in_flight = max(1, max_in_flight or FANOUT_MAX_IN_FLIGHT)
+    deadline = FANOUT_DEADLINE if deadline is None else deadline
+    end_time = time.monotonic() + deadline if deadline else None
+
+    executor = get_executor()
+    pending = {}
+    next_index = 0
+    complete = True
+
+    try:
+        while next_index < len(items) or pending:
+            # Remplir jusqu'à max_in_flight requêtes en cours
+            while next_index < len(items) and len(pending) < max_in_flight:
+                # Chaque tâche hérite du contexte de l'appelant (priorité Spotify...)
+                future = executor.submit(contextvars.copy_context().run, func, items[next_index])
+                pending[future] = next_index
+                next_index += 1
+
+            timeout = None
+            if end_time is not None:
+                timeout = end_time - time.monotonic()
+                if timeout <= 0:
+                    complete = False
+                    break
+
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                complete = False
+                break
+
+            for future in sorted(done, key=pending.get):
+                index = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"Erreur dans le fan-out pour {items[index]}: {e}")
+                    complete = False
+                    continue
+                yield index, result
+    finally:
+        # Délai dépassé ou consommateur arrêté : abandonner les requêtes restantes
+        for future in pending:
+            future.cancel()
+
+    return complete
+
+
+def fan_out_iter(func, items, max_in_flight=None, deadline=None):
+    """
+    Variante de fan_out qui produit les résultats au fur et à mesure qu'ils arrivent
+
+    Yields:
+        tuple: (élément, résultat) dans l'ordre de complétion
+
+    Returns:
+        bool: True si tous les éléments ont produit un résultat (valeur de StopIteration)
+    """
+    items = list(items)
+    stream = _fan_out_indexed(func, items, max_in_flight, deadline)
+    try:
+        while True:
+            try:
+                index, result = next(stream)
+            except StopIteration as stop:
+                return stop.value
+            yield items[index], result
+    finally:
+        stream.close()
+
+
+def fan_out(func, items, max_in_flight=None, deadline=None):
+    """
+    Applique func à chaque élément avec une concurrence bornée et un délai maximum
+
+    Args:
+        func (callable): Fonction appelée avec un élément
+        items (iterable): Éléments à traiter
+        max_in_flight (int): Nombre maximum d'appels simultanés
+        deadline (float): Délai maximum en secondes (None = valeur par défaut, 0 = pas de limite)
+
+    Returns:
+        tuple: (liste de (élément, résultat) dans l'ordre d'entrée,
+                True si tous les éléments ont produit un résultat sans erreur)
+    """
+    items = list(items)
+    results = {}
+    stream = _fan_out_indexed(func, items, max_in_flight, deadline)
+    while True:
+        try:
+            index, result = next(stream)
+        except StopIteration as stop:
+            complete = stop.value
+            break
+        results[index] = result
+    return [(items[i], results[i]) for i in sorted(results)], complete
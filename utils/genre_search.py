@@ -0,0 +1,92 @@
+import heapq
+from array import array
+from itertools import chain
+from collections import Counter
+
+from utils.catalog import canonical_genre
+
+# 🔹 Recherche approximative dans les genres et thèmes du catalogue
+#
+# Index inversé de trigrammes de caractères : trigramme -> identifiants des noms
+# qui le contiennent. Une requête compte les trigrammes partagés avec chaque nom
+# (un seul Counter sur les listes concaténées, sans boucle Python par nom) puis
+# les classe par coefficient de Dice : 2 × communs / (trigrammes requête + nom).
+
+NGRAM = 3             # Taille des n-grammes
+MIN_SCORE = 0.3       # Score minimum d'un résultat (0-1)
+
+
+def _padded_ngrams(padded, n):
+    if len(padded) <= n:
+        return {padded} if padded.strip() else set()
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def ngrams(text, n=NGRAM):
+    """
+    Ensemble des n-grammes de caractères d'un texte canonique, bords compris
+
+    Les noms en plusieurs mots ajoutent les n-grammes de leur forme sans espaces :
+    « lofi » retrouve « Lo-Fi » et « hiphop » retrouve « Hip Hop ».
+    """
+    canonical = canonical_genre(text)
+    grams = _padded_ngrams(f" {canonical} ", n)
+    if " " in canonical:
+        grams |= _padded_ngrams(f" {canonical.replace(' ', '')} ", n)
+    return grams
+
+
+class GenreSearchIndex:
+    """
+    Index de recherche approximative sur des noms (genres et thèmes)
+
+    Construit une fois puis en lecture seule : les recherches ne prennent pas de verrou.
+    """
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (iterable): Paires (type, nom), ex. ("genre", "Synthwave") ou ("theme", "calme")
+        """
+        self._entries = []
+        self._sizes = array("I")
+        postings = {}
+        seen = set()
+        for kind, name in entries:
+            if not name or (kind, canonical_genre(name)) in seen:
+                continue
+            seen.add((kind, canonical_genre(name)))
+            entry_id = len(self._entries)
+            grams = ngrams(name)
+            self._entries.append((kind, name))
+            self._sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, array("I")).append(entry_id)
+        self._postings = postings
+
+    def __len__(self):
+        return len(self._entries)
+
+    def search(self, query, limit=10, min_score=MIN_SCORE, kind=None):
+        """
+        Retourne les noms les plus proches de la requête
+
+        Args:
+            query (str): Texte libre (casse, accents et tirets ignorés)
+            limit (int): Nombre maximum de résultats
+            min_score (float): Score minimum (1.0 = même nom canonique)
+            kind (str): Limiter à "genre" ou "theme"
+
+        Returns:
+            list: Dicts {'type', 'name', 'score'}, par score décroissant
+        """
+        grams = ngrams(query)
+        if not grams:
+            return []
+        shared = Counter(chain.from_iterable(self._postings.get(gram, ()) for gram in grams))
+        size, sizes, entries = len(grams), self._sizes, self._entries
+        scored = ((2 * count / (size + sizes[entry_id]), -entry_id) for entry_id, count in shared.items()
+                  if kind is None or entries[entry_id][0] == kind)
+        best = heapq.nlargest(limit, (item for item in scored if item[0] >= min_score))
+        return [{"type": entries[-neg_id][0], "name": entries[-neg_id][1], "score": round(score, 3)}
+                for score, neg_id in best]
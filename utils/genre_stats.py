@@ -0,0 +1,389 @@
+"""
+Statistiques de rendement par genre
+
+Chaque appel Spotify pour un genre est enregistré (morceaux demandés et reçus,
+popularité, erreurs) dans une base SQLite partagée par les workers. Le choix des
+genres d'un thème s'appuie dessus : les genres qui remplissent le mieux leurs
+réponses passent en premier, ceux qui reviennent vides plusieurs fois de suite sont
+écartés pour un temps, et une petite part des choix explore les autres genres.
+
+Usage : python -m utils.genre_stats [--themes calme,joyeux] [--db chemin] [--genres]   # rapport par thème
+"""
+import os
+import sys
+import time
+import atexit
+import random
+import sqlite3
+import argparse
+import threading
+
+ROOT_DIR = os.path.dirname(os.path.dirname(__file__))
+DEFAULT_STATS_PATH = os.path.join(ROOT_DIR, '.cache', 'genre_stats.sqlite')
+BUSY_TIMEOUT_MS = 5000
+
+SUPPRESS_AFTER = 3        # Réponses vides consécutives avant d'écarter un genre
+SUPPRESS_FOR = 86400      # Un genre écarté n'est plus choisi pendant 24 h (sauf exploration)
+EXPLORE_RATE = 0.1        # Probabilité de remplacer le dernier genre choisi par un genre non choisi
+PRIOR_REQUESTED = 4       # Un genre jamais interrogé compte comme une réponse de 4 morceaux...
+PRIOR_FILL = 0.5          # ... remplie à moitié
+PRIOR_POPULARITY = 50     # Popularité moyenne supposée sans morceau reçu
+RELOAD_INTERVAL = 60      # Relecture des statistiques écrites par les autres processus (secondes)
+FLUSH_INTERVAL = 2.0      # Écriture des appels enregistrés en attente (secondes)...
+FLUSH_BATCH = 200         # ... ou dès que tant d'appels attendent
+
+# Compteurs cumulés d'un genre, dans l'ordre des colonnes de la table
+_FIELDS = ("calls", "requested", "tracks", "popularity", "empty", "errors", "empty_streak", "last_call")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS genre_yield (
+    genre TEXT PRIMARY KEY,
+    calls INTEGER NOT NULL,
+    requested INTEGER NOT NULL,
+    tracks INTEGER NOT NULL,
+    popularity REAL NOT NULL,
+    empty INTEGER NOT NULL,
+    errors INTEGER NOT NULL,
+    empty_streak INTEGER NOT NULL,
+    last_call REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Les compteurs s'additionnent : plusieurs processus peuvent enregistrer en même temps
+_UPSERT = """
+INSERT INTO genre_yield (genre, calls, requested, tracks, popularity, empty, errors, empty_streak, last_call)
+VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (genre) DO UPDATE SET
+    calls = calls + 1,
+    requested = requested + excluded.requested,
+    tracks = tracks + excluded.tracks,
+    popularity = popularity + excluded.popularity,
+    empty = empty + excluded.empty,
+    errors = errors + excluded.errors,
+    empty_streak = CASE WHEN excluded.tracks > 0 THEN 0 ELSE empty_streak + 1 END,
+    last_call = MAX(last_call, excluded.last_call)
+"""
+
+
+class GenreStats:
+    """
+    Rendement cumulé des genres et choix des genres à interroger
+
+    Les statistiques sont gardées en mémoire (lectures et enregistrements sans I/O).
+    Un thread d'écriture reporte les appels enregistrés dans SQLite par lots, toutes
+    les FLUSH_INTERVAL secondes ou dès FLUSH_BATCH appels en attente : les workers
+    d'un thème n'attendent jamais le verrou de la base. Ce thread relit aussi celles
+    des autres processus toutes les RELOAD_INTERVAL secondes.
+
+    Args:
+        path (str): Fichier SQLite (None : statistiques en mémoire seulement)
+        explore_rate (float): Probabilité d'explorer un genre non choisi à chaque sélection
+        rng (random.Random): Générateur pour l'exploration (reproductible dans les benchmarks)
+    """
+
+    def __init__(self, path=None, explore_rate=EXPLORE_RATE, rng=None):
+        self.path = path
+        self.explore_rate = explore_rate
+        self._rng = rng or random.Random()
+        self._genres = {}   # genre -> liste des compteurs (_FIELDS)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._pending = []   # Appels enregistrés pas encore écrits (paramètres de _UPSERT)
+        self._flush_lock = threading.Lock()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._counters = {"selections": 0, "explored": 0, "suppressed": 0}
+
+    def _connect(self):
+        """Retourne la connexion du thread courant (créée au premier usage)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        with self._init_lock:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.executescript(_SCHEMA)
+                self._initialized = True
+        conn.execute("PRAGMA synchronous = NORMAL")
+        self._local.conn = conn
+        return conn
+
+    def _ensure_writer(self):
+        """Démarre le thread d'écriture au premier usage (rien à écrire sans base)"""
+        if self._writer is not None or not self.path:
+            return
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name="mood2music-genre-stats",
+                                                daemon=True)
+                self._writer.start()
+                atexit.register(self.flush)
+
+    def _write_loop(self):
+        self.reload()
+        next_reload = time.monotonic() + RELOAD_INTERVAL
+        while not self._stop.is_set():
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            try:
+                if time.monotonic() >= next_reload:
+                    next_reload = time.monotonic() + RELOAD_INTERVAL
+                    self.reload()
+                else:
+                    self.flush()
+            except Exception as e:
+                print(f"Erreur d'écriture des statistiques de genres: {e}")
+        self.flush()
+        self._close_connection()
+
+    def _write_pending(self):
+        """Écrit les appels en attente en une transaction (appelant : _flush_lock tenu)"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch:
+            return
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(_UPSERT, batch)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            print(f"Erreur d'écriture des statistiques de genres ({len(batch)} appels perdus): {e}")
+
+    def flush(self):
+        """Écrit tout de suite les appels enregistrés en attente"""
+        if not self.path:
+            return
+        with self._flush_lock:
+            self._write_pending()
+
+    def reload(self):
+        """
+        Relit toutes les statistiques de la base (elle fait foi : chaque appel y est écrit)
+
+        Les appels en attente sont écrits avant la lecture ; ceux enregistrés pendant
+        la lecture sont réappliqués pour ne pas disparaître de la mémoire.
+        """
+        with self._flush_lock:
+            try:
+                self._write_pending()
+                rows = self._connect().execute(f"SELECT genre, {', '.join(_FIELDS)} FROM genre_yield").fetchall()
+            except sqlite3.Error as e:
+                print(f"Erreur de lecture des statistiques de genres: {e}")
+                return
+            with self._lock:
+                genres = {row[0]: list(row[1:]) for row in rows}
+                for params in self._pending:
+                    self._apply(genres, params)
+                self._genres = genres
+
+    @staticmethod
+    def _apply(genres, params):
+        """Ajoute un appel (paramètres de _UPSERT) aux compteurs en mémoire"""
+        genre, requested, received, popularity, empty, errors, _, now = params
+        counters = genres.get(genre)
+        if counters is None:
+            counters = genres[genre] = [0] * len(_FIELDS)
+        counters[0] += 1
+        counters[1] += requested
+        counters[2] += received
+        counters[3] += popularity
+        counters[4] += empty
+        counters[5] += errors
+        counters[6] = 0 if received else counters[6] + 1
+        counters[7] = max(counters[7], now)
+
+    def record(self, genre, requested, tracks=(), error=False):
+        """
+        Enregistre un appel Spotify pour un genre
+
+        Args:
+            genre (str): Genre interrogé
+            requested (int): Nombre de morceaux demandés
+            tracks (list): Morceaux normalisés reçus
+            error (bool): L'appel a échoué (hors saturation de Spotify, qui ne dit rien du genre)
+        """
+        received = len(tracks)
+        empty = 0 if received else 1
+        params = (genre, requested, received, sum(track.get('popularity', 0) or 0 for track in tracks),
+                  empty, 1 if error else 0, empty, time.time())
+        with self._lock:
+            self._apply(self._genres, params)
+            if not self.path:
+                return
+            self._pending.append(params)
+            full = len(self._pending) >= FLUSH_BATCH
+        self._ensure_writer()
+        if full:
+            self._wake.set()
+
+    def get(self, genre):
+        """Statistiques d'un genre (dict), ou None s'il n'a jamais été interrogé"""
+        with self._lock:
+            counters = self._genres.get(genre)
+            counters = list(counters) if counters is not None else None
+        if counters is None:
+            return None
+        stats = dict(zip(_FIELDS, counters))
+        calls, requested, tracks = stats["calls"], stats["requested"], stats["tracks"]
+        stats["fill_rate"] = tracks / requested if requested else 0.0
+        stats["avg_popularity"] = stats["popularity"] / tracks if tracks else None
+        stats["error_rate"] = stats["errors"] / calls if calls else 0.0
+        stats["suppressed"] = self._is_suppressed(counters, time.time())
+        return stats
+
+    @staticmethod
+    def _is_suppressed(counters, now):
+        return counters[6] >= SUPPRESS_AFTER and now - counters[7] < SUPPRESS_FOR
+
+    def score(self, genre):
+        """
+        Rendement attendu d'un genre : part des morceaux demandés effectivement reçus
+        (lissée vers PRIOR_FILL pour les genres peu interrogés), pondérée par leur popularité
+        """
+        counters = self._genres.get(genre)
+        requested, tracks, popularity = counters[1:4] if counters is not None else (0, 0, 0)
+        fill = (tracks + PRIOR_FILL * PRIOR_REQUESTED) / (requested + PRIOR_REQUESTED)
+        avg_popularity = popularity / tracks if tracks else PRIOR_POPULARITY
+        return fill * (0.5 + avg_popularity / 200)
+
+    def select(self, genres, count):
+        """
+        Choisit au plus count genres à interroger parmi ceux d'un thème
+
+        Les genres sont classés par score (ordre du catalogue à égalité : sans
+        statistiques, la sélection est celle d'avant) ; les genres écartés ne sont
+        repris que si aucun autre n'est disponible. Avec une probabilité
+        explore_rate, le dernier choisi est remplacé par un genre non choisi, écartés
+        compris, pour mesurer les genres peu ou pas interrogés.
+
+        Returns:
+            list: Genres choisis, dans l'ordre de priorité
+        """
+        self._ensure_writer()
+        now = time.time()
+        with self._lock:
+            active, suppressed = [], []
+            for genre in genres:
+                counters = self._genres.get(genre)
+                if counters is not None and self._is_suppressed(counters, now):
+                    suppressed.append(genre)
+                else:
+                    active.append(genre)
+            ranked = sorted(active, key=self.score, reverse=True)
+            selected = ranked[:count] or suppressed[:count]
+            rest = ranked[count:] + (suppressed if active else suppressed[count:])
+            self._counters["selections"] += 1
+            self._counters["suppressed"] += len(suppressed) if active else 0
+            if selected and rest and self._rng.random() < self.explore_rate:
+                selected[-1] = self._rng.choice(rest)
+                self._counters["explored"] += 1
+        return selected
+
+    def report(self, theme_to_genres, themes=None):
+        """
+        Rapport de rendement par thème
+
+        Returns:
+            list: Un dict par thème (totaux, appels par morceau utile, genres écartés,
+            genres triés par score), les thèmes les moins rentables en premier
+        """
+        rows = []
+        for theme in themes or theme_to_genres:
+            genres = list(theme_to_genres.get(theme, []))
+            per_genre = [(genre, self.get(genre)) for genre in genres]
+            probed = [stats for _, stats in per_genre if stats is not None]
+            calls = sum(stats["calls"] for stats in probed)
+            tracks = sum(stats["tracks"] for stats in probed)
+            rows.append({
+                "theme": theme,
+                "genres": len(genres),
+                "probed": len(probed),
+                "suppressed": sum(1 for stats in probed if stats["suppressed"]),
+                "calls": calls,
+                "tracks": tracks,
+                "calls_per_track": calls / tracks if tracks else None,
+                "errors": sum(stats["errors"] for stats in probed),
+                "ranking": sorted(((genre, self.score(genre), stats) for genre, stats in per_genre),
+                                  key=lambda row: row[1], reverse=True),
+            })
+        rows.sort(key=lambda row: (row["calls_per_track"] is None, -(row["calls_per_track"] or 0)))
+        return rows
+
+    def stats(self):
+        with self._lock:
+            now = time.time()
+            return dict(self._counters, genres=len(self._genres), pending_writes=len(self._pending),
+                        suppressed_genres=sum(1 for c in self._genres.values() if self._is_suppressed(c, now)))
+
+    def close(self):
+        """Arrête le thread d'écriture après un dernier lot et ferme la connexion"""
+        self._stop.set()
+        self._wake.set()
+        if self._writer is not None:
+            self._writer.join(timeout=BUSY_TIMEOUT_MS / 1000)
+        self.flush()
+        self._close_connection()
+
+    def _close_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _format_rate(value, digits=2):
+    return "-" if value is None else f"{value:.{digits}f}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.getenv("MOOD2MUSIC_GENRE_STATS", DEFAULT_STATS_PATH),
+                        help="Base des statistiques de genres")
+    parser.add_argument("--themes", help="Thèmes du rapport, séparés par des virgules (défaut : tous)")
+    parser.add_argument("--genres", action="store_true", help="Détaille les genres de chaque thème")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"Aucune statistique : {args.db} n'existe pas")
+        return 1
+    from utils.catalog import load_catalog  # Import différé
+    theme_to_genres = load_catalog().theme_to_genres
+    stats = GenreStats(args.db)
+    stats.reload()
+    themes = [theme.strip() for theme in args.themes.split(",")] if args.themes else None
+
+    print(f"{'thème':<24} {'genres':>6} {'testés':>6} {'écartés':>7} {'appels':>7} "
+          f"{'morceaux':>8} {'appels/morceau':>14} {'erreurs':>7}")
+    for row in stats.report(theme_to_genres, themes):
+        print(f"{row['theme']:<24} {row['genres']:>6} {row['probed']:>6} {row['suppressed']:>7} "
+              f"{row['calls']:>7} {row['tracks']:>8} {_format_rate(row['calls_per_track']):>14} {row['errors']:>7}")
+        if not args.genres:
+            continue
+        for genre, score, genre_stats in row["ranking"]:
+            if genre_stats is None:
+                continue
+            status = " écarté" if genre_stats["suppressed"] else ""
+            print(f"    {genre:<32} score {score:.2f} | {genre_stats['calls']} appels, "
+                  f"remplissage {genre_stats['fill_rate']:.0%}, "
+                  f"popularité {_format_rate(genre_stats['avg_popularity'], 0)}, "
+                  f"erreurs {genre_stats['error_rate']:.0%}{status}")
+        if row["genres"] > row["probed"]:
+            print(f"    + {row['genres'] - row['probed']} genre(s) jamais interrogé(s)")
+    stats.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import time
+import threading
+from types import MappingProxyType
+
+from utils.metrics import REGISTRY, CALLS_BUCKETS, count_spotify_calls
+from utils.scheduler import BACKGROUND, priority
+
+# 🔹 Playlists matérialisées : construites en arrière-plan à intervalle fixe, lues sans calcul
+#
+# Chaque rafraîchissement construit toutes les playlists puis remplace l'instantané
+# d'un coup (une affectation) : un lecteur voit soit l'ancien, soit le nouveau, jamais
+# un mélange. Les instantanés ne sont jamais modifiés après leur publication.
+
+REGISTRY.describe("playlist_refresh_seconds", "histogram", "Durée d'un rafraîchissement des playlists matérialisées")
+REGISTRY.describe("playlist_refresh_api_calls", "histogram", "Appels Spotify par rafraîchissement des playlists")
+REGISTRY.describe("playlist_refresh_errors_total", "counter", "Playlists dont la construction a échoué (ancienne version gardée)")
+
+
+class Snapshot:
+    """Instantané immuable des playlists (clé -> tuple de morceaux)"""
+
+    __slots__ = ("playlists", "built_at", "duration", "api_calls")
+
+    def __init__(self, playlists, built_at, duration, api_calls):
+        self.playlists = MappingProxyType(dict(playlists))
+        self.built_at = built_at
+        self.duration = duration
+        self.api_calls = api_calls
+
+    def age(self):
+        """Secondes écoulées depuis la construction (None si jamais construit)"""
+        return None if self.built_at is None else time.time() - self.built_at
+
+
+EMPTY_SNAPSHOT = Snapshot({}, None, None, 0)
+
+
+class PlaylistMaterializer:
+    """
+    Reconstruit périodiquement un ensemble de playlists et publie un instantané
+
+    Args:
+        jobs (callable): Retourne un dict clé -> fonction sans argument qui construit
+            les playlists de cette clé, sous forme de dict clé -> liste de morceaux
+            (une construction peut produire plusieurs tailles d'un même classement)
+        interval (float): Secondes entre deux rafraîchissements
+    """
+
+    def __init__(self, jobs, interval):
+        self.jobs = jobs
+        self.interval = interval
+        self._snapshot = EMPTY_SNAPSHOT
+        self._refresh_lock = threading.Lock()
+        self._started = threading.Event()
+        self._start_lock = threading.Lock()   # Distinct de _refresh_lock : start() n'attend jamais une reconstruction
+        self._stop = threading.Event()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    def get(self, key):
+        """Playlist matérialisée (tuple de morceaux), ou None si elle n'est pas (encore) construite"""
+        return self._snapshot.playlists.get(key)
+
+    def refresh(self):
+        """Construit toutes les playlists et publie le nouvel instantané"""
+        with self._refresh_lock:
+            previous = self._snapshot.playlists
+            playlists = {}
+            start = time.perf_counter()
+            # Les appels Spotify du rafraîchissement passent après les requêtes interactives
+            with priority(BACKGROUND), count_spotify_calls("playlists") as calls:
+                for name, build in self.jobs().items():
+                    try:
+                        built = build()
+                    except Exception as e:
+                        print(f"Erreur lors de la construction de la playlist {name}: {e}")
+                        built = {}
+                    if not built or not all(built.values()):
+                        REGISTRY.inc("playlist_refresh_errors_total")
+                    for key, tracks in built.items():
+                        if tracks:
+                            playlists[key] = tuple(tracks)
+            # Une playlist qui n'a pas pu être reconstruite garde sa version précédente
+            for key, tracks in previous.items():
+                playlists.setdefault(key, tracks)
+            duration = time.perf_counter() - start
+            self._snapshot = Snapshot(playlists, time.time(), duration, calls.api_calls)
+        REGISTRY.observe("playlist_refresh_seconds", duration)
+        REGISTRY.histogram("playlist_refresh_api_calls", buckets=CALLS_BUCKETS).observe(calls.api_calls)
+        return self._snapshot
+
+    def start(self):
+        """Démarre (une seule fois) le rafraîchissement périodique dans un thread daemon"""
+        if self._started.is_set():
+            return
+        with self._start_lock:
+            if self._started.is_set():
+                return
+            self._started.set()
+        threading.Thread(target=self._run, name="mood2music-playlists", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Erreur lors du rafraîchissement des playlists: {e}")
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            "playlists": len(snapshot.playlists),
+            "age_seconds": snapshot.age(),
+            "build_seconds": snapshot.duration,
+            "api_calls": snapshot.api_calls,
+        }
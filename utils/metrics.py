@@ -0,0 +1,335 @@
+"""
+Métriques du backend : histogrammes de latence, compteurs et appels API par rerun
+
+Les métriques vivent en mémoire dans le processus Streamlit (REGISTRY). Elles sont
+exposées au format Prometheus (/metrics) ou JSON (/metrics.json) par un petit
+serveur HTTP local, démarré si MOOD2MUSIC_METRICS_PORT est défini.
+
+Usage :
+    python -m utils.metrics                      # Lit http://127.0.0.1:9464/metrics
+    python -m utils.metrics --json               # Même chose au format JSON
+    python -m utils.metrics --url http://hote:port
+"""
+import json
+import time
+import bisect
+import argparse
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+DEFAULT_METRICS_PORT = 9464
+
+# Bornes des histogrammes de latence (secondes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Bornes de l'histogramme des appels Spotify par rerun
+CALLS_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Bornes des histogrammes de volume (octets)
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+class Histogram:
+    """Histogramme à bornes fixes (observation en O(log n), sans allocation)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)   # dernier compteur : +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimation d'un quantile (borne supérieure du bucket qui le contient)"""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank and count:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self):
+        with self._lock:
+            return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+class MetricsRegistry:
+    """
+    Registre des métriques du processus
+
+    Les compteurs et histogrammes sont identifiés par un nom et des labels. Les
+    collecteurs (fonctions sans argument) sont appelés seulement à l'export, pour
+    publier des valeurs déjà comptées ailleurs (stats du cache, de l'ordonnanceur...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def histogram(self, name, buckets=LATENCY_BUCKETS, **labels):
+        """Retourne l'histogramme (name, labels), créé au premier usage"""
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(buckets))
+        return histogram
+
+    def observe(self, name, value, **labels):
+        self.histogram(name, **labels).observe(value)
+
+    def register_collector(self, collector):
+        """
+        Ajoute un collecteur appelé à chaque export
+
+        Args:
+            collector (callable): Retourne une liste de (nom, type, labels, valeur),
+                type valant "counter" ou "gauge"
+        """
+        self._collectors.append(collector)
+
+    def _collect(self):
+        samples = []
+        with self._lock:
+            samples.extend((name, "counter", dict(labels), value)
+                           for (name, labels), value in self._counters.items())
+            histograms = list(self._histograms.items())
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                print(f"Erreur dans un collecteur de métriques: {e}")
+        return samples, histograms
+
+    def to_json(self):
+        """Retourne toutes les métriques sous forme de dict sérialisable"""
+        samples, histograms = self._collect()
+        result = {"counters": [], "gauges": [], "histograms": []}
+        for name, kind, labels, value in samples:
+            result["counters" if kind == "counter" else "gauges"].append(
+                {"name": name, "labels": labels, "value": value})
+        for (name, labels), histogram in histograms:
+            snapshot = histogram.snapshot()
+            snapshot.update(name=name, labels=dict(labels),
+                            p50=histogram.quantile(0.5), p95=histogram.quantile(0.95))
+            result["histograms"].append(snapshot)
+        return result
+
+    def to_prometheus(self):
+        """Retourne toutes les métriques au format texte Prometheus"""
+        samples, histograms = self._collect()
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name in described:
+                return
+            described.add(name)
+            help_text = self._help.get(name, (kind, ""))[1]
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, kind, labels, value in sorted(samples, key=lambda s: (s[0], sorted(s[2].items()))):
+            header(name, kind)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), histogram in sorted(histograms, key=lambda h: h[0]):
+            header(name, "histogram")
+            snapshot = histogram.snapshot()
+            labels = dict(labels)
+            cumulative = 0
+            for bound, count in zip(snapshot["buckets"] + ["+Inf"], snapshot["counts"]):
+                cumulative += count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(dict(labels, le=le))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(snapshot['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = MetricsRegistry()
+REGISTRY.describe("backend_call_seconds", "histogram", "Durée des fonctions publiques du backend")
+REGISTRY.describe("backend_errors_total", "counter", "Exceptions levées par les fonctions du backend")
+REGISTRY.describe("spotify_request_seconds", "histogram", "Durée des appels à l'API Spotify par endpoint")
+REGISTRY.describe("spotify_requests_total", "counter", "Appels à l'API Spotify par endpoint et statut")
+REGISTRY.describe("api_calls_per_rerun", "histogram", "Appels Spotify déclenchés par un rerun de page")
+REGISTRY.describe("reruns_total", "counter", "Reruns de page instrumentés")
+REGISTRY.describe("rerun_seconds", "histogram", "Durée des sections instrumentées d'un rerun")
+REGISTRY.describe("spotify_shed_total", "counter", "Appels Spotify rejetés par l'ordonnanceur (budget épuisé)")
+REGISTRY.describe("spotify_queue_wait_seconds", "histogram", "Attente dans l'ordonnanceur avant un appel Spotify")
+
+
+# 🔹 Appels Spotify par rerun : compteur porté par le contexte (propagé au fan-out)
+_rerun_calls = ContextVar("mood2music_rerun_calls", default=None)
+
+
+class RerunScope:
+    """Appels Spotify comptés pendant un rerun (voir rerun_scope)"""
+
+    def __init__(self, page):
+        self.page = page
+        self.api_calls = 0
+        self.started = time.perf_counter()
+        self.duration = None
+        self._lock = threading.Lock()
+
+    def add_call(self, count=1):
+        with self._lock:
+            self.api_calls += count
+
+
+@contextmanager
+def count_spotify_calls(label):
+    """Compte les appels Spotify faits pendant le bloc (fan-out compris), sans publier de métrique"""
+    scope = RerunScope(label)
+    token = _rerun_calls.set(scope)
+    try:
+        yield scope
+    finally:
+        _rerun_calls.reset(token)
+        scope.duration = time.perf_counter() - scope.started
+
+
+@contextmanager
+def rerun_scope(page):
+    """
+    Compte les appels Spotify faits pendant le bloc (un rerun Streamlit)
+
+    Les threads du fan-out héritent du contexte et comptent dans le même rerun ;
+    les rafraîchissements en arrière-plan n'y sont pas comptés.
+    """
+    with count_spotify_calls(page) as scope:
+        try:
+            yield scope
+        finally:
+            scope.duration = time.perf_counter() - scope.started
+            REGISTRY.inc("reruns_total", page=page)
+            REGISTRY.histogram("api_calls_per_rerun", buckets=CALLS_BUCKETS, page=page).observe(scope.api_calls)
+            REGISTRY.histogram("rerun_seconds", page=page).observe(scope.duration)
+
+
+def current_rerun():
+    """RerunScope du rerun en cours, ou None hors d'un rerun_scope"""
+    return _rerun_calls.get()
+
+
+def record_spotify_call(endpoint, duration, status="ok"):
+    """Enregistre un appel à l'API Spotify (latence, statut, rerun courant)"""
+    REGISTRY.observe("spotify_request_seconds", duration, endpoint=endpoint)
+    # Statut en texte : les codes HTTP (429, 503) sont triés avec "ok" et "error" à l'export
+    REGISTRY.inc("spotify_requests_total", endpoint=endpoint, status=str(status))
+    scope = _rerun_calls.get()
+    if scope is not None:
+        scope.add_call()
+
+
+def instrumented(func):
+    """Décorateur : histogramme de latence et compteur d'erreurs pour une fonction du backend"""
+    histogram = None
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal histogram
+        if histogram is None:
+            histogram = REGISTRY.histogram("backend_call_seconds", function=func.__name__)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            REGISTRY.inc("backend_errors_total", function=func.__name__)
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start)
+    return wrapper
+
+
+# 🔹 Export HTTP local
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=DEFAULT_METRICS_PORT, host="127.0.0.1", registry=REGISTRY):
+    """Démarre (une seule fois par processus) le serveur HTTP des métriques dans un thread daemon"""
+    global _server
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") == "/metrics.json":
+                body = json.dumps(registry.to_json(), ensure_ascii=False).encode("utf-8")
+                content_type = "application/json"
+            elif self.path.rstrip("/") in ("", "/metrics"):
+                body = registry.to_prometheus().encode("utf-8")
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), MetricsHandler)
+            threading.Thread(target=_server.serve_forever, name="mood2music-metrics", daemon=True).start()
+    return _server
+
+
+def main(argv=None):
+    from urllib.request import urlopen
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=f"http://127.0.0.1:{DEFAULT_METRICS_PORT}",
+                        help="Adresse du serveur de métriques")
+    parser.add_argument("--json", action="store_true", help="Format JSON au lieu de Prometheus")
+    args = parser.parse_args(argv)
+
+    path = "/metrics.json" if args.json else "/metrics"
+    with urlopen(args.url.rstrip("/") + path, timeout=5) as response:
+        print(response.read().decode("utf-8"))
+
+
+if __name__ == "__main__":
+    main()
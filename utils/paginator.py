@@ -0,0 +1,200 @@
+import json
+import heapq
+import base64
+import math
+
+from utils.fanout import fan_out
+from utils.ranking import track_key
+
+# 🔹 Pagination incrémentale d'un thème : fusion paresseuse des flux par genre
+GENRE_PAGE_SIZE = 10      # Morceaux demandés à Spotify par page de genre
+MAX_GENRE_BATCH = 16      # Genres ouverts au maximum d'un coup
+
+
+def encode_cursor(state):
+    """Encode l'état de pagination en curseur opaque"""
+    raw = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Décode un curseur produit par encode_cursor
+
+    Raises:
+        ValueError: Curseur illisible, ou qui n'est pas un état de pagination
+            ({"n": entier, "c": liste d'entiers positifs})
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Curseur invalide : {e}")
+    if (not isinstance(state, dict) or not _is_count(state.get("n"))
+            or not isinstance(state.get("c"), list) or not all(_is_count(c) for c in state["c"])):
+        raise ValueError("Curseur invalide : état de pagination inattendu")
+    return state
+
+
+def _is_count(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+class _GenreStream:
+    """Flux des morceaux d'un genre, page par page (chaque page triée par popularité)"""
+
+    def __init__(self, genre, consumed=0):
+        self.genre = genre
+        self.consumed = consumed
+        self.pages = {}          # numéro de page -> liste de morceaux
+        self.last_page = None    # Dernière page (incomplète) si connue
+        self.failed = False      # Page indisponible pour cette requête
+
+    def remaining_loaded(self, page_size):
+        """Nombre de morceaux déjà chargés et pas encore renvoyés"""
+        return sum(
+            max(0, min(len(page), page_number * page_size + len(page) - self.consumed))
+            for page_number, page in self.pages.items()
+        )
+
+    def store(self, page_number, songs, page_size):
+        self.pages[page_number] = sorted(songs, key=lambda s: s.get('popularity', 0), reverse=True)
+        if len(songs) < page_size:
+            self.last_page = page_number
+
+
+class ThemePaginator:
+    """
+    Pagination par curseur sur les genres d'un thème
+
+    Les genres sont ouverts au fur et à mesure, juste assez pour remplir la page
+    demandée, et chaque genre est lu avec l'offset de l'API Spotify. Les flux sont
+    fusionnés par popularité avec un tas : le coût d'une page dépend de sa taille,
+    pas du nombre de genres du thème. L'ordre est celui de la popularité parmi les
+    morceaux déjà lus (Spotify ne trie pas ses résultats par popularité).
+
+    Un morceau renvoyé par plusieurs genres ne sort qu'une fois par page, avec ses
+    genres réunis dans "genres" ; un doublon lu plus tard (genre ouvert à une page
+    suivante) n'est pas détecté, le curseur ne gardant pas les morceaux déjà vus.
+
+    Le curseur mémorise, pour chaque genre ouvert, le nombre de morceaux déjà
+    renvoyés ; les pages déjà lues sont relues depuis le cache.
+
+    Args:
+        genres (list): Genres du thème (ordre d'ouverture)
+        fetch_page (callable): fetch_page(genre, offset, limit) -> liste de morceaux
+        page_size (int): Taille des pages demandées par genre
+        max_in_flight (int): Requêtes simultanées
+        deadline (float): Délai maximum pour chaque vague de requêtes
+    """
+
+    def __init__(self, genres, fetch_page, page_size=GENRE_PAGE_SIZE, max_in_flight=8, deadline=None):
+        self.genres = genres
+        self.fetch_page = fetch_page
+        self.page_size = page_size
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+
+    def _load(self, requests):
+        """Charge en parallèle des pages [(flux, numéro de page)]"""
+        results, _ = fan_out(
+            lambda request: self.fetch_page(request[0].genre, request[1] * self.page_size, self.page_size),
+            requests,
+            max_in_flight=self.max_in_flight,
+            deadline=self.deadline
+        )
+        loaded = set()
+        for (stream, page_number), songs in results:
+            stream.store(page_number, songs or [], self.page_size)
+            loaded.add(id(stream))
+        for stream, _ in requests:
+            if id(stream) not in loaded:
+                stream.failed = True
+
+    def _head(self, stream):
+        """Prochain morceau du flux (charge la page suivante si besoin), ou None"""
+        page_number, position = divmod(stream.consumed, self.page_size)
+        if page_number not in stream.pages:
+            if stream.failed or (stream.last_page is not None and page_number > stream.last_page):
+                return None
+            self._load([(stream, page_number)])
+            if page_number not in stream.pages:
+                return None
+        page = stream.pages[page_number]
+        return page[position] if position < len(page) else None
+
+    def page(self, limit, cursor=None):
+        """
+        Retourne une page de morceaux et le curseur de la page suivante
+
+        Returns:
+            tuple: (liste de morceaux, curseur suivant ou None si le thème est épuisé)
+        """
+        state = decode_cursor(cursor) if cursor else {"n": 0, "c": []}
+        if state["n"] > len(self.genres) or len(state["c"]) > len(self.genres):
+            raise ValueError("Curseur invalide : genres hors du thème")
+        next_genre = state["n"]
+        streams = [_GenreStream(self.genres[i], consumed) for i, consumed in enumerate(state["c"])]
+
+        # Recharger la page courante de chaque genre déjà ouvert (en cache le plus souvent)
+        self._load([(s, s.consumed // self.page_size) for s in streams])
+
+        heap = []
+
+        def push(index):
+            track = self._head(streams[index])
+            if track is not None:
+                heapq.heappush(heap, (-track.get('popularity', 0), index, track))
+
+        for index in range(len(streams)):
+            push(index)
+
+        results = []
+        emitted = {}   # clé du morceau -> copie renvoyée (un morceau présent dans plusieurs genres ne sort qu'une fois)
+
+        def take(index, track):
+            streams[index].consumed += 1
+            push(index)
+            merged = emitted.get(track_key(track))
+            if merged is None:
+                emitted[track_key(track)] = merged = dict(track, genres=[track.get('genre')])
+                results.append(merged)
+            elif track.get('genre') not in merged['genres']:
+                merged['genres'].append(track.get('genre'))
+
+        while len(results) < limit:
+            # Ouvrir de nouveaux genres tant qu'il n'y a pas assez de candidats
+            missing = limit - len(results)
+            buffered = sum(s.remaining_loaded(self.page_size) for s in streams)
+            if buffered < missing and next_genre < len(self.genres):
+                batch = min(MAX_GENRE_BATCH, max(2, math.ceil(missing / self.page_size) * 2),
+                            len(self.genres) - next_genre)
+                new_streams = [_GenreStream(genre) for genre in self.genres[next_genre:next_genre + batch]]
+                next_genre += batch
+                first = len(streams)
+                streams.extend(new_streams)
+                self._load([(s, 0) for s in new_streams])
+                for index in range(first, len(streams)):
+                    push(index)
+                continue
+
+            if not heap:
+                break
+            _, index, track = heapq.heappop(heap)
+            take(index, track)
+
+        # Consommer les doublons des morceaux renvoyés qui sont en tête de leur flux :
+        # ils ne réapparaîtront pas au début de la page suivante
+        while True:
+            duplicates = [entry for entry in heap if track_key(entry[2]) in emitted]
+            if not duplicates:
+                break
+            for entry in duplicates:
+                heap.remove(entry)
+            heapq.heapify(heap)
+            for _, index, track in duplicates:
+                take(index, track)
+
+        exhausted = not heap and next_genre >= len(self.genres) and not any(s.failed for s in streams)
+        next_cursor = None if exhausted else encode_cursor({"n": next_genre, "c": [s.consumed for s in streams]})
+        return results, next_cursor
@@ -0,0 +1,141 @@
+import heapq
+
+# 🔹 Classement des morceaux venus de plusieurs genres
+#
+# Un même morceau peut être renvoyé par plusieurs genres d'un thème : il n'est gardé
+# qu'une fois (clé = id Spotify) et ses genres sont réunis dans "genres". Seuls les k
+# premiers sont sélectionnés, avec un tas borné (listes quelconques) ou une fusion
+# k-voies (listes par genre déjà triées) au lieu de trier toute la liste.
+
+
+def track_key(track):
+    """Clé d'unicité d'un morceau : son id Spotify, sinon (titre, artiste)"""
+    return track.get('id') or (track.get('title'), track.get('artist'))
+
+
+def popularity(track):
+    return track.get('popularity', 0) or 0
+
+
+def _genres(track):
+    genres = track.get('genres')
+    if genres is not None:
+        return list(genres)
+    return [track['genre']] if track.get('genre') else []
+
+
+def _merge_into(merged, track):
+    """Ajoute les genres de track au morceau déjà retenu (copie la liste avant de la modifier)"""
+    for genre in _genres(track):
+        if genre not in merged['genres']:
+            merged['genres'] = merged['genres'] + [genre]
+
+
+class Ranking:
+    """
+    Morceaux dédupliqués, alimentés genre par genre, et leur top-k à la demande
+
+    Les morceaux ne sont pas copiés à l'ajout : seuls les k retenus le sont, à la
+    lecture (les entrées du cache ne sont jamais modifiées). "genre" reste le
+    premier genre où le morceau a été vu.
+    """
+
+    def __init__(self):
+        self._tracks = {}       # clé -> (premier morceau vu, champs à fixer)
+        self._duplicates = {}   # clé -> autres exemplaires du morceau
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def add(self, tracks, **fields):
+        """
+        Ajoute des morceaux
+
+        Args:
+            tracks (iterable): Morceaux normalisés
+            **fields: Champs à fixer sur les morceaux retenus (ex. theme="calme")
+        """
+        entries, duplicates = self._tracks, self._duplicates
+        for track in tracks:
+            # Boucle chaude : clé calculée en ligne, track_key seulement sans id
+            key = track.get('id') or track_key(track)
+            entry = entries.get(key)
+            if entry is None:
+                entries[key] = (track, fields)
+            elif key in duplicates:
+                duplicates[key].append(track)
+            else:
+                duplicates[key] = [track]
+
+    def top(self, k):
+        """Les k morceaux les plus populaires (tas borné, ordre stable à popularité égale)"""
+        entries = self._tracks
+        best_keys = heapq.nlargest(k, entries, key=lambda key: entries[key][0].get('popularity') or 0)
+        best = [(key, entries[key]) for key in best_keys]
+        results = []
+        for key, (track, fields) in best:
+            merged = dict(track, genres=_genres(track), **fields)
+            for duplicate in self._duplicates.get(key, ()):
+                _merge_into(merged, duplicate)
+            results.append(merged)
+        return results
+
+
+def rank_tracks(tracks, k, **fields):
+    """
+    Déduplique une liste de morceaux quelconque et retourne ses k plus populaires
+
+    Seule la tête de la liste est dédupliquée : on cherche le seuil de popularité du
+    k-ième morceau distinct parmi les meilleurs candidats (tas borné, élargi tant que
+    les doublons en cachent), puis on ne garde que les morceaux au-dessus de ce seuil
+    (égalités et doublons compris, pour réunir tous leurs genres).
+    """
+    tracks = tracks if isinstance(tracks, list) else list(tracks)
+    if k <= 0 or not tracks:
+        return []
+    size = k
+    while True:
+        candidates = heapq.nlargest(size, tracks, key=popularity)
+        keys = {track.get('id') or track_key(track) for track in candidates}
+        if len(keys) >= k or size >= len(tracks):
+            break
+        size *= 2
+    # Seuil : popularité du k-ième morceau distinct parmi les candidats (triés)
+    seen = set()
+    threshold = 0
+    for track in candidates:
+        key = track.get('id') or track_key(track)
+        if key not in seen:
+            seen.add(key)
+            threshold = popularity(track)
+            if len(seen) == k:
+                break
+    ranking = Ranking()
+    ranking.add([track for track in tracks if popularity(track) >= threshold], **fields)
+    return ranking.top(k)
+
+
+def merge_ranked(lists, k, **fields):
+    """
+    Fusion k-voies de listes déjà triées par popularité décroissante
+
+    Ne lit que le début de chaque liste : un morceau a la même popularité dans tous
+    ses genres, ses doublons arrivent donc avant la fin des morceaux à égalité avec
+    le k-ième, où la lecture s'arrête.
+
+    Returns:
+        list: k morceaux au plus, dédupliqués, genres réunis
+    """
+    selected = {}
+    last = None
+    for track in heapq.merge(*lists, key=popularity, reverse=True):
+        if len(selected) >= k and popularity(track) < last:
+            break
+        key = track_key(track)
+        merged = selected.get(key)
+        if merged is not None:
+            _merge_into(merged, track)
+        elif len(selected) < k:
+            selected[key] = dict(track, genres=_genres(track), **fields)
+            last = popularity(track)
+    return list(selected.values())
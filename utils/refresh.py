@@ -0,0 +1,103 @@
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.scheduler import BACKGROUND, priority
+
+# 🔹 Stale-while-revalidate : servir la valeur expirée tout de suite, rafraîchir en arrière-plan
+REFRESH_WORKERS = 2            # Threads dédiés aux rafraîchissements
+REFRESH_AHEAD_RATIO = 0.2      # Rafraîchir quand il reste moins de 20 % du TTL...
+REFRESH_AHEAD_MIN_READS = 3    # ...et que la clé a été lue au moins 3 fois
+
+
+class StaleWhileRevalidate:
+    """
+    Lecture de cache qui ne bloque pas sur une entrée expirée
+
+    - Entrée fraîche : retournée directement (avec rafraîchissement anticipé si la
+      clé est souvent lue et proche de l'expiration)
+    - Entrée expirée mais dans la fenêtre max_staleness du cache : retournée
+      immédiatement, un rafraîchissement est lancé en arrière-plan
+    - Pas d'entrée (ou trop ancienne) : chargement synchrone
+
+    Le loader doit lui-même sauvegarder sa valeur dans le cache.
+
+    Args:
+        cache (CacheBackend): Cache lu via get_stale()
+        flights (SingleFlight): Regroupement des chargements identiques
+        refresh_ahead_ratio (float): Fraction du TTL restante déclenchant un rafraîchissement anticipé
+            (0 = désactivé)
+        refresh_ahead_min_reads (int): Nombre de lectures minimum pour le rafraîchissement anticipé
+    """
+
+    def __init__(self, cache, flights, refresh_ahead_ratio=REFRESH_AHEAD_RATIO,
+                 refresh_ahead_min_reads=REFRESH_AHEAD_MIN_READS, workers=REFRESH_WORKERS):
+        self.cache = cache
+        self.flights = flights
+        self.refresh_ahead_ratio = refresh_ahead_ratio
+        self.refresh_ahead_min_reads = refresh_ahead_min_reads
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mood2music-refresh")
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._counters = Counter()
+
+    def get(self, namespace, key, loader):
+        """
+        Retourne la valeur de key, en la rafraîchissant en arrière-plan si besoin
+
+        Args:
+            namespace (str): Namespace du cache
+            key (str): Clé du cache
+            loader (callable): Fonction sans argument qui charge et met en cache la valeur
+        """
+        value = self.get_cached(namespace, key, loader)
+        if value is None:
+            self._counters["sync_loads"] += 1
+            return self.flights.do(key, loader)
+        return value
+
+    def get_cached(self, namespace, key, loader):
+        """Comme get(), mais retourne None au lieu de charger de façon synchrone"""
+        entry = self.cache.get_stale(namespace, key)
+        if entry is None:
+            return None
+
+        value, expires_at, reads = entry
+        now = time.time()
+        if now >= expires_at:
+            self._counters["stale_served"] += 1
+            self.refresh(key, loader)
+        elif self.refresh_ahead_ratio and reads >= self.refresh_ahead_min_reads:
+            remaining = expires_at - now
+            if remaining < self.cache.ttl_for(namespace) * self.refresh_ahead_ratio:
+                self._counters["refresh_ahead"] += 1
+                self.refresh(key, loader)
+        return value
+
+    def refresh(self, key, loader):
+        """Planifie un rafraîchissement de key (ignoré s'il est déjà en cours)"""
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        self._executor.submit(self._run_refresh, key, loader)
+
+    def _run_refresh(self, key, loader):
+        try:
+            # Les appels Spotify d'un rafraîchissement passent après les requêtes interactives
+            with priority(BACKGROUND):
+                self.flights.do(key, loader)
+            self._counters["refreshes"] += 1
+        except Exception as e:
+            print(f"Erreur lors du rafraîchissement de {key}: {e}")
+            self._counters["refresh_errors"] += 1
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+
+    def stats(self):
+        """Retourne les compteurs de rafraîchissement"""
+        with self._lock:
+            pending = len(self._pending)
+        return dict(self._counters, pending=pending)
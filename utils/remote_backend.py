@@ -0,0 +1,130 @@
+"""
+Backend distant : mêmes fonctions que utils.back, servies par utils.service
+
+Les workers Streamlit qui l'utilisent ne parlent plus à Spotify : ils partagent le
+cache, le budget de requêtes et les connexions du service. Une session HTTP
+keep-alive (pool de connexions) est partagée par toutes les sessions du worker.
+
+Activé dans les pages par MOOD2MUSIC_BACKEND_URL (ex. http://127.0.0.1:8000).
+"""
+import os
+import time
+import threading
+
+from utils.metrics import current_rerun
+
+BACKEND_URL = os.getenv("MOOD2MUSIC_BACKEND_URL", "")
+REMOTE_TIMEOUT = 10.0    # Délai max d'une requête au service (secondes)
+REMOTE_POOL_SIZE = 16    # Connexions keep-alive gardées vers le service
+
+
+class RemoteBackend:
+    """Client du service backend (utils.service)"""
+
+    def __init__(self, base_url, timeout=REMOTE_TIMEOUT, pool_size=REMOTE_POOL_SIZE):
+        from utils.spotify_client import pooled_session
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = pooled_session(pool_size)
+
+    def _get(self, path, **params):
+        response = self.session.get(f"{self.base_url}{path}", timeout=self.timeout,
+                                    params={key: value for key, value in params.items() if value is not None})
+        # Appels Spotify faits par le service pour ce rerun (affichés par la page)
+        scope = current_rerun()
+        if scope is not None:
+            scope.add_call(int(response.headers.get("X-Spotify-Calls", 0)))
+        if response.status_code == 404 and path.startswith("/mood/"):
+            raise ValueError(response.json().get("detail", "Thème inconnu"))
+        response.raise_for_status()
+        return response.json()
+
+    def has_credentials(self):
+        """Le service est joignable et a ses credentials Spotify"""
+        try:
+            return bool(self._get("/health").get("spotify_credentials"))
+        except Exception as e:
+            print(f"Service backend injoignable ({self.base_url}): {e}")
+            return False
+
+    def get_available_themes(self):
+        return self._get("/themes")
+
+    def get_songs_by_theme(self, theme, limit_per_genre=2, max_total=10):
+        return self._get(f"/mood/{theme}", limit_per_genre=limit_per_genre, max_total=max_total)
+
+    def get_theme_page(self, theme, cursor=None, limit=20):
+        return self._get(f"/mood/{theme}/page", cursor=cursor, limit=limit)
+
+    def smart_search(self, query, selected_theme=None, limit=20):
+        return self._get("/search", q=query or "", theme=selected_theme, limit=limit)
+
+    def stream_smart_search(self, query, selected_theme=None, limit=20):
+        """Même interface que back.stream_smart_search, en un seul résultat (complet)"""
+        start = time.perf_counter()
+        result = self.smart_search(query, selected_theme, limit)
+        elapsed = time.perf_counter() - start
+        yield dict(result, complete=True,
+                   timings={'first_track': elapsed if result['results'] else None, 'complete': elapsed})
+
+    def get_search_suggestions(self, query, limit=5):
+        return self._get("/suggestions", q=query, limit=limit)
+
+    def get_popular_tracks(self, limit=10):
+        return self._get("/popular", limit=limit)
+
+    def get_top_tracks(self, limit=15, per_genre=4):
+        return self._get("/top", limit=limit, per_genre=per_genre)
+
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def get_default_backend(base_url=BACKEND_URL):
+    """Client du service configuré par MOOD2MUSIC_BACKEND_URL, créé une seule fois"""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            if not base_url:
+                raise RuntimeError("MOOD2MUSIC_BACKEND_URL n'est pas défini")
+            _default_backend = RemoteBackend(base_url)
+    return _default_backend
+
+
+# Fonctions de module, pour remplacer directement les imports de utils.back
+def has_credentials():
+    return get_default_backend().has_credentials()
+
+
+def get_available_themes():
+    return get_default_backend().get_available_themes()
+
+
+def get_songs_by_theme(theme, limit_per_genre=2, max_total=10):
+    return get_default_backend().get_songs_by_theme(theme, limit_per_genre, max_total)
+
+
+def get_theme_page(theme, cursor=None, limit=20):
+    return get_default_backend().get_theme_page(theme, cursor, limit)
+
+
+def smart_search(query, selected_theme=None, limit=20):
+    return get_default_backend().smart_search(query, selected_theme, limit)
+
+
+def stream_smart_search(query, selected_theme=None, limit=20):
+    return get_default_backend().stream_smart_search(query, selected_theme, limit)
+
+
+def get_search_suggestions(query, limit=5):
+    return get_default_backend().get_search_suggestions(query, limit)
+
+
+def get_popular_tracks(limit=10):
+    return get_default_backend().get_popular_tracks(limit)
+
+
+def get_top_tracks(limit=15, per_genre=4):
+    return get_default_backend().get_top_tracks(limit, per_genre)
@@ -0,0 +1,271 @@
+import time
+import heapq
+import itertools
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from utils.metrics import REGISTRY, record_spotify_call
+
+# 🔹 Ordonnanceur des appels Spotify : budget global, Retry-After et priorités
+#
+# Tous les appels Spotify du backend passent par un seul seau à jetons. Quand le
+# budget est épuisé, les requêtes attendent dans une file triée par priorité : une
+# recherche interactive passe devant les rafraîchissements en arrière-plan. Une
+# requête qui attendrait plus que son budget d'attente est rejetée (RateLimited) et
+# l'appelant sert le cache (même expiré) au lieu d'un résultat vide.
+
+INTERACTIVE = 0    # Requête d'un utilisateur qui attend la page
+BACKGROUND = 1     # Préchargement, rafraîchissement stale-while-revalidate
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BACKGROUND: "background"}
+
+SCHEDULER_RATE = 10.0          # Requêtes Spotify par seconde (moyenne)
+SCHEDULER_BURST = 20           # Rafale autorisée
+SCHEDULER_MAX_WAIT = {         # Attente maximum dans la file (secondes)
+    INTERACTIVE: 3.0,
+    BACKGROUND: 15.0,
+}
+SCHEDULER_MAX_QUEUE = {        # Requêtes en attente au-delà desquelles on rejette
+    INTERACTIVE: 64,
+    BACKGROUND: 32,
+}
+DEFAULT_RETRY_AFTER = 1.0      # Pause si Spotify répond 429 sans Retry-After
+MAX_ATTEMPTS = 2               # Tentatives par appel (la 2e après le Retry-After)
+
+_priority = ContextVar("mood2music_priority", default=INTERACTIVE)
+
+
+class RateLimited(Exception):
+    """Appel Spotify rejeté : budget épuisé (saturated) ou 429 de Spotify (throttled)"""
+
+    def __init__(self, message, retry_after=None, reason="saturated"):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def current_priority():
+    """Priorité des appels Spotify du contexte courant"""
+    return _priority.get()
+
+
+@contextmanager
+def priority(level):
+    """Exécute le bloc avec une priorité donnée (propagée aux threads du fan-out)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _retry_after(error):
+    """Lit l'en-tête Retry-After d'une SpotifyException (secondes)"""
+    headers = getattr(error, "headers", None) or {}
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+
+class RequestScheduler:
+    """
+    Seau à jetons partagé avec file d'attente par priorité
+
+    Args:
+        rate (float): Jetons ajoutés par seconde
+        burst (int): Capacité du seau
+        max_wait (dict): Attente maximum par priorité (secondes)
+        max_queue (dict): Taille maximum de la file par priorité
+        breaker (CircuitBreaker): Disjoncteur consulté avant chaque appel (utils.breaker), ou None
+    """
+
+    def __init__(self, rate=SCHEDULER_RATE, burst=SCHEDULER_BURST, max_wait=None, max_queue=None, breaker=None):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.max_wait = {**SCHEDULER_MAX_WAIT, **(max_wait or {})}
+        self.max_queue = {**SCHEDULER_MAX_QUEUE, **(max_queue or {})}
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+        self._waiters = []                  # tas de (priorité, numéro d'arrivée)
+        self._seq = itertools.count()
+        self._depth = Counter()
+        self._waits = {level: {"count": 0, "total": 0.0, "max": 0.0} for level in PRIORITY_NAMES}
+        self._counters = Counter()
+        self._wrapped = None
+        self.breaker = breaker
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def _ready_at(self, now):
+        """Instant où le prochain jeton sera disponible"""
+        ready = now if self._tokens >= 1 else now + (1 - self._tokens) / self.rate
+        return max(ready, self._blocked_until)
+
+    def acquire(self, level=None):
+        """
+        Attend un jeton pour un appel Spotify
+
+        Returns:
+            float: Temps passé dans la file (secondes)
+
+        Raises:
+            RateLimited: File pleine ou attente supérieure au budget de la priorité
+        """
+        level = current_priority() if level is None else level
+        name = PRIORITY_NAMES.get(level, str(level))
+        start = time.monotonic()
+        deadline = start + self.max_wait.get(level, SCHEDULER_MAX_WAIT[BACKGROUND])
+
+        with self._cond:
+            if self._depth[level] >= self.max_queue.get(level, SCHEDULER_MAX_QUEUE[BACKGROUND]):
+                self._shed(name)
+                raise RateLimited(f"file {name} pleine", reason="saturated")
+
+            entry = (level, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            self._depth[level] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    ready_at = self._ready_at(now)
+                    if self._waiters[0] == entry and ready_at <= now:
+                        self._tokens -= 1
+                        break
+                    # Inutile d'attendre si le jeton (ou la fin du Retry-After) arrive trop tard
+                    if now >= deadline or (self._waiters[0] == entry and ready_at > deadline) \
+                            or self._blocked_until > deadline:
+                        self._shed(name)
+                        raise RateLimited(
+                            f"budget Spotify épuisé ({name})",
+                            retry_after=max(0.0, ready_at - now),
+                            reason="saturated"
+                        )
+                    wake = ready_at if self._waiters[0] == entry else deadline
+                    self._cond.wait(max(0.001, min(wake, deadline) - now))
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                self._depth[level] -= 1
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            waits = self._waits.setdefault(level, {"count": 0, "total": 0.0, "max": 0.0})
+            waits["count"] += 1
+            waits["total"] += waited
+            waits["max"] = max(waits["max"], waited)
+        REGISTRY.observe("spotify_queue_wait_seconds", waited, priority=name)
+        return waited
+
+    def _shed(self, name):
+        self._counters[f"shed_{name}"] += 1
+        REGISTRY.inc("spotify_shed_total", priority=name)
+
+    def block(self, seconds):
+        """Suspend tous les appels pendant seconds (Retry-After reçu)"""
+        with self._cond:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Exécute fn(*args, **kwargs) dans le budget Spotify
+
+        Un 429 suspend tous les appels pendant le Retry-After ; l'appel est retenté
+        une fois si la pause tient dans le budget d'attente de sa priorité. Avec un
+        disjoncteur ouvert, l'appel est refusé avant d'entrer dans la file.
+        """
+        breaker = self.breaker
+        if breaker is None:
+            return self._call(fn, *args, **kwargs)
+        probe = breaker.before_call()
+        try:
+            result = self._call(fn, *args, **kwargs)
+        except RateLimited:
+            breaker.release(probe)
+            raise
+        except Exception as e:
+            breaker.on_error(probe, e)
+            raise
+        breaker.on_success(probe)
+        return result
+
+    def _call(self, fn, *args, **kwargs):
+        endpoint = getattr(fn, "__name__", "call")
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            self.acquire()
+            self._counters["requests"] += 1
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                status = getattr(e, "http_status", None)
+                record_spotify_call(endpoint, time.perf_counter() - start, status=status or "error")
+                if status != 429:
+                    raise
+                retry_after = _retry_after(e)
+                self._counters["throttled"] += 1
+                self.block(retry_after)
+                if attempt == MAX_ATTEMPTS or retry_after > self.max_wait.get(current_priority(), 0):
+                    raise RateLimited(f"Spotify a répondu 429 (Retry-After {retry_after:g} s)",
+                                      retry_after=retry_after, reason="throttled") from e
+                self._counters["retries"] += 1
+            else:
+                record_spotify_call(endpoint, time.perf_counter() - start)
+                return result
+
+    def wrap(self, client):
+        """Retourne client dont toutes les méthodes passent par l'ordonnanceur"""
+        wrapped = self._wrapped
+        if wrapped is None or wrapped._client is not client:
+            wrapped = self._wrapped = ScheduledClient(client, self)
+        return wrapped
+
+    def stats(self):
+        """Retourne l'état du seau et, par priorité, la profondeur de file et les temps d'attente"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            queues = {}
+            for level, name in PRIORITY_NAMES.items():
+                waits = self._waits[level]
+                queues[name] = {
+                    "depth": self._depth[level],
+                    "served": waits["count"],
+                    "wait_avg_ms": waits["total"] / waits["count"] * 1000 if waits["count"] else 0.0,
+                    "wait_max_ms": waits["max"] * 1000,
+                    "shed": self._counters[f"shed_{name}"],
+                }
+            return {
+                "tokens": round(self._tokens, 2),
+                "blocked_for": max(0.0, self._blocked_until - now),
+                "requests": self._counters["requests"],
+                "throttled": self._counters["throttled"],
+                "retries": self._counters["retries"],
+                "queues": queues,
+            }
+
+
+class ScheduledClient:
+    """Enveloppe d'un client Spotify : chaque méthode est appelée via RequestScheduler.call"""
+
+    def __init__(self, client, scheduler):
+        self._client = client
+        self._scheduler = scheduler
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def scheduled(*args, **kwargs):
+            return self._scheduler.call(attr, *args, **kwargs)
+        return scheduled
@@ -0,0 +1,138 @@
+"""
+Service HTTP du backend (FastAPI) partagé par tous les workers Streamlit
+
+Un seul processus, une seule boucle asyncio : le cache, l'ordonnanceur Spotify
+(budget de requêtes et Retry-After), le single-flight et le pool de connexions
+keep-alive vers Spotify sont communs à toutes les sessions, au lieu d'être
+dupliqués dans chaque worker Streamlit. Les fonctions du backend (bloquantes)
+tournent dans un pool de threads borné ; la boucle ne fait que l'I/O HTTP.
+
+Les pages l'utilisent quand MOOD2MUSIC_BACKEND_URL est défini (utils.remote_backend).
+Chaque réponse porte l'en-tête X-Spotify-Calls (appels Spotify déclenchés).
+
+Usage : python -m utils.service [--host 127.0.0.1] [--port 8000] [--threads 32]
+"""
+import time
+import asyncio
+import argparse
+import contextvars
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+from utils import back
+from utils.metrics import CALLS_BUCKETS, REGISTRY, count_spotify_calls
+from utils.spotify_client import has_credentials
+
+DEFAULT_PORT = 8000
+SERVICE_THREADS = 32    # Appels au backend exécutés en même temps
+
+# Requêtes du service, à part des reruns de page (reruns_total, api_calls_per_rerun)
+REGISTRY.describe("service_requests_total", "counter", "Requêtes du service par endpoint et statut")
+REGISTRY.describe("service_request_seconds", "histogram", "Durée des requêtes du service par endpoint")
+REGISTRY.describe("service_spotify_calls", "histogram", "Appels Spotify déclenchés par une requête du service")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Index de recherche des genres et index local des morceaux prêts avant les premières requêtes
+    back.warm_up()
+    yield
+
+
+app = FastAPI(title="Mood2Music", description="Recommandations musicales par humeur", lifespan=lifespan)
+_executor = ThreadPoolExecutor(max_workers=SERVICE_THREADS, thread_name_prefix="mood2music-service")
+
+
+async def _call(endpoint, fn, *args, **kwargs):
+    """Exécute une fonction du backend hors de la boucle et compte ses appels Spotify"""
+    loop = asyncio.get_running_loop()
+    status = "error"
+    with count_spotify_calls(f"service:{endpoint}") as scope:
+        try:
+            # Le contexte (compteur d'appels, priorité) suit l'appel dans le thread
+            context = contextvars.copy_context()
+            result = await loop.run_in_executor(_executor, lambda: context.run(fn, *args, **kwargs))
+            status = "ok"
+        finally:
+            REGISTRY.inc("service_requests_total", endpoint=endpoint, status=status)
+            REGISTRY.observe("service_request_seconds", time.perf_counter() - scope.started, endpoint=endpoint)
+            REGISTRY.histogram("service_spotify_calls", buckets=CALLS_BUCKETS, endpoint=endpoint).observe(
+                scope.api_calls)
+    return JSONResponse(result, headers={"X-Spotify-Calls": str(scope.api_calls)})
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "spotify_credentials": has_credentials(), "spotify_circuit": back.BREAKER.stats()["state"]}
+
+
+@app.get("/themes")
+async def themes():
+    return back.get_available_themes()
+
+
+@app.get("/mood/{theme}")
+async def mood(theme: str, limit_per_genre: int = Query(2, ge=1, le=50), max_total: int = Query(10, ge=1, le=100)):
+    """Morceaux les plus streamés d'un thème (humeur)"""
+    if theme not in back.theme_to_genres:
+        raise HTTPException(status_code=404, detail=f"Thème inconnu : {theme}")
+    return await _call("mood", back.get_songs_by_theme, theme, limit_per_genre=limit_per_genre, max_total=max_total)
+
+
+@app.get("/mood/{theme}/page")
+async def mood_page(theme: str, cursor: str = None, limit: int = Query(20, ge=1, le=100)):
+    """Page suivante d'un thème (curseur opaque de get_theme_page)"""
+    if theme not in back.theme_to_genres:
+        raise HTTPException(status_code=404, detail=f"Thème inconnu : {theme}")
+    try:
+        return await _call("mood_page", back.get_theme_page, theme, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/search")
+async def search(q: str = "", theme: str = None, limit: int = Query(20, ge=1, le=100)):
+    """Recherche intelligente (texte et/ou thème), même format que smart_search"""
+    return await _call("search", back.smart_search, q, theme, limit)
+
+
+@app.get("/suggestions")
+async def suggestions(q: str, limit: int = Query(5, ge=1, le=20)):
+    return await _call("suggestions", back.get_search_suggestions, q, limit)
+
+
+@app.get("/popular")
+async def popular(limit: int = Query(10, ge=1, le=50)):
+    return await _call("popular", back.get_popular_tracks, limit)
+
+
+@app.get("/top")
+async def top(limit: int = Query(15, ge=1, le=50), per_genre: int = Query(4, ge=1, le=20)):
+    return await _call("top", back.get_top_tracks, limit, per_genre)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.to_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--threads", type=int, default=SERVICE_THREADS, help="Appels au backend simultanés")
+    args = parser.parse_args(argv)
+
+    global _executor
+    _executor = ThreadPoolExecutor(max_workers=args.threads, thread_name_prefix="mood2music-service")
+    # Un seul worker : tout l'intérêt est de partager le cache et le budget Spotify
+    uvicorn.run(app, host=args.host, port=args.port, workers=1, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Regroupe les appels identiques simultanés en une seule exécution
+
+    Le premier appelant d'une clé exécute la fonction ; les appelants suivants,
+    arrivés avant la fin, attendent le même Future et reçoivent le même résultat
+    (ou la même exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self._counters = Counter()
+
+    def do(self, key, fn):
+        """
+        Exécute fn() une seule fois pour tous les appelants simultanés de key
+
+        Args:
+            key (str): Clé de regroupement (en général la clé de cache)
+            fn (callable): Fonction sans argument qui produit la valeur
+
+        Returns:
+            Le résultat de fn()
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._flights[key] = future
+                self._counters["executed"] += 1
+            else:
+                self._counters["coalesced"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+
+    def in_flight(self):
+        """Nombre de clés en cours d'exécution"""
+        with self._lock:
+            return len(self._flights)
+
+    def stats(self):
+        """Retourne les compteurs {'executed', 'coalesced', 'in_flight'}"""
+        with self._lock:
+            return {
+                "executed": self._counters["executed"],
+                "coalesced": self._counters["coalesced"],
+                "in_flight": len(self._flights),
+            }
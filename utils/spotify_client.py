@@ -0,0 +1,129 @@
+import os
+import threading
+
+# 🔹 Client Spotify partagé, construit au premier usage
+#
+# Importer le backend ne lit plus le .env et ne contacte pas Spotify : les outils qui
+# n'ont besoin que du catalogue (tests, batchs, get_available_themes) fonctionnent
+# sans credentials. Un faux client peut être injecté avec set_client / set_client_factory.
+
+_client = None
+_client_lock = threading.Lock()
+_client_factory = None
+_token_cache = None
+
+# Connexions keep-alive gardées vers api.spotify.com (le défaut de requests, 10, est
+# inférieur au nombre de threads du fan-out : les connexions en trop étaient refermées)
+SPOTIFY_POOL_SIZE = 32
+
+# Nouvelles tentatives sur les 5xx seulement, sans suivre les Retry-After (voir pooled_session)
+SPOTIFY_RETRIES = 3
+SPOTIFY_RETRY_STATUSES = (500, 502, 503, 504)
+SPOTIFY_RETRY_BACKOFF = 0.3
+
+
+class SpotifyConfigError(Exception):
+    """Credentials Spotify absents ou invalides"""
+
+
+def _load_credentials():
+    from dotenv import load_dotenv
+
+    # Charger le fichier .env
+    load_dotenv()
+    return os.getenv("SPOTIPY_CLIENT_ID"), os.getenv("SPOTIPY_CLIENT_SECRET")
+
+
+def has_credentials():
+    """Indique si les credentials Spotify sont configurés (ou si un client a été injecté)"""
+    if _client is not None or _client_factory is not None:
+        return True
+    client_id, client_secret = _load_credentials()
+    return bool(client_id and client_secret)
+
+
+def pooled_session(pool_size=SPOTIFY_POOL_SIZE):
+    """
+    Session requests dont le pool garde pool_size connexions keep-alive par hôte
+
+    spotipy ne monte pas son propre adaptateur sur une session fournie : les
+    nouvelles tentatives sur les 5xx sont donc configurées ici.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    # raise_on_status=False : après la dernière tentative, spotipy reçoit la vraie réponse 5xx
+    # (sinon il transforme l'échec des tentatives en 429, traité comme une saturation)
+    retry = Retry(total=SPOTIFY_RETRIES, status_forcelist=SPOTIFY_RETRY_STATUSES,
+                  backoff_factor=SPOTIFY_RETRY_BACKOFF, respect_retry_after_header=False,
+                  raise_on_status=False)
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _default_factory():
+    """Construit le client spotipy réel avec un cache de token partagé par toutes les sessions"""
+    global _token_cache
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+    from spotipy.cache_handler import MemoryCacheHandler
+
+    client_id, client_secret = _load_credentials()
+    if not client_id or not client_secret:
+        raise SpotifyConfigError("SPOTIPY_CLIENT_ID ou SPOTIPY_CLIENT_SECRET non trouvé dans .env")
+
+    if _token_cache is None:
+        _token_cache = MemoryCacheHandler()
+    # Pas de nouvelle tentative automatique sur 429 (pooled_session ne suit pas les Retry-After) :
+    # l'ordonnanceur (utils.scheduler) lit le Retry-After et suspend tous les appels,
+    # pas seulement le thread courant (vérifié par python -m benchmarks.check_retries)
+    return spotipy.Spotify(auth_manager=SpotifyClientCredentials(
+        client_id=client_id,
+        client_secret=client_secret,
+        cache_handler=_token_cache
+    ), requests_session=pooled_session())
+
+
+def get_client():
+    """Retourne le client Spotify du processus (créé au premier appel, thread-safe)"""
+    global _client
+    client = _client
+    if client is not None:
+        return client
+    with _client_lock:
+        if _client is None:
+            factory = _client_factory or _default_factory
+            _client = factory()
+        return _client
+
+
+def set_client(client):
+    """Injecte un client déjà construit (faux Spotify pour les tests et benchmarks)"""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def set_client_factory(factory):
+    """
+    Remplace la construction du client (transport)
+
+    Args:
+        factory (callable): Fonction sans argument retournant un objet avec l'interface de
+            spotipy.Spotify (search, artist_top_tracks, artists...). None = client spotipy réel.
+    """
+    global _client, _client_factory
+    with _client_lock:
+        _client_factory = factory
+        _client = None
+
+
+def reset_client():
+    """Oublie le client courant ; le prochain get_client() le reconstruit"""
+    global _client
+    with _client_lock:
+        _client = None
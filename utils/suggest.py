@@ -0,0 +1,152 @@
+import bisect
+import threading
+import unicodedata
+
+# 🔹 Index de suggestions : préfixe -> meilleurs artistes et titres déjà vus
+#
+# Chaque nœud du trie garde ses TOP_K meilleures entrées (par popularité) : une
+# complétion coûte un parcours de la longueur du préfixe, sans dépendre du nombre
+# de noms indexés. Les noms sont indexés par leur début et par le début de chaque
+# mot (« beat » trouve « The Beatles »), jusqu'à MAX_DEPTH / WORD_DEPTH caractères ;
+# au-delà, les entrées du dernier nœud sont filtrées sur le préfixe complet.
+
+TOP_K = 10            # Entrées gardées par nœud
+MAX_DEPTH = 16        # Longueur maximum des préfixes indexés (nom complet)
+WORD_DEPTH = 8        # Longueur maximum des préfixes indexés depuis un mot intérieur
+MAX_WORD_STARTS = 4   # Débuts de mots indexés par nom
+MAX_ENTRIES = 50000   # Au-delà, les nouveaux noms ne sont plus indexés
+
+
+def normalize(text):
+    """Minuscules, sans accents ni espaces multiples"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children = {}
+        self.top = ()     # tuple de (-score, clé), trié : meilleure entrée en premier
+
+
+class SuggestionIndex:
+    """
+    Trie de complétion pondéré par la popularité
+
+    Les lectures ne prennent pas de verrou : les listes des nœuds sont remplacées
+    (jamais modifiées en place) par les écritures, sérialisées par un verrou.
+    """
+
+    def __init__(self, top_k=TOP_K, max_depth=MAX_DEPTH, max_entries=MAX_ENTRIES):
+        self.top_k = top_k
+        self.max_depth = max_depth
+        self.max_entries = max_entries
+        self._root = _Node()
+        self._entries = {}     # clé -> (score, suggestion)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _prefixes(self, text):
+        """Chaînes indexées pour un nom : le nom complet puis chaque début de mot"""
+        text = normalize(text)
+        starts = [text]
+        position = text.find(" ")
+        while position != -1 and len(starts) <= MAX_WORD_STARTS:
+            starts.append(text[position + 1:])
+            position = text.find(" ", position + 1)
+        return starts
+
+    def add(self, kind, name, suggestion, popularity=0):
+        """
+        Ajoute (ou remonte) une suggestion
+
+        Args:
+            kind (str): "artist" ou "track"
+            name (str): Texte affiché (ex. « Titre - Artiste »)
+            suggestion (str): Texte recherché quand la suggestion est choisie
+            popularity (int): Score de popularité (0-100)
+        """
+        if not name or not suggestion:
+            return
+        key = (kind, name)
+        with self._lock:
+            previous = self._entries.get(key)
+            if previous is not None and previous[0] >= popularity:
+                return
+            if previous is None and len(self._entries) >= self.max_entries:
+                return
+            self._entries[key] = (popularity, {"type": kind, "name": name, "suggestion": suggestion})
+            for position, text in enumerate(self._prefixes(suggestion if kind == "track" else name)):
+                node = self._root
+                for char in text[:self.max_depth if position == 0 else WORD_DEPTH]:
+                    child = node.children.get(char)
+                    if child is None:
+                        child = node.children[char] = _Node()
+                    node = child
+                    self._offer(node, popularity, key)
+
+    def _offer(self, node, score, key):
+        """Insère la clé dans le top du nœud si elle y a sa place"""
+        top = node.top
+        entry = (-score, key)
+        # Le score d'une clé ne fait que monter : si elle n'entre pas, son ancien score n'y était pas non plus
+        if len(top) >= self.top_k and entry >= top[-1]:
+            return
+        entries = [e for e in top if e[1] != key]
+        bisect.insort(entries, entry)
+        node.top = tuple(entries[:self.top_k])
+
+    def add_tracks(self, tracks):
+        """Indexe les titres et artistes d'une liste de morceaux normalisés"""
+        for track in tracks:
+            title, artist = track.get("title"), track.get("artist")
+            popularity = track.get("popularity", 0) or 0
+            if title:
+                self.add("track", f"{title} - {artist or 'Artiste inconnu'}", title, popularity)
+            if artist:
+                self.add("artist", artist, artist, popularity)
+
+    def complete(self, prefix, limit=5):
+        """
+        Retourne les meilleures suggestions commençant par prefix
+
+        Returns:
+            list: Suggestions {'type', 'name', 'suggestion'}, par popularité décroissante
+        """
+        full = normalize(prefix)
+        node, shallow = self._root, None
+        for depth, char in enumerate(full[:self.max_depth], 1):
+            node = node.children.get(char)
+            if node is None:
+                break
+            if depth == WORD_DEPTH:
+                shallow = node
+        if node is None and shallow is None:
+            return []
+
+        candidates = node.top if node is not None else ()
+        # Préfixe plus long que les chaînes indexées depuis les mots intérieurs :
+        # ajouter les candidats du nœud WORD_DEPTH et vérifier la suite du préfixe
+        verify = len(full) > WORD_DEPTH
+        if verify and shallow is not None:
+            candidates = sorted(set(candidates) | set(shallow.top))
+
+        results = []
+        for _, key in candidates:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            suggestion = entry[1]
+            if verify:
+                indexed = suggestion["suggestion"] if key[0] == "track" else key[1]
+                if not any(start.startswith(full) for start in self._prefixes(indexed)):
+                    continue
+            results.append(suggestion)
+            if len(results) >= limit:
+                break
+        return results
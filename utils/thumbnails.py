@@ -0,0 +1,283 @@
+"""
+Cache local des pochettes redimensionnées
+
+Les pochettes affichées dans les listes sont téléchargées une fois, réduites à la
+taille d'affichage (si Pillow est installé) et gardées sur disque avec une
+éviction LRU bornée en octets. Les pages les servent ensuite depuis le processus
+au lieu de faire télécharger chaque image au navigateur.
+
+Activé par MOOD2MUSIC_THUMBNAIL_DIR (répertoire du cache) ; désactivé par défaut.
+"""
+import os
+import base64
+import hashlib
+import threading
+import urllib.request
+from io import BytesIO
+from collections import OrderedDict
+
+from utils.cache import TTLCache
+from utils.fanout import fan_out
+from utils.metrics import REGISTRY, BYTES_BUCKETS
+from utils.singleflight import SingleFlight
+from utils.tracks import PLACEHOLDER_IMAGE, THUMBNAIL_WIDTH
+
+THUMBNAIL_DIR = os.getenv("MOOD2MUSIC_THUMBNAIL_DIR", "")
+THUMBNAIL_MAX_BYTES = 64 * 1024 * 1024   # Taille maximum du cache sur disque
+THUMBNAIL_PIXELS = 2 * THUMBNAIL_WIDTH   # Côté des miniatures stockées (écrans haute densité)
+FETCH_TIMEOUT = 3.0                      # Délai max d'un téléchargement (secondes)
+PREFETCH_MAX_IN_FLIGHT = 8               # Téléchargements simultanés pour une page
+PREFETCH_DEADLINE = 2.0                  # Délai max de préchargement d'une page (secondes)
+FAILED_TTL = 60                          # Une pochette en échec n'est pas redemandée avant 60 s
+
+# Taille typique des pochettes Spotify (JPEG) par largeur maximum : estimation des octets des
+# pochettes laissées au navigateur, dont le processus ne voit pas le téléchargement
+REMOTE_IMAGE_BYTES = ((64, 3 * 1024), (300, 25 * 1024), (640, 60 * 1024))
+
+REGISTRY.describe("thumbnail_bytes_total", "counter",
+                  "Octets de pochettes téléchargés depuis Spotify (origin) ou servis depuis le disque (disk)")
+REGISTRY.describe("thumbnail_requests_total", "counter", "Pochettes demandées au cache local, par résultat")
+REGISTRY.describe("thumbnail_evictions_total", "counter", "Pochettes supprimées du cache local (LRU)")
+REGISTRY.describe("page_image_bytes", "histogram",
+                  "Octets de pochettes par liste de morceaux affichée : intégrées depuis le cache local (cache) "
+                  "ou téléchargées par le navigateur (remote, estimation selon la largeur)")
+
+
+def remote_image_bytes(width):
+    """Octets estimés d'une pochette Spotify de cette largeur (None : la plus grande)"""
+    if width is not None:
+        for max_width, size in REMOTE_IMAGE_BYTES:
+            if width <= max_width:
+                return size
+    return REMOTE_IMAGE_BYTES[-1][1]
+
+
+def observe_page_images(widths, inlined=None):
+    """
+    Enregistre les octets de pochettes d'une liste affichée (histogramme page_image_bytes)
+
+    Args:
+        widths (dict): URL de pochette -> largeur de l'image Spotify (None si inconnue)
+        inlined (dict): URL -> octets intégrés depuis le cache local (None : cache désactivé) ;
+            les autres pochettes sont téléchargées par le navigateur
+    """
+    if inlined is not None:
+        REGISTRY.histogram("page_image_bytes", buckets=BYTES_BUCKETS, source="cache").observe(
+            sum(len(data) for data in inlined.values()))
+    REGISTRY.histogram("page_image_bytes", buckets=BYTES_BUCKETS, source="remote").observe(
+        sum(remote_image_bytes(width) for url, width in widths.items() if url not in (inlined or {})))
+
+
+def _mime_type(data):
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/jpeg"
+
+
+def _resize(data, pixels):
+    """Réduit une image à pixels de côté au plus (JPEG) ; inchangée sans Pillow ou si déjà petite"""
+    try:
+        from PIL import Image  # Dépendance optionnelle (installée avec Streamlit)
+    except ImportError:
+        return data
+    try:
+        with Image.open(BytesIO(data)) as image:
+            if max(image.size) <= pixels:
+                return data
+            image.thumbnail((pixels, pixels))
+            output = BytesIO()
+            image.convert("RGB").save(output, format="JPEG", quality=85, optimize=True)
+    except Exception as e:
+        print(f"Impossible de réduire une pochette: {e}")
+        return data
+    resized = output.getvalue()
+    return resized if len(resized) < len(data) else data
+
+
+class ThumbnailCache:
+    """
+    Pochettes sur disque, éviction LRU quand le total dépasse max_bytes
+
+    L'ordre LRU est gardé en mémoire (et reconstruit depuis les dates d'accès
+    des fichiers au démarrage). Les téléchargements simultanés d'une même URL
+    sont regroupés, et une URL en échec (erreur, délai dépassé) n'est pas
+    redemandée pendant FAILED_TTL secondes : un hôte mort ou lent ne coûte pas
+    PREFETCH_DEADLINE à chaque rerun.
+    """
+
+    def __init__(self, directory, max_bytes=THUMBNAIL_MAX_BYTES, pixels=THUMBNAIL_PIXELS, timeout=FETCH_TIMEOUT):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.pixels = pixels
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # nom de fichier -> taille, du moins au plus récent
+        self._bytes = 0
+        self._flights = SingleFlight()
+        self._failed = TTLCache(default_ttl=FAILED_TTL, sweep_interval=None)   # URL en échec récent
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".img"):
+                stat = entry.stat()
+                files.append((max(stat.st_atime, stat.st_mtime), entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._bytes += size
+        self._evict()
+
+    def _filename(self, url):
+        return hashlib.sha1(f"{url}|{self.pixels}".encode("utf-8")).hexdigest() + ".img"
+
+    def _evict(self):
+        """Supprime les pochettes les moins récemment servies au-delà de max_bytes"""
+        evicted = []
+        with self._lock:
+            while self._bytes > self.max_bytes and self._entries:
+                name, size = self._entries.popitem(last=False)
+                self._bytes -= size
+                evicted.append(name)
+        for name in evicted:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+        if evicted:
+            REGISTRY.inc("thumbnail_evictions_total", len(evicted))
+
+    def get(self, url):
+        """Retourne les octets de la pochette en cache, ou None"""
+        name = self._filename(url)
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)   # Date d'accès pour l'ordre LRU au prochain démarrage
+        except OSError:
+            with self._lock:
+                self._bytes -= self._entries.pop(name, 0)
+            return None
+        REGISTRY.inc("thumbnail_bytes_total", len(data), source="disk")
+        return data
+
+    def get_or_fetch(self, url):
+        """
+        Retourne la pochette depuis le disque, ou la télécharge et la met en cache
+
+        Returns:
+            bytes: Pochette (éventuellement réduite), ou None si le téléchargement échoue
+        """
+        data = self.get(url)
+        if data is not None:
+            REGISTRY.inc("thumbnail_requests_total", result="hit")
+            return data
+        if self._failed.get("failed", url) is not None:
+            REGISTRY.inc("thumbnail_requests_total", result="failed_recently")
+            return None
+        try:
+            data = self._flights.do(url, lambda: self._fetch(url))
+        except Exception as e:
+            print(f"Erreur lors du téléchargement de la pochette {url}: {e}")
+            self._failed.set("failed", url, True)
+            REGISTRY.inc("thumbnail_requests_total", result="error")
+            return None
+        REGISTRY.inc("thumbnail_requests_total", result="miss")
+        return data
+
+    def _fetch(self, url):
+        with urllib.request.urlopen(url, timeout=self.timeout) as response:
+            original = response.read()
+        REGISTRY.inc("thumbnail_bytes_total", len(original), source="origin")
+        data = _resize(original, self.pixels)
+
+        name = self._filename(url)
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._bytes += len(data) - self._entries.pop(name, 0)
+            self._entries[name] = len(data)
+        self._evict()
+        return data
+
+    def prefetch(self, urls):
+        """
+        Récupère en parallèle les pochettes d'une page
+
+        Returns:
+            dict: URL -> octets (les pochettes en échec ou hors délai sont absentes)
+        """
+        # Le placeholder des morceaux sans pochette n'est pas une pochette à mettre en cache
+        urls = list(dict.fromkeys(url for url in urls if url and url != PLACEHOLDER_IMAGE))
+        results, complete = fan_out(self.get_or_fetch, urls, max_in_flight=PREFETCH_MAX_IN_FLIGHT,
+                                    deadline=PREFETCH_DEADLINE)
+        thumbnails = {url: data for url, data in results if data is not None}
+        if not complete:
+            # Hors délai : pas d'attente au prochain rerun (servie depuis le disque si elle finit par arriver)
+            for url in urls:
+                if url not in thumbnails:
+                    self._failed.set("failed", url, True)
+        return thumbnails
+
+    def data_uris(self, urls, widths=None):
+        """
+        Pochettes d'une page sous forme d'URI data: (à intégrer dans le HTML ou à passer à st.image)
+
+        Le volume envoyé est enregistré dans l'histogramme page_image_bytes, avec
+        celui des pochettes en échec ou hors délai, laissées au navigateur.
+
+        Args:
+            urls (iterable): URL des pochettes
+            widths (dict): URL -> largeur de l'image Spotify, pour estimer les pochettes laissées au navigateur
+
+        Returns:
+            dict: URL d'origine -> URI data:
+        """
+        urls = [url for url in urls if url and url != PLACEHOLDER_IMAGE]
+        thumbnails = self.prefetch(urls)
+        observe_page_images({url: (widths or {}).get(url) for url in urls}, thumbnails)
+        return {url: f"data:{_mime_type(data)};base64,{base64.b64encode(data).decode('ascii')}"
+                for url, data in thumbnails.items()}
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+def _collect_cache_metrics():
+    stats = _default_cache.stats()
+    return [("thumbnail_cache_entries", "gauge", {}, stats["entries"]),
+            ("thumbnail_cache_bytes", "gauge", {}, stats["bytes"])]
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+_default_cache_loaded = False
+
+
+def get_default_cache(directory=THUMBNAIL_DIR):
+    """Cache de pochettes par défaut, créé une seule fois ; None s'il n'est pas configuré"""
+    global _default_cache, _default_cache_loaded
+    if _default_cache_loaded:
+        return _default_cache
+    with _default_cache_lock:
+        if not _default_cache_loaded:
+            if directory:
+                try:
+                    _default_cache = ThumbnailCache(directory)
+                    REGISTRY.register_collector(_collect_cache_metrics)
+                except OSError as e:
+                    print(f"Cache de pochettes indisponible ({e})")
+            _default_cache_loaded = True
+    return _default_cache
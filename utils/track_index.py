@@ -0,0 +1,207 @@
+import os
+import gzip
+import json
+import threading
+
+from utils.tracks import PLACEHOLDER_IMAGE
+
+# 🔹 Index local des morceaux construit par le crawler (utils/crawler.py)
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'track_index.json.gz')
+
+# Colonnes stockées pour chaque morceau
+_COLUMNS = ("id", "title", "artist", "album", "popularity", "image", "spotify_url")
+
+
+def build_index(records, path):
+    """
+    Écrit un index compact à partir des morceaux crawlés
+
+    Le fichier est un JSON gzip en colonnes ; les genres et thèmes sont internés
+    dans des tables et référencés par leur position.
+
+    Args:
+        records (iterable): Dictionnaires {'genre', 'themes', 'tracks'} (un par genre crawlé)
+        path (str): Fichier de sortie
+
+    Returns:
+        int: Nombre de morceaux distincts indexés
+    """
+    genres, themes = [], []
+    genre_ids, theme_ids = {}, {}
+    columns = {name: [] for name in _COLUMNS}
+    track_genres, track_themes = [], []
+    track_rows = {}
+
+    def intern(value, table, ids):
+        if value not in ids:
+            ids[value] = len(table)
+            table.append(value)
+        return ids[value]
+
+    for record in records:
+        genre_id = intern(record["genre"], genres, genre_ids)
+        record_themes = [intern(theme, themes, theme_ids) for theme in record.get("themes", [])]
+        for track in record["tracks"]:
+            track_id = track.get("id")
+            if not track_id:
+                continue
+            row = track_rows.get(track_id)
+            if row is None:
+                # Premier genre où apparaît ce morceau
+                row = track_rows[track_id] = len(track_genres)
+                for name in _COLUMNS:
+                    columns[name].append(track.get(name))
+                track_genres.append([])
+                track_themes.append([])
+            if genre_id not in track_genres[row]:
+                track_genres[row].append(genre_id)
+            for theme_id in record_themes:
+                if theme_id not in track_themes[row]:
+                    track_themes[row].append(theme_id)
+
+    payload = {
+        "version": INDEX_VERSION,
+        "genres": genres,
+        "themes": themes,
+        "tracks": dict(columns, genres=track_genres, themes=track_themes),
+    }
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, path)
+    return len(track_genres)
+
+
+class TrackIndex:
+    """
+    Index en mémoire : genre / thème / id -> morceaux triés par popularité
+
+    Les listes par genre et par thème sont triées au chargement, une recherche
+    se limite donc à un accès dictionnaire et à la copie des `limit` premiers
+    morceaux.
+    """
+
+    def __init__(self, payload):
+        if payload.get("version") != INDEX_VERSION:
+            raise ValueError(f"Version d'index non supportée : {payload.get('version')}")
+        self.genres = payload["genres"]
+        self.themes = payload["themes"]
+        self._tracks = payload["tracks"]
+        popularity = self._tracks["popularity"]
+
+        by_genre = {}
+        by_theme = {}
+        for row, genre_ids in enumerate(self._tracks["genres"]):
+            for genre_id in genre_ids:
+                by_genre.setdefault(self.genres[genre_id].lower(), []).append(row)
+        for row, theme_ids in enumerate(self._tracks["themes"]):
+            for theme_id in theme_ids:
+                by_theme.setdefault(self.themes[theme_id], []).append(row)
+
+        def by_popularity(rows):
+            rows.sort(key=lambda r: popularity[r] or 0, reverse=True)
+            return rows
+
+        self._by_genre = {genre: by_popularity(rows) for genre, rows in by_genre.items()}
+        self._by_theme = {theme: by_popularity(rows) for theme, rows in by_theme.items()}
+        self._by_id = {track_id: row for row, track_id in enumerate(self._tracks["id"])}
+        self._crawled = {genre.lower() for genre in self.genres}
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        """Charge un index écrit par build_index"""
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self._tracks["id"])
+
+    def _song(self, row, genre, theme=None):
+        """Reconstruit un morceau au format de normalize_track"""
+        tracks = self._tracks
+        song = {
+            "id": tracks["id"][row],
+            "title": tracks["title"][row],
+            "artist": tracks["artist"][row],
+            "album": tracks["album"][row],
+            "popularity": tracks["popularity"][row] or 0,
+            "popularity_score": tracks["popularity"][row] or 0,
+            "genre": genre,
+            "image": tracks["image"][row] or PLACEHOLDER_IMAGE,
+            "spotify_url": tracks["spotify_url"][row] or '',
+            "preview_url": '',
+            "genres": [self.genres[g] for g in tracks["genres"][row]],
+        }
+        if theme is not None:
+            song["theme"] = theme
+        return song
+
+    def has_genre(self, genre):
+        """Indique si le genre a été crawlé (même sans morceaux)"""
+        return genre.lower() in self._crawled
+
+    def songs_for_genre(self, genre, limit=5):
+        """Retourne les morceaux les plus populaires d'un genre"""
+        rows = self._by_genre.get(genre.lower(), [])
+        return [self._song(row, genre) for row in rows[:limit]]
+
+    def songs_for_theme(self, theme, limit=10):
+        """Retourne les morceaux les plus populaires d'un thème"""
+        rows = self._by_theme.get(theme, [])
+        return [self._song(row, self.genres[self._tracks["genres"][row][0]], theme=theme) for row in rows[:limit]]
+
+    def popular_tracks(self, limit=None):
+        """Retourne (titre, artiste, popularité) des morceaux, du plus populaire au moins populaire"""
+        tracks = self._tracks
+        rows = sorted(range(len(self)), key=lambda r: tracks["popularity"][r] or 0, reverse=True)
+        return [(tracks["title"][r], tracks["artist"][r], tracks["popularity"][r] or 0) for r in rows[:limit]]
+
+    def get_track(self, track_id):
+        """Retourne un morceau par son id Spotify, ou None"""
+        row = self._by_id.get(track_id)
+        if row is None:
+            return None
+        return self._song(row, self.genres[self._tracks["genres"][row][0]])
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+_default_index_loaded = False
+_default_index_warming = threading.Event()
+
+
+def get_default_index(path=DEFAULT_INDEX_PATH, wait=True):
+    """
+    Charge l'index par défaut une seule fois ; retourne None s'il n'existe pas
+
+    Args:
+        path (str): Fichier de l'index
+        wait (bool): False : retourner None tout de suite pendant le chargement en
+            arrière-plan (warm_default_index) au lieu d'attendre sa fin
+    """
+    global _default_index, _default_index_loaded
+    if _default_index_loaded:
+        return _default_index
+    if not wait and _default_index_warming.is_set():
+        return None
+    with _default_index_lock:
+        if not _default_index_loaded:
+            if path and os.path.exists(path):
+                try:
+                    _default_index = TrackIndex.load(path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Erreur lors du chargement de l'index des morceaux: {e}")
+            _default_index_loaded = True
+    return _default_index
+
+
+def warm_default_index(path=DEFAULT_INDEX_PATH):
+    """Charge l'index par défaut en arrière-plan (une seule fois), avant les premières requêtes"""
+    if _default_index_loaded or _default_index_warming.is_set() or not path:
+        return
+    _default_index_warming.set()
+    threading.Thread(target=get_default_index, args=(path,), name="mood2music-track-index", daemon=True).start()
@@ -0,0 +1,102 @@
+from html import escape
+
+from utils.tracks import PLACEHOLDER_IMAGE
+from utils.thumbnails import observe_page_images
+
+# 🔹 Rendu d'une liste de morceaux en un seul élément Streamlit
+#
+# L'ancien affichage créait 6 colonnes et 6 widgets par morceau (plus de 300 éléments
+# pour 50 résultats) : la sérialisation et le websocket dominaient le temps de rendu.
+# Ici tout le tableau est un seul bloc HTML envoyé par un unique st.markdown.
+
+TABLE_STYLE = """<style>
+.m2m-tracks { width: 100%; border-collapse: collapse; }
+.m2m-tracks th { text-align: left; font-weight: 600; padding: 0.4rem; border-bottom: 1px solid rgba(128,128,128,0.4); }
+.m2m-tracks td { padding: 0.4rem; vertical-align: middle; border-bottom: 1px solid rgba(128,128,128,0.15); }
+.m2m-tracks img { width: 60px; height: 60px; object-fit: cover; border-radius: 4px; display: block; }
+</style>"""
+
+HEADERS = (
+    "<ion-icon name='musical-notes'></ion-icon> Cover",
+    "<ion-icon name='happy'></ion-icon> Title | <ion-icon name='library'></ion-icon> Artist",
+    "<ion-icon name='mic'></ion-icon> Album",
+    "<ion-icon name='headset'></ion-icon> Popularity",
+    "<ion-icon name='analytics-outline'></ion-icon> Score Spotify",
+    "<ion-icon name='link'></ion-icon> Spotify",
+)
+
+
+def _track_row(track, show_theme, thumbnails):
+    """Ligne HTML d'un morceau (les champs venant de Spotify sont échappés)"""
+    image = track.get("image") or PLACEHOLDER_IMAGE
+    title = f"<b>{escape(str(track['title']))}</b> | {escape(str(track['artist']))}"
+    if show_theme and track.get('theme'):
+        title += f" | 🎭 {escape(str(track['theme']))}"
+
+    popularity_score = track.get('popularity_score', track.get('popularity', 0))
+    if track.get('spotify_url'):
+        link = (f'<a href="{escape(track["spotify_url"])}" target="_blank">'
+                f'<ion-icon name="musical-notes"></ion-icon> Écouter</a>')
+    else:
+        link = "❌ Indisponible"
+
+    cells = (
+        f'<img src="{escape(thumbnails.get(image, image))}" loading="lazy" alt="">',
+        title,
+        f"<ion-icon name='mic'></ion-icon> {escape(str(track['album']))}",
+        f"<ion-icon name='headset'></ion-icon> {track['popularity']}/100",
+        f"<ion-icon name='analytics-outline'></ion-icon> {popularity_score}/100",
+        link,
+    )
+    return "<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>"
+
+
+def _image_widths(tracks):
+    """URL de pochette -> largeur de l'image Spotify (None si inconnue), une fois par URL"""
+    widths = {}
+    for track in tracks:
+        image = track.get("image")
+        if image and image != PLACEHOLDER_IMAGE and image not in widths:
+            widths[image] = next((i.get("width") for i in track.get("images") or () if i.get("url") == image), None)
+    return widths
+
+
+def tracks_to_html(tracks, show_theme=True, thumbnails=None):
+    """
+    Construit le tableau HTML d'une liste de morceaux
+
+    Le HTML est produit sans indentation ni ligne vide pour que le rendu
+    Markdown de Streamlit ne le transforme pas en bloc de code.
+
+    Args:
+        tracks (list): Morceaux normalisés (voir utils.tracks.normalize_track)
+        show_theme (bool): Ajouter le thème du morceau à côté de l'artiste
+        thumbnails (dict): URL de pochette -> source à utiliser (ex. URI data: du cache local)
+
+    Returns:
+        str: Bloc HTML (style + tableau)
+    """
+    header = "".join(f"<th>{label}</th>" for label in HEADERS)
+    rows = "".join(_track_row(track, show_theme, thumbnails or {}) for track in tracks)
+    return f'{TABLE_STYLE}<table class="m2m-tracks"><thead><tr>{header}</tr></thead><tbody>{rows}</tbody></table>'
+
+
+def render_track_table(tracks, show_theme=True, container=None, thumbnail_cache=None):
+    """
+    Affiche les morceaux en un seul élément Streamlit
+
+    Args:
+        tracks (list): Morceaux à afficher
+        show_theme (bool): Ajouter le thème du morceau à côté de l'artiste
+        container: Conteneur Streamlit cible (défaut : st)
+        thumbnail_cache (ThumbnailCache): Servir les pochettes depuis le cache local (utils.thumbnails)
+    """
+    if container is None:
+        import streamlit as container
+    thumbnails = None
+    widths = _image_widths(tracks)
+    if thumbnail_cache is not None:
+        thumbnails = thumbnail_cache.data_uris(widths, widths)
+    else:
+        observe_page_images(widths)
+    container.markdown(tracks_to_html(tracks, show_theme=show_theme, thumbnails=thumbnails), unsafe_allow_html=True)
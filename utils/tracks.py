@@ -0,0 +1,70 @@
+# 🔹 Conversion des objets track de l'API Spotify au format utilisé par l'application
+PLACEHOLDER_IMAGE = "https://via.placeholder.com/300x300?text=No+Image"
+
+# Largeur d'affichage des pochettes dans les listes (px) : Spotify fournit 640, 300 et 64 px,
+# la plus petite image assez large suffit (≈ 3 Ko au lieu de ≈ 60 Ko)
+THUMBNAIL_WIDTH = 60
+
+
+def track_images(item):
+    """Images de l'album d'une track Spotify, de la plus petite à la plus grande"""
+    images = [
+        {"url": image["url"], "width": image.get("width"), "height": image.get("height")}
+        for image in ((item.get('album') or {}).get('images') or []) if image and image.get("url")
+    ]
+    # Largeur inconnue : considérée comme la plus grande
+    return sorted(images, key=lambda image: image["width"] or float("inf"))
+
+
+def pick_image(images, width=THUMBNAIL_WIDTH):
+    """
+    Choisit la plus petite image au moins aussi large que width
+
+    Args:
+        images (list): Images triées par largeur croissante (voir track_images)
+        width (int): Largeur d'affichage (px) ; None pour la plus grande image
+
+    Returns:
+        str: URL de l'image (la plus grande si aucune n'est assez large)
+    """
+    if not images:
+        return PLACEHOLDER_IMAGE
+    if width is not None:
+        for image in images:
+            if image["width"] is None or image["width"] >= width:
+                return image["url"]
+    return images[-1]["url"]
+
+
+def normalize_track(item, genre, theme=None, image_width=THUMBNAIL_WIDTH):
+    """
+    Convertit un objet track Spotify en dictionnaire de morceau
+
+    Args:
+        item (dict): Objet track renvoyé par l'API Spotify
+        genre (str): Genre (ou origine) à associer au morceau
+        theme (str): Thème à associer au morceau (optionnel)
+        image_width (int): Largeur d'affichage de la pochette (None = plus grande image)
+
+    Returns:
+        dict: Morceau normalisé
+    """
+    # Toutes les tailles sont gardées ; "image" est la plus petite qui remplit l'affichage
+    images = track_images(item)
+
+    track = {
+        "id": item.get('id', ''),
+        "title": item.get('name', 'Titre inconnu'),
+        "artist": item['artists'][0]['name'] if item.get('artists') and len(item['artists']) > 0 else 'Artiste inconnu',
+        "album": item['album']['name'] if item.get('album') else 'Album inconnu',
+        "popularity": item.get('popularity', 0),
+        "popularity_score": item.get('popularity', 0),  # Score Spotify (0-100)
+        "genre": genre,
+        "image": pick_image(images, image_width),
+        "images": images,
+        "spotify_url": item.get('external_urls', {}).get('spotify', ''),
+        "preview_url": item.get('preview_url', '')
+    }
+    if theme is not None:
+        track["theme"] = theme
+    return track